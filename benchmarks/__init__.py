@@ -0,0 +1,17 @@
+# Arquivo: benchmarks/__init__.py
+#
+# Scripts de benchmark e de carga da API. Não fazem parte da aplicação.
+#
+# Use sempre um banco separado: os módulos do projeto leem o banco das
+# variáveis de ambiente (ver database.py), então basta apontar DATABASE_URL:
+#
+#     export DATABASE_URL=sqlite:///bench.db        (ou um PostgreSQL local)
+#     python -m benchmarks.gerar_dados --escala pequena --limpar
+#     python -m benchmarks.micro                    (funções do crud/)
+#     python -m benchmarks.micro --com-escrita      (inclui as que gravam)
+#     python -m benchmarks.carga --tecnicos 1,10    (dia de trabalho dos técnicos via HTTP)
+#     python -m benchmarks.inicializacao            (cold start: import e preparo do banco)
+#     python -m benchmarks.resultados comparar antes.json depois.json
+#
+# Cada script grava um JSON em benchmarks/resultados/ com o commit, o banco
+# e a escala usados, para comparar execuções de commits diferentes.
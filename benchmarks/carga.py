@@ -0,0 +1,193 @@
+# Arquivo: benchmarks/carga.py (teste de carga: o dia de trabalho dos técnicos via HTTP)
+
+import sys
+import time
+import random
+import asyncio
+import argparse
+from datetime import date
+from collections import defaultdict
+
+import httpx
+
+from . import gerar_dados
+from .resultados import ambiente, estatisticas, salvar
+
+# =================================================================
+# O dia de um técnico
+# =================================================================
+# Cada técnico simulado repete, `--dias` vezes, o que o aplicativo faz em
+# uma visita: entra, abre a agenda e a área, registra o serviço com os
+# produtos, as contagens do MIP e o status dos dispositivos, confere o
+# relatório e volta ao painel. Os serviços criados são apagados no final.
+
+CONTAGENS_POR_VISITA = 20
+# A maioria dos dispositivos é encontrada em ordem
+STATUS_DISPOSITIVO = ("OK", "OK", "OK", "Consumido", "Danificado")
+
+class Tecnico:
+    def __init__(self, cliente: httpx.AsyncClient, usuario: str, rng: random.Random, tempos: dict, erros: dict):
+        self.cliente = cliente
+        self.usuario = usuario
+        self.rng = rng
+        self.tempos = tempos
+        self.erros = erros
+        self.servicos_criados = []
+
+    async def _passo(self, nome: str, metodo: str, url: str, **kwargs):
+        inicio = time.perf_counter()
+        try:
+            resposta = await self.cliente.request(metodo, url, **kwargs)
+        except httpx.HTTPError as e:
+            self.erros[nome].append(f"{type(e).__name__}: {e}")
+            return None
+        self.tempos[nome].append(time.perf_counter() - inicio)
+        if resposta.status_code >= 400:
+            self.erros[nome].append(f"HTTP {resposta.status_code}: {resposta.text[:200]}")
+            return None
+        return resposta
+
+    async def dia_de_trabalho(self, areas: list, pragas: list, produtos: list, hoje: date):
+        resposta = await self._passo("login", "POST", "/api/token",
+                                     data={"username": self.usuario, "password": gerar_dados.SENHA})
+        if resposta is None:
+            return
+        cabecalhos = {"Authorization": f"Bearer {resposta.json()['access_token']}"}
+
+        await self._passo("usuario", "GET", "/api/users/me", headers=cabecalhos)
+        await self._passo("agenda do mês", "GET", f"/api/agenda/mes/{hoje.year}/{hoje.month}", headers=cabecalhos)
+        await self._passo("áreas", "GET", "/api/areas/", headers=cabecalhos)
+
+        area_id = self.rng.choice(areas)
+        resposta = await self._passo("dispositivos da área", "GET", "/api/dispositivos/",
+                                     params={"area_id": area_id, "limite": 500}, headers=cabecalhos)
+        if resposta is None:
+            return
+        dispositivos = resposta.json()
+
+        resposta = await self._passo("criar serviço", "POST", "/api/servicos/", headers=cabecalhos, json={
+            "descricao": "Visita (teste de carga)", "data": hoje.isoformat(), "status": "Concluído", "area_id": area_id,
+            "produtos_associados": [
+                {"produto_id": produto_id, "quantidade_usada": round(self.rng.uniform(0.1, 2.0), 2)}
+                for produto_id in self.rng.sample(produtos, min(2, len(produtos)))
+            ],
+        })
+        if resposta is None:
+            return
+        servico_id = resposta.json()["id"]
+        self.servicos_criados.append(servico_id)
+
+        # A grade de contagem só tem as armadilhas AL
+        armadilhas = [d for d in dispositivos if d["tipo"] == "AL"]
+        amostra = self.rng.sample(armadilhas, min(CONTAGENS_POR_VISITA, len(armadilhas)))
+        await self._passo("salvar MIP", "POST", f"/api/servicos/{servico_id}/mip", headers=cabecalhos, json={
+            "ocorrencias": [self.rng.choice(pragas)],
+            "contagens": [
+                {"dispositivo_numero": d["numero"], "praga_nome": self.rng.choice(pragas), "quantidade": self.rng.randint(0, 15)}
+                for d in amostra
+            ],
+        })
+        await self._passo("status dos dispositivos", "PUT", f"/api/servicos/{servico_id}/dispositivos-status",
+                          headers=cabecalhos, json=[
+                              {"dispositivo_id": d["id"], "status": self.rng.choice(STATUS_DISPOSITIVO)}
+                              for d in dispositivos
+                          ])
+        await self._passo("relatório do serviço", "GET", f"/api/servicos/{servico_id}/relatorio-completo", headers=cabecalhos)
+        await self._passo("painel", "GET", "/api/dashboard/summary", headers=cabecalhos)
+
+async def _dados_de_apoio(cliente: httpx.AsyncClient):
+    """Áreas, pragas, produtos e usuários técnicos, lidos pela API com o usuário administrador."""
+    resposta = await cliente.post("/api/token", data={"username": gerar_dados.USUARIO_ADMIN, "password": gerar_dados.SENHA})
+    if resposta.status_code != 200:
+        sys.exit(f"Não foi possível entrar como {gerar_dados.USUARIO_ADMIN}. Rode antes: python -m benchmarks.gerar_dados")
+    cabecalhos = {"Authorization": f"Bearer {resposta.json()['access_token']}"}
+    areas = [area["id"] for area in (await cliente.get("/api/areas/", headers=cabecalhos)).json()]
+    pragas = [praga["nome"] for praga in (await cliente.get("/api/pragas/", headers=cabecalhos)).json()]
+    produtos = [produto["id"] for produto in (await cliente.get("/api/produtos/", headers=cabecalhos)).json()]
+    usuarios = sorted(
+        usuario["username"] for usuario in (await cliente.get("/api/users/", headers=cabecalhos)).json()
+        if usuario["username"].startswith(gerar_dados.PREFIXO_TECNICO)
+    )
+    return cabecalhos, areas, pragas, produtos, usuarios
+
+async def rodada(cliente: httpx.AsyncClient, tecnicos: int, dias: int, semente: int) -> dict:
+    """`tecnicos` técnicos simultâneos, cada um com `dias` dias de trabalho seguidos."""
+    cabecalhos_admin, areas, pragas, produtos, usuarios = await _dados_de_apoio(cliente)
+    tempos, erros = defaultdict(list), defaultdict(list)
+    # Mais técnicos simulados que cadastrados: os usuários são reaproveitados
+    equipe = [
+        Tecnico(cliente, usuarios[i % len(usuarios)], random.Random(semente + i), tempos, erros)
+        for i in range(tecnicos)
+    ]
+
+    async def trabalhar(tecnico: Tecnico):
+        for _ in range(dias):
+            await tecnico.dia_de_trabalho(areas, pragas, produtos, date.today())
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(trabalhar(tecnico) for tecnico in equipe))
+    duracao = time.perf_counter() - inicio
+
+    for tecnico in equipe:
+        for servico_id in tecnico.servicos_criados:
+            await cliente.delete(f"/api/servicos/{servico_id}", headers=cabecalhos_admin)
+
+    requisicoes = sum(len(t) for t in tempos.values())
+    return {
+        "tecnicos": tecnicos,
+        "dias": dias,
+        "duracao_s": round(duracao, 3),
+        "requisicoes": requisicoes,
+        "requisicoes_por_segundo": round(requisicoes / duracao, 2) if duracao else 0.0,
+        "passos": {nome: {**estatisticas(t), "erros": len(erros.get(nome, []))} for nome, t in tempos.items()},
+        "exemplos_de_erro": {nome: lista[:3] for nome, lista in erros.items()},
+    }
+
+# =================================================================
+# Linha de comando
+# =================================================================
+
+async def _executar(args) -> list:
+    if args.url:
+        cliente = httpx.AsyncClient(base_url=args.url, timeout=120)
+        contexto = None
+    else:
+        # Dentro do processo, sem servidor: o app roda com o lifespan dele
+        import main_api
+        cliente = httpx.AsyncClient(transport=httpx.ASGITransport(app=main_api.app), base_url="http://sise", timeout=120)
+        contexto = main_api.app.router.lifespan_context(main_api.app)
+        await contexto.__aenter__()
+
+    rodadas = []
+    try:
+        async with cliente:
+            for tecnicos in args.tecnicos:
+                resultado = await rodada(cliente, tecnicos, args.dias, args.semente)
+                rodadas.append(resultado)
+                print(f"--- {tecnicos} técnico(s): {resultado['requisicoes']} requisições em "
+                      f"{resultado['duracao_s']} s ({resultado['requisicoes_por_segundo']}/s) ---")
+                for nome, passo in resultado["passos"].items():
+                    erros = f"  {passo['erros']} erro(s)" if passo["erros"] else ""
+                    print(f"    {nome:<25} p50 {passo['p50_ms']:>9.2f}ms  p95 {passo['p95_ms']:>9.2f}ms"
+                          f"  p99 {passo['p99_ms']:>9.2f}ms{erros}")
+    finally:
+        if contexto is not None:
+            await contexto.__aexit__(None, None, None)
+    return rodadas
+
+def _main():
+    parser = argparse.ArgumentParser(description="Simula técnicos trabalhando ao mesmo tempo pela API.")
+    parser.add_argument("--tecnicos", default="1,10", type=lambda texto: [int(n) for n in texto.split(",")],
+                        help="técnicos simultâneos em cada rodada, separados por vírgula (padrão: 1,10)")
+    parser.add_argument("--dias", type=int, default=3, help="dias de trabalho de cada técnico por rodada")
+    parser.add_argument("--url", help="API já rodando (ex: http://localhost:8000); sem isso o app roda no processo")
+    parser.add_argument("--semente", type=int, default=gerar_dados.SEMENTE_PADRAO)
+    parser.add_argument("--saida", help="arquivo JSON (padrão: benchmarks/resultados/carga-<commit>-<data>.json)")
+    args = parser.parse_args()
+
+    rodadas = asyncio.run(_executar(args))
+    dados = {"ambiente": ambiente(), "url": args.url or "(no processo)", "rodadas": rodadas}
+    print(f"Resultados gravados em {salvar('carga', dados, args.saida)}")
+
+if __name__ == "__main__":
+    _main()
@@ -0,0 +1,287 @@
+# Arquivo: benchmarks/gerar_dados.py (gerador determinístico de dados sintéticos)
+
+import sys
+import time
+import random
+import argparse
+from datetime import date, timedelta
+
+import models, migracoes, security
+from database import engine, SessionLocal
+from crud import crud_resumos, crud_estoque
+
+# =================================================================
+# Escalas
+# =================================================================
+# A mesma escala com a mesma semente gera sempre os mesmos dados, então
+# resultados de commits diferentes são comparáveis.
+#
+# A "área principal" (ID 1) concentra muitos dispositivos e serviços para os
+# casos extremos: relatório compilado de uma área com ~10 mil serviços e
+# status de milhares de dispositivos em um único serviço.
+
+ESCALAS = {
+    "pequena": dict(
+        areas=20, dispositivos=2_000, anos=1, produtos=30, pragas=12, tecnicos=5,
+        contagens_por_servico=10, status_por_servico=10,
+        dispositivos_area_principal=1_000, servicos_area_principal=1_000,
+    ),
+    "media": dict(
+        areas=100, dispositivos=20_000, anos=3, produtos=60, pragas=20, tecnicos=15,
+        contagens_por_servico=15, status_por_servico=10,
+        dispositivos_area_principal=2_000, servicos_area_principal=5_000,
+    ),
+    "grande": dict(
+        areas=300, dispositivos=100_000, anos=5, produtos=80, pragas=25, tecnicos=30,
+        contagens_por_servico=20, status_por_servico=10,
+        dispositivos_area_principal=3_000, servicos_area_principal=10_000,
+    ),
+}
+
+SEMENTE_PADRAO = 20240101
+# Os dados terminam na véspera desta data, e não em "hoje", para serem reproduzíveis
+DATA_FINAL_PADRAO = date(2025, 1, 1)
+
+# Usuários criados para os benchmarks, todos com a senha SENHA
+USUARIO_ADMIN = "bench_admin"
+PREFIXO_TECNICO = "tecnico"
+PERMISSOES_ADMIN = "dashboard,agenda,areas,produtos,dispositivos,servicos,contagem,relatorios,configuracoes,seguranca"
+PERMISSOES_TECNICO = "agenda,areas,dispositivos,servicos,contagem"
+SENHA = "bench"
+
+TAMANHO_DO_LOTE = 20_000
+
+PRAGAS = [
+    "Rato", "Ratazana", "Camundongo", "Barata Germânica", "Barata Americana", "Formiga Doceira",
+    "Formiga Cortadeira", "Mosca Doméstica", "Mosquito", "Traça", "Cupim de Madeira Seca",
+    "Cupim Subterrâneo", "Pombo", "Escorpião", "Aranha Marrom", "Pulga", "Carrapato", "Percevejo",
+    "Caruncho", "Besouro", "Lagarta", "Morcego", "Lacraia", "Vespa", "Abelha",
+]
+# Peso de cada praga nas contagens (roedores e baratas dominam)
+PESOS_PRAGAS = [12, 6, 10, 9, 7, 5, 3, 6, 4, 2, 1, 1, 2, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1]
+TIPOS_DISPOSITIVO = ["PPC", "AL", "ISCA", "LUM"]
+PESOS_TIPOS = [50, 30, 15, 5]
+STATUS_DISPOSITIVO = ["Ativo", "Inativo", "Danificado"]
+PESOS_STATUS = [90, 6, 4]
+STATUS_VERIFICADO = ["OK", "Consumido", "Danificado", "Obstruído"]
+ATIVIDADES = ["Visita de Rotina", "Visita Extra", "Emergência", "Monitoramento"]
+DESCRICOES = [
+    "Monitoramento de roedores", "Aplicação de gel", "Troca de iscas", "Inspeção geral",
+    "Pulverização perimetral", "Revisão de armadilhas luminosas",
+]
+PRODUTOS = [
+    "Raticida Bloco", "Raticida Pellet", "Gel Baraticida", "Inseticida Líquido", "Inseticida Pó",
+    "Isca Formicida", "Placa Adesiva", "Refil Luminosa", "Cupinicida", "Larvicida",
+]
+
+# =================================================================
+# Geração
+# =================================================================
+
+def _em_lotes(conexao, tabela, linhas):
+    for inicio in range(0, len(linhas), TAMANHO_DO_LOTE):
+        conexao.execute(tabela.insert(), linhas[inicio:inicio + TAMANHO_DO_LOTE])
+
+def gerar(conexao, escala: dict, semente: int = SEMENTE_PADRAO, data_final: date = DATA_FINAL_PADRAO) -> dict:
+    """Insere os dados sintéticos em um banco vazio. Retorna quantas linhas foram criadas por tabela."""
+    rng = random.Random(semente)
+    totais = {}
+    data_inicial = data_final - timedelta(days=365 * escala["anos"])
+    dias = (data_final - data_inicial).days
+
+    # --- Usuários (um hash só: o bcrypt é lento de propósito) ---
+    senha = security.get_password_hash(SENHA)
+    usuarios = [{"id": 1, "username": USUARIO_ADMIN, "hashed_password": senha,
+                 "permissions": PERMISSOES_ADMIN, "is_active": True}]
+    usuarios += [
+        {"id": i + 2, "username": f"{PREFIXO_TECNICO}{i + 1:02d}", "hashed_password": senha,
+         "permissions": PERMISSOES_TECNICO, "is_active": True}
+        for i in range(escala["tecnicos"])
+    ]
+    _em_lotes(conexao, models.User.__table__, usuarios)
+    tecnicos = [usuario["id"] for usuario in usuarios[1:]]
+
+    # --- Cadastros ---
+    areas = [
+        {"id": i, "nome": "Área Central" if i == 1 else f"Área {i:03d}",
+         "responsavel": f"Responsável {i}", "telefone": f"(11) 9{rng.randint(1000, 9999)}-{rng.randint(1000, 9999)}"}
+        for i in range(1, escala["areas"] + 1)
+    ]
+    pragas = [{"id": i + 1, "nome": nome} for i, nome in enumerate(PRAGAS[:escala["pragas"]])]
+    pesos_pragas = PESOS_PRAGAS[:escala["pragas"]]
+    produtos = [
+        {"id": i, "codigo": f"P{i:04d}", "nome": f"{PRODUTOS[(i - 1) % len(PRODUTOS)]} {(i - 1) // len(PRODUTOS) + 1}",
+         "unidade_estoque": "Caixa(s)", "unidade_uso": "g", "fator_conversao_uso": 1000.0,
+         # Estoque folgado: a carga não pode parar por falta de produto
+         "estoque_atual": 1e9, "estoque_minimo": 10.0}
+        for i in range(1, escala["produtos"] + 1)
+    ]
+    _em_lotes(conexao, models.Area.__table__, areas)
+    _em_lotes(conexao, models.Praga.__table__, pragas)
+    _em_lotes(conexao, models.Produto.__table__, produtos)
+
+    # --- Dispositivos: a área principal recebe a sua cota, o resto é dividido entre as outras ---
+    dispositivos = []
+    por_area, armadilhas_por_area = {}, {}
+    restantes = max(escala["dispositivos"] - escala["dispositivos_area_principal"], 0)
+    outras = max(escala["areas"] - 1, 1)
+    for area_id in range(1, escala["areas"] + 1):
+        if area_id == 1:
+            quantidade = escala["dispositivos_area_principal"]
+        else:
+            quantidade = restantes // outras + (1 if area_id - 2 < restantes % outras else 0)
+        ids, armadilhas = [], []
+        for numero in range(1, quantidade + 1):
+            dispositivo_id = len(dispositivos) + 1
+            tipo = rng.choices(TIPOS_DISPOSITIVO, PESOS_TIPOS)[0]
+            dispositivos.append({
+                "id": dispositivo_id, "numero": str(numero), "area_id": area_id, "tipo": tipo,
+                "status": rng.choices(STATUS_DISPOSITIVO, PESOS_STATUS)[0],
+                "descricao": f"Dispositivo {numero}",
+            })
+            ids.append(dispositivo_id)
+            if tipo == models.Dispositivo.TIPO_CONTAGEM:
+                armadilhas.append(dispositivo_id)
+        por_area[area_id] = ids
+        armadilhas_por_area[area_id] = armadilhas
+    _em_lotes(conexao, models.Dispositivo.__table__, dispositivos)
+    totais["dispositivos"] = len(dispositivos)
+    del dispositivos
+
+    # --- Serviços: visita semanal em cada área, a principal com vários por dia ---
+    agenda_servicos = []
+    for area_id in range(2, escala["areas"] + 1):
+        dia = data_inicial + timedelta(days=rng.randrange(7))
+        while dia < data_final:
+            agenda_servicos.append((dia, area_id))
+            dia += timedelta(days=7)
+    for _ in range(escala["servicos_area_principal"]):
+        agenda_servicos.append((data_inicial + timedelta(days=rng.randrange(dias)), 1))
+    agenda_servicos.sort()
+
+    servicos, associados, contagens, verificados, registros_mip = [], [], [], [], []
+    praga_ids = [praga["id"] for praga in pragas]
+    nomes_pragas = {praga["id"]: praga["nome"] for praga in pragas}
+    for servico_id, (dia, area_id) in enumerate(agenda_servicos, start=1):
+        hora = rng.randint(7, 16)
+        servicos.append({
+            "id": servico_id, "data": dia, "area_id": area_id, "status": "Concluído",
+            "descricao": rng.choice(DESCRICOES), "tipo_atividade": rng.choices(ATIVIDADES, [80, 10, 3, 7])[0],
+            "horario_inicio": f"{hora:02d}:00", "horario_termino": f"{hora + 1:02d}:30",
+            "observacoes": "Acesso restrito em parte da área." if rng.random() < 0.05 else None,
+        })
+        for produto_id in rng.sample(range(1, escala["produtos"] + 1), rng.randint(1, 3)):
+            associados.append({
+                "servico_id": servico_id, "produto_id": produto_id, "quantidade_usada": round(rng.uniform(5, 200), 1)
+            })
+
+        dispositivos_da_area = por_area[area_id]
+        if not dispositivos_da_area:
+            continue
+        # Como na grade de contagem, só as armadilhas AL recebem contagens
+        observadas = set()
+        armadilhas = armadilhas_por_area[area_id]
+        for dispositivo_id in rng.sample(armadilhas, min(escala["contagens_por_servico"], len(armadilhas))):
+            praga_id = rng.choices(praga_ids, pesos_pragas)[0]
+            quantidade = rng.choice((0, 0, 0, 1, 1, 2, 3, 5, 8))
+            contagens.append({
+                "servico_id": servico_id, "dispositivo_id": dispositivo_id, "praga_id": praga_id,
+                # Os IDs de uma área são consecutivos e o número começa em 1
+                "dispositivo_numero": str(dispositivo_id - dispositivos_da_area[0] + 1),
+                "praga_nome": nomes_pragas[praga_id], "quantidade": quantidade,
+            })
+            if quantidade:
+                observadas.add(nomes_pragas[praga_id])
+        for dispositivo_id in rng.sample(dispositivos_da_area, min(escala["status_por_servico"], len(dispositivos_da_area))):
+            verificados.append({
+                "servico_id": servico_id, "dispositivo_id": dispositivo_id,
+                "status_registrado": rng.choices(STATUS_VERIFICADO, [85, 8, 5, 2])[0],
+            })
+        for praga_nome in sorted(observadas)[:2]:
+            registros_mip.append({
+                "servico_id": servico_id, "data_observacao": dia, "pragas_observadas": praga_nome,
+                "observacao_texto": f"Praga(s) observada(s): {praga_nome}",
+            })
+
+        # Grava em partes para não acumular milhões de dicionários na memória
+        if len(contagens) >= 5 * TAMANHO_DO_LOTE:
+            _gravar_servicos(conexao, servicos, associados, contagens, verificados, registros_mip, totais)
+    _gravar_servicos(conexao, servicos, associados, contagens, verificados, registros_mip, totais)
+
+    # --- Agenda (próximas semanas) e ocorrências ---
+    agendamentos = []
+    for area_id in range(1, escala["areas"] + 1):
+        dia = data_final + timedelta(days=rng.randrange(7))
+        while dia < data_final + timedelta(days=60):
+            agendamentos.append({
+                "data_agendamento": dia, "area_id": area_id, "tipo_servico": "Visita de Rotina",
+                "status": "Pendente", "responsavel_id": rng.choice(tecnicos),
+            })
+            dia += timedelta(days=7)
+    ocorrencias = [
+        {
+            "data_ocorrencia": data_inicial + timedelta(days=rng.randrange(dias)),
+            "descricao": "Avistamento relatado pelo cliente", "nivel_urgencia": rng.choice(["Baixa", "Média", "Alta"]),
+            "area_id": rng.randint(1, escala["areas"]), "registrado_por_id": rng.choice(tecnicos), "status": "Aberta",
+        }
+        for _ in range(escala["areas"] * escala["anos"] * 4)
+    ]
+    _em_lotes(conexao, models.Agendamento.__table__, agendamentos)
+    _em_lotes(conexao, models.Ocorrencia.__table__, ocorrencias)
+
+    totais.update({
+        "usuarios": len(usuarios), "areas": len(areas), "pragas": len(pragas), "produtos": len(produtos),
+        "agendamentos": len(agendamentos), "ocorrencias": len(ocorrencias),
+    })
+    return totais
+
+def _gravar_servicos(conexao, servicos, associados, contagens, verificados, registros_mip, totais):
+    for nome, modelo, linhas in (
+        ("servicos", models.Servico, servicos),
+        ("servico_produto", models.ServicoProdutoAssociado, associados),
+        ("contagens_pragas", models.ContagemPraga, contagens),
+        ("servico_dispositivo_status", models.ServicoDispositivoStatus, verificados),
+        ("mip_registros", models.MIPRegistro, registros_mip),
+    ):
+        _em_lotes(conexao, modelo.__table__, linhas)
+        totais[nome] = totais.get(nome, 0) + len(linhas)
+        linhas.clear()
+
+# =================================================================
+# Linha de comando
+# =================================================================
+
+def _main():
+    parser = argparse.ArgumentParser(description="Preenche o banco configurado (DATABASE_URL ou sise.db) com dados sintéticos.")
+    parser.add_argument("--escala", choices=sorted(ESCALAS), default="pequena")
+    parser.add_argument("--semente", type=int, default=SEMENTE_PADRAO)
+    parser.add_argument("--limpar", action="store_true", help="apaga TODAS as tabelas do banco antes de gerar")
+    args = parser.parse_args()
+
+    print(f"--- BANCO: {engine.url.render_as_string(hide_password=True)} ---")
+    if args.limpar:
+        models.Base.metadata.drop_all(bind=engine)
+    migracoes.preparar_esquema(engine)
+
+    with SessionLocal() as db:
+        if db.query(models.Servico.id).first() or db.query(models.User.id).first():
+            sys.exit("O banco já tem dados. Use --limpar (apaga tudo) ou aponte DATABASE_URL para outro banco.")
+
+    inicio = time.perf_counter()
+    with engine.begin() as conexao:
+        totais = gerar(conexao, ESCALAS[args.escala], args.semente)
+    print(f"--- DADOS INSERIDOS EM {time.perf_counter() - inicio:.1f}s ---")
+
+    # Resumos, séries e livro de estoque, como a API faria na inicialização
+    inicio = time.perf_counter()
+    with SessionLocal() as db:
+        crud_resumos.reconstruir_resumos(db)
+        crud_estoque.garantir_livro_estoque(db)
+    print(f"--- RESUMOS RECONSTRUÍDOS EM {time.perf_counter() - inicio:.1f}s ---")
+
+    for tabela, total in sorted(totais.items()):
+        print(f"{tabela:>28}: {total}")
+    print(f"Usuários: {USUARIO_ADMIN} e {PREFIXO_TECNICO}01.. (senha '{SENHA}').")
+
+if __name__ == "__main__":
+    _main()
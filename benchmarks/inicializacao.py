@@ -0,0 +1,100 @@
+# Arquivo: benchmarks/inicializacao.py (tempo de inicialização da API: cold start)
+
+import os
+import sys
+import json
+import argparse
+import subprocess
+from pathlib import Path
+
+from .resultados import ambiente, estatisticas, salvar
+
+RAIZ = Path(__file__).resolve().parent.parent
+
+# =================================================================
+# Medição
+# =================================================================
+# Cada medida roda em um processo Python novo, como um cold start do Cloud
+# Run ou um worker do wsgi.py: o import do main_api (com `-X importtime`,
+# que mostra os módulos mais caros) e, separado, o preparar_banco que o
+# lifespan chama, nos dois modos de ESQUEMA_NA_INICIALIZACAO.
+
+_PREPARAR = (
+    "import time, json, main_api\n"
+    "inicio = time.perf_counter()\n"
+    "main_api.preparar_banco()\n"
+    "print(json.dumps(time.perf_counter() - inicio))\n"
+)
+
+def _rodar(argumentos: list, ambiente_extra: dict = None) -> subprocess.CompletedProcess:
+    variaveis = {**os.environ, **(ambiente_extra or {})}
+    # Os módulos do projeto são importados a partir da raiz
+    variaveis["PYTHONPATH"] = os.pathsep.join(filter(None, [str(RAIZ), os.environ.get("PYTHONPATH")]))
+    processo = subprocess.run([sys.executable, *argumentos], cwd=RAIZ, env=variaveis, capture_output=True, text=True)
+    if processo.returncode != 0:
+        sys.exit(f"Falhou: python {' '.join(argumentos)}\n{processo.stderr[-2000:]}")
+    return processo
+
+def ler_importtime(saida: str) -> dict:
+    """{módulo: (próprio_s, acumulado_s)} a partir da saída de `python -X importtime`."""
+    modulos = {}
+    for linha in saida.splitlines():
+        if not linha.startswith("import time:") or "self [us]" in linha:
+            continue
+        proprio, acumulado, nome = linha[len("import time:"):].split("|")
+        modulos[nome.strip()] = (int(proprio) / 1e6, int(acumulado) / 1e6)
+    return modulos
+
+def medir_import(repeticoes: int) -> tuple:
+    """Tempos do import do main_api e os módulos mais caros (média do tempo acumulado)."""
+    tempos, somas = [], {}
+    for _ in range(repeticoes):
+        modulos = ler_importtime(_rodar(["-X", "importtime", "-c", "import main_api"]).stderr)
+        tempos.append(modulos["main_api"][1])
+        for nome, (proprio, acumulado) in modulos.items():
+            soma = somas.setdefault(nome, [0.0, 0.0])
+            soma[0] += proprio
+            soma[1] += acumulado
+    return tempos, somas
+
+def medir_preparar_banco(modo: str, repeticoes: int) -> list:
+    return [
+        json.loads(_rodar(["-c", _PREPARAR], {"ESQUEMA_NA_INICIALIZACAO": modo}).stdout.strip().splitlines()[-1])
+        for _ in range(repeticoes)
+    ]
+
+# =================================================================
+# Linha de comando
+# =================================================================
+
+def _main():
+    parser = argparse.ArgumentParser(description="Mede o tempo de inicialização da API em processos novos.")
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--modulos", type=int, default=15, help="quantos módulos mais caros listar")
+    parser.add_argument("--saida", help="arquivo JSON (padrão: benchmarks/resultados/inicializacao-<commit>-<data>.json)")
+    args = parser.parse_args()
+
+    tempos_import, somas = medir_import(args.repeticoes)
+    medidas = {"import main_api": estatisticas(tempos_import)}
+    # "criar" primeiro: deixa o banco preparado e carimbado para o "verificar"
+    for modo in ("criar", "verificar"):
+        medidas[f"preparar_banco[{modo}]"] = estatisticas(medir_preparar_banco(modo, args.repeticoes))
+
+    mais_caros = sorted(somas.items(), key=lambda item: item[1][1], reverse=True)[:args.modulos]
+    modulos = [
+        {"modulo": nome, "proprio_ms": round(proprio / args.repeticoes * 1000, 2),
+         "acumulado_ms": round(acumulado / args.repeticoes * 1000, 2)}
+        for nome, (proprio, acumulado) in mais_caros
+    ]
+
+    for nome, medida in medidas.items():
+        print(f"{nome:<30} p50 {medida['p50_ms']:>9.2f}ms  max {medida['max_ms']:>9.2f}ms")
+    print("\nMódulos mais caros no import (média, acumulado):")
+    for modulo in modulos:
+        print(f"    {modulo['modulo']:<45} {modulo['acumulado_ms']:>9.2f}ms  (próprio {modulo['proprio_ms']:.2f}ms)")
+
+    dados = {"ambiente": ambiente(), "medidas": medidas, "modulos_mais_caros": modulos}
+    print(f"Resultados gravados em {salvar('inicializacao', dados, args.saida)}")
+
+if __name__ == "__main__":
+    _main()
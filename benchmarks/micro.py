@@ -0,0 +1,364 @@
+# Arquivo: benchmarks/micro.py (microbenchmarks das funções quentes do crud/)
+
+import sys
+import time
+import argparse
+import threading
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import event, func
+
+import models, schemas
+from database import engine, SessionLocal
+from crud import (
+    crud_area, crud_agenda, crud_dashboard, crud_dispositivo, crud_estoque, crud_mip,
+    crud_relatorio, crud_servico, crud_usuario, paginacao,
+)
+from . import gerar_dados
+from .resultados import ambiente, estatisticas, medir, salvar
+
+# =================================================================
+# Registro dos benchmarks
+# =================================================================
+# Cada benchmark recebe a sessão e as amostras e devolve a função a medir
+# (o que vem antes do `return` é preparação e não entra no tempo):
+#
+#     @benchmark("servico.get_service")
+#     def _(db, amostras):
+#         return lambda: crud_servico.get_service(db, amostras.servico_id)
+#
+# Os que gravam no banco (escreve=True) só rodam com --com-escrita e
+# deixam os dados como estavam ao final.
+
+_BENCHMARKS = []
+
+def benchmark(nome: str, escreve: bool = False, repeticoes: int = None):
+    def registrar(funcao):
+        _BENCHMARKS.append((nome, funcao, escreve, repeticoes))
+        return funcao
+    return registrar
+
+class Amostras:
+    """IDs e períodos usados pelos benchmarks, lidos do banco gerado por gerar_dados."""
+
+    def __init__(self, db):
+        self.area_principal = 1
+        # Uma área comum: a de menor ID depois da principal
+        self.area_comum = db.query(func.min(models.Area.id)).filter(models.Area.id != 1).scalar() or 1
+        self.data_final = db.query(func.max(models.Servico.data)).scalar() or date.today()
+        self.data_inicial = db.query(func.min(models.Servico.data)).scalar() or self.data_final
+        self.ultimo_ano = (max(self.data_final - timedelta(days=364), self.data_inicial), self.data_final)
+        self.ultimo_mes = (self.data_final - timedelta(days=29), self.data_final)
+        self.ultima_semana = (self.data_final - timedelta(days=6), self.data_final)
+        # O serviço mais recente da área principal (a que tem milhares de dispositivos)
+        self.servico_id = db.query(func.max(models.Servico.id)).filter(
+            models.Servico.area_id == self.area_principal
+        ).scalar()
+        # Os agendamentos gerados ficam depois do último serviço
+        primeiro_agendamento = db.query(func.min(models.Agendamento.data_agendamento)).scalar() or self.data_final
+        self.mes_agenda = (primeiro_agendamento.year, primeiro_agendamento.month)
+        self.produto_id = db.query(func.min(models.Produto.id)).scalar()
+        self.dispositivos_principal = [
+            dispositivo_id for (dispositivo_id,) in db.query(models.Dispositivo.id)
+            .filter(models.Dispositivo.area_id == self.area_principal).order_by(models.Dispositivo.id)
+        ]
+
+# =================================================================
+# Leitura
+# =================================================================
+
+@benchmark("usuario.authenticate_user", repeticoes=30)
+def _(db, amostras):
+    return lambda: crud_usuario.authenticate_user(db, gerar_dados.USUARIO_ADMIN, gerar_dados.SENHA)
+
+@benchmark("area.get_areas")
+def _(db, amostras):
+    return lambda: crud_area.get_areas(db)
+
+@benchmark("dispositivo.get_dispositivos[area principal]")
+def _(db, amostras):
+    return lambda: crud_dispositivo.get_dispositivos(db, area_id=amostras.area_principal)
+
+@benchmark("dispositivo.paginar[500]")
+def _(db, amostras):
+    return lambda: paginacao.paginar(
+        db, crud_dispositivo.query_dispositivos(), models.Dispositivo, crud_dispositivo.CHAVES_DISPOSITIVOS,
+        limite=500, opcoes=crud_dispositivo.OPCOES_DISPOSITIVO
+    )
+
+@benchmark("servico.get_servicos[area comum]")
+def _(db, amostras):
+    return lambda: crud_servico.get_servicos(db, area_id=amostras.area_comum)
+
+@benchmark("servico.get_servicos_por_periodo[30 dias]")
+def _(db, amostras):
+    return lambda: crud_servico.get_servicos_por_periodo(db, *amostras.ultimo_mes)
+
+@benchmark("servico.get_service")
+def _(db, amostras):
+    return lambda: crud_servico.get_service(db, amostras.servico_id)
+
+@benchmark("servico.get_servico_completo")
+def _(db, amostras):
+    return lambda: crud_servico.get_servico_completo(db, amostras.servico_id)
+
+@benchmark("servico.exportacao[1 ano]", repeticoes=5)
+def _(db, amostras):
+    return lambda: sum(1 for _ in db.execute(crud_servico.query_exportacao_servicos(*amostras.ultimo_ano)))
+
+@benchmark("mip.get_mip_data_for_servico")
+def _(db, amostras):
+    return lambda: crud_mip.get_mip_data_for_servico(db, amostras.servico_id)
+
+@benchmark("dashboard.get_dashboard_summary")
+def _(db, amostras):
+    return lambda: crud_dashboard.get_dashboard_summary(db)
+
+@benchmark("agenda.get_eventos_calendario")
+def _(db, amostras):
+    return lambda: crud_agenda.get_eventos_calendario(db, *amostras.mes_agenda)
+
+@benchmark("relatorio.get_relatorio_compilado_area[area principal, tudo]", repeticoes=10)
+def _(db, amostras):
+    return lambda: crud_relatorio.get_relatorio_compilado_area(
+        db, amostras.area_principal, amostras.data_inicial, amostras.data_final
+    )
+
+@benchmark("relatorio.get_relatorio_contagem_pragas[1 ano]", repeticoes=10)
+def _(db, amostras):
+    return lambda: crud_relatorio.get_relatorio_contagem_pragas(db, *amostras.ultimo_ano)
+
+@benchmark("relatorio.get_tendencia_pragas[area principal, semana, tudo]", repeticoes=10)
+def _(db, amostras):
+    return lambda: crud_relatorio.get_tendencia_pragas(
+        db, amostras.area_principal, amostras.data_inicial, amostras.data_final, "semana"
+    )
+
+@benchmark("relatorio.get_tendencia_pragas[dispositivo, mes, tudo]", repeticoes=10)
+def _(db, amostras):
+    return lambda: crud_relatorio.get_tendencia_pragas(
+        db, amostras.area_principal, amostras.data_inicial, amostras.data_final, "mes", dispositivo_numero="1"
+    )
+
+@benchmark("estoque.get_estoque_em")
+def _(db, amostras):
+    momento = datetime.combine(amostras.data_final, datetime.min.time())
+    return lambda: crud_estoque.get_estoque_em(db, amostras.produto_id, momento)
+
+# =================================================================
+# Escrita (deixam o banco como estava)
+# =================================================================
+
+@benchmark("dispositivo.atualizar_status_dispositivos[todos mudam]", escreve=True, repeticoes=10)
+def _(db, amostras):
+    # Alterna entre duas listas completas: a cada chamada todos os status mudam
+    listas = [
+        [schemas.DispositivoStatusUpdate(dispositivo_id=i, status=status) for i in amostras.dispositivos_principal]
+        for status in ("OK", "Consumido")
+    ]
+    vez = [0]
+    def executar():
+        vez[0] += 1
+        crud_dispositivo.atualizar_status_dispositivos(db, amostras.servico_id, listas[vez[0] % 2])
+    return executar
+
+@benchmark("dispositivo.atualizar_status_dispositivos[nada muda]", escreve=True, repeticoes=10)
+def _(db, amostras):
+    lista = [schemas.DispositivoStatusUpdate(dispositivo_id=i, status="OK") for i in amostras.dispositivos_principal]
+    crud_dispositivo.atualizar_status_dispositivos(db, amostras.servico_id, lista)
+    return lambda: crud_dispositivo.atualizar_status_dispositivos(db, amostras.servico_id, lista)
+
+@benchmark("mip.save_mip_data_for_servico[uma contagem muda]", escreve=True)
+def _(db, amostras):
+    atuais = crud_mip.get_mip_data_for_servico(db, amostras.servico_id)
+    contagens = [
+        schemas.ContagemPragaCreate(dispositivo_numero=c.dispositivo_numero, praga_nome=c.praga_nome, quantidade=c.quantidade)
+        for c in atuais["contagens"]
+    ]
+    ocorrencias = [registro.pragas_observadas for registro in atuais["ocorrencias"]]
+    vez = [0]
+    def executar():
+        vez[0] += 1
+        alteradas = list(contagens)
+        if alteradas:
+            primeira = alteradas[0]
+            alteradas[0] = primeira.model_copy(update={"quantidade": primeira.quantidade + vez[0] % 2})
+        crud_mip.save_mip_data_for_servico(
+            db, amostras.servico_id, schemas.MIPDataCreate(ocorrencias=ocorrencias, contagens=alteradas)
+        )
+    return executar
+
+@benchmark("servico.create_e_delete", escreve=True)
+def _(db, amostras):
+    novo = schemas.ServicoCreate(
+        descricao="Benchmark", data=amostras.data_final, status="Concluído", area_id=amostras.area_comum,
+        produtos_associados=[schemas.ProdutoParaServicoBase(produto_id=amostras.produto_id, quantidade_usada=1.0)]
+    )
+    def executar():
+        servico = crud_servico.create_servico(db, novo)
+        crud_servico.delete_servico(db, servico.id)
+    return executar
+
+# =================================================================
+# Verificações
+# =================================================================
+
+def _contar_consultas(funcao) -> int:
+    contador = [0]
+    def contar(*_):
+        contador[0] += 1
+    event.listen(engine, "before_cursor_execute", contar)
+    try:
+        funcao()
+    finally:
+        event.remove(engine, "before_cursor_execute", contar)
+    return contador[0]
+
+def consultas_por_tamanho(db, amostras) -> dict:
+    """
+    Número de consultas das listagens com pouco e com muito resultado, já
+    convertidas para o esquema de resposta (como nas rotas). O selectin
+    acrescenta uma consulta a cada 500 linhas por relação; com N+1 o número
+    cresce junto com as linhas, e o caso é marcado como suspeito.
+    """
+    from pydantic import TypeAdapter
+    from typing import List
+
+    def convertido(esquema, funcao, *args, **kwargs):
+        adaptador = TypeAdapter(esquema)
+        return lambda: len(adaptador.validate_python(funcao(db, *args, **kwargs), from_attributes=True))
+
+    ano, mes = amostras.mes_agenda
+    casos = {
+        "servico.get_servicos_por_periodo": (
+            convertido(List[schemas.Servico], crud_servico.get_servicos_por_periodo, *amostras.ultima_semana),
+            convertido(List[schemas.Servico], crud_servico.get_servicos_por_periodo, *amostras.ultimo_ano),
+        ),
+        "servico.get_servicos": (
+            convertido(List[schemas.Servico], crud_servico.get_servicos, area_id=amostras.area_comum),
+            convertido(List[schemas.Servico], crud_servico.get_servicos, area_id=amostras.area_principal),
+        ),
+        "dispositivo.get_dispositivos": (
+            convertido(List[schemas.Dispositivo], crud_dispositivo.get_dispositivos, area_id=amostras.area_comum),
+            convertido(List[schemas.Dispositivo], crud_dispositivo.get_dispositivos),
+        ),
+        "agenda.get_agendamentos": (
+            convertido(List[schemas.Agendamento], crud_agenda.get_agendamentos, ano, mes, limit=5),
+            convertido(List[schemas.Agendamento], crud_agenda.get_agendamentos, ano, mes, limit=1000),
+        ),
+    }
+    resultado = {}
+    for nome, (pouco, muito) in casos.items():
+        medidas = []
+        for funcao in (pouco, muito):
+            db.expunge_all()  # sem objetos já carregados na sessão, que esconderiam o N+1
+            linhas = [0]
+            consultas = _contar_consultas(lambda: linhas.__setitem__(0, funcao()))
+            medidas.append((linhas[0], consultas))
+        (linhas_pouco, consultas_pouco), (linhas_muito, consultas_muito) = medidas
+        resultado[nome] = {
+            "pouco": {"linhas": linhas_pouco, "consultas": consultas_pouco},
+            "muito": {"linhas": linhas_muito, "consultas": consultas_muito},
+            # Mais de uma consulta a cada 50 linhas a mais não é lote do selectin
+            "suspeito": (consultas_muito - consultas_pouco) * 50 > linhas_muito - linhas_pouco > 0,
+        }
+    return resultado
+
+def concorrencia_de_estoque(amostras, threads: int = 8, servicos_por_thread: int = 10) -> dict:
+    """
+    Vários serviços simultâneos gastando o mesmo produto. O estoque final tem
+    que bater com o inicial menos o total gasto, e o livro de movimentos com o
+    estoque. Os serviços criados são apagados no final (o estoque volta).
+    """
+    quantidade = 1.5
+    with SessionLocal() as db:
+        inicial = db.get(models.Produto, amostras.produto_id).estoque_atual
+
+    criados, erros = [], []
+    criados_lock = threading.Lock()
+    def trabalhar():
+        with SessionLocal() as db:
+            for _ in range(servicos_por_thread):
+                try:
+                    servico = crud_servico.create_servico(db, schemas.ServicoCreate(
+                        descricao="Benchmark concorrência", data=amostras.data_final, status="Concluído",
+                        area_id=amostras.area_comum,
+                        produtos_associados=[schemas.ProdutoParaServicoBase(produto_id=amostras.produto_id, quantidade_usada=quantidade)]
+                    ))
+                    with criados_lock:
+                        criados.append(servico.id)
+                except Exception as e:
+                    db.rollback()
+                    erros.append(str(e))
+
+    inicio = time.perf_counter()
+    trabalhadores = [threading.Thread(target=trabalhar) for _ in range(threads)]
+    for trabalhador in trabalhadores:
+        trabalhador.start()
+    for trabalhador in trabalhadores:
+        trabalhador.join()
+    duracao = time.perf_counter() - inicio
+
+    with SessionLocal() as db:
+        final = db.get(models.Produto, amostras.produto_id).estoque_atual
+        no_livro = crud_estoque.get_estoque_em(db, amostras.produto_id, datetime.now() + timedelta(days=1))
+        esperado = inicial - len(criados) * quantidade
+        for servico_id in criados:
+            crud_servico.delete_servico(db, servico_id)
+
+    return {
+        "threads": threads, "servicos": len(criados), "erros": erros[:5], "duracao_s": round(duracao, 3),
+        "estoque_inicial": inicial, "estoque_final": final, "estoque_esperado": esperado, "estoque_no_livro": no_livro,
+        "consistente": abs(final - esperado) < 1e-6 and abs(no_livro - final) < 1e-6,
+    }
+
+# =================================================================
+# Linha de comando
+# =================================================================
+
+def _main():
+    parser = argparse.ArgumentParser(description="Microbenchmarks das funções do crud/ no banco configurado.")
+    parser.add_argument("--com-escrita", action="store_true", help="inclui os benchmarks que gravam no banco")
+    parser.add_argument("--filtro", help="roda só os benchmarks cujo nome contém este texto")
+    parser.add_argument("--repeticoes", type=int, default=20)
+    parser.add_argument("--saida", help="arquivo JSON (padrão: benchmarks/resultados/micro-<commit>-<data>.json)")
+    args = parser.parse_args()
+
+    with SessionLocal() as db:
+        if not db.query(models.Servico.id).first():
+            sys.exit("Banco sem dados. Rode antes: python -m benchmarks.gerar_dados --escala pequena")
+        amostras = Amostras(db)
+        volumes = {
+            modelo.__tablename__: db.query(func.count()).select_from(modelo).scalar()
+            for modelo in (models.Area, models.Dispositivo, models.Servico, models.ContagemPraga, models.Produto)
+        }
+
+    resultados = {}
+    for nome, preparar, escreve, repeticoes in _BENCHMARKS:
+        if (escreve and not args.com_escrita) or (args.filtro and args.filtro not in nome):
+            continue
+        with SessionLocal() as db:
+            funcao = preparar(db, amostras)
+            tempos = medir(funcao, repeticoes or args.repeticoes)
+            consultas = _contar_consultas(funcao)
+        resultados[nome] = {**estatisticas(tempos), "consultas": consultas}
+        print(f"{nome:<65} p50 {resultados[nome]['p50_ms']:>9.2f}ms  p99 {resultados[nome]['p99_ms']:>9.2f}ms  {consultas:>3} consultas")
+
+    dados = {"ambiente": ambiente(), "volumes": volumes, "benchmarks": resultados}
+
+    if not args.filtro:
+        with SessionLocal() as db:
+            dados["consultas_por_tamanho"] = consultas_por_tamanho(db, amostras)
+        for nome, caso in dados["consultas_por_tamanho"].items():
+            pouco, muito = caso["pouco"], caso["muito"]
+            aviso = "  <-- N+1?" if caso["suspeito"] else ""
+            print(f"consultas {nome:<40} {pouco['linhas']:>6} linhas: {pouco['consultas']:>3}"
+                  f"  {muito['linhas']:>6} linhas: {muito['consultas']:>3}{aviso}")
+        if args.com_escrita:
+            dados["concorrencia_estoque"] = concorrencia_de_estoque(amostras)
+            print(f"concorrência de estoque: {dados['concorrencia_estoque']}")
+
+    print(f"Resultados gravados em {salvar('micro', dados, args.saida)}")
+
+if __name__ == "__main__":
+    _main()
@@ -0,0 +1,153 @@
+# Arquivo: benchmarks/resultados.py (medição, gravação e comparação dos resultados)
+
+import sys
+import json
+import time
+import platform
+import argparse
+import subprocess
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+PASTA_RESULTADOS = Path(__file__).resolve().parent / "resultados"
+
+# =================================================================
+# Estatísticas
+# =================================================================
+
+def percentil(valores_ordenados: list, p: float) -> float:
+    """Percentil por interpolação linear (p entre 0 e 100) de uma lista já ordenada."""
+    if not valores_ordenados:
+        return 0.0
+    posicao = (len(valores_ordenados) - 1) * p / 100
+    abaixo = int(posicao)
+    acima = min(abaixo + 1, len(valores_ordenados) - 1)
+    return valores_ordenados[abaixo] + (valores_ordenados[acima] - valores_ordenados[abaixo]) * (posicao - abaixo)
+
+def estatisticas(tempos: list) -> dict:
+    """Resumo de uma lista de durações em segundos, em milissegundos."""
+    ordenados = sorted(tempos)
+    if not ordenados:
+        return {"n": 0}
+    return {
+        "n": len(ordenados),
+        "min_ms": round(ordenados[0] * 1000, 3),
+        "media_ms": round(sum(ordenados) / len(ordenados) * 1000, 3),
+        "p50_ms": round(percentil(ordenados, 50) * 1000, 3),
+        "p95_ms": round(percentil(ordenados, 95) * 1000, 3),
+        "p99_ms": round(percentil(ordenados, 99) * 1000, 3),
+        "max_ms": round(ordenados[-1] * 1000, 3),
+    }
+
+def medir(funcao, repeticoes: int = 20, aquecimento: int = 2) -> list:
+    """Chama `funcao()` `aquecimento` vezes sem medir e depois `repeticoes` vezes. Retorna as durações."""
+    for _ in range(aquecimento):
+        funcao()
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return tempos
+
+# =================================================================
+# Gravação
+# =================================================================
+
+def _commit_atual() -> Optional[str]:
+    try:
+        raiz = Path(__file__).resolve().parent.parent
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=raiz, capture_output=True, text=True, timeout=10
+        ).stdout.strip()
+        sujo = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"], cwd=raiz, capture_output=True, text=True, timeout=30
+        ).stdout.strip()
+        return f"{commit}+alterado" if commit and sujo else (commit or None)
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+def ambiente() -> dict:
+    """Commit, versões e banco usados na execução."""
+    import sqlalchemy
+    from database import engine
+
+    return {
+        "commit": _commit_atual(),
+        "quando": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "sqlalchemy": sqlalchemy.__version__,
+        "plataforma": platform.platform(),
+        "banco": engine.dialect.name,
+        "url": engine.url.render_as_string(hide_password=True),
+    }
+
+def salvar(nome: str, dados: dict, destino: Optional[str] = None) -> Path:
+    """Grava `dados` em JSON (em benchmarks/resultados/, se `destino` não for dado) e retorna o caminho."""
+    if destino:
+        caminho = Path(destino)
+    else:
+        PASTA_RESULTADOS.mkdir(parents=True, exist_ok=True)
+        ambiente_atual = dados.get("ambiente") or {}
+        commit = (ambiente_atual.get("commit") or "sem-commit").replace("+", "-")
+        caminho = PASTA_RESULTADOS / f"{nome}-{commit}-{datetime.now():%Y%m%d-%H%M%S}.json"
+    caminho.write_text(json.dumps(dados, ensure_ascii=False, indent=2, default=str), encoding="utf-8")
+    return caminho
+
+# =================================================================
+# Comparação
+# =================================================================
+
+def _medidas(dados: dict) -> dict:
+    """{nome: p50_ms} de um arquivo de resultados de qualquer um dos scripts."""
+    medidas = {}
+    for nome, resultado in (dados.get("benchmarks") or {}).items():
+        if isinstance(resultado, dict) and "p50_ms" in resultado:
+            medidas[nome] = resultado["p50_ms"]
+    for rodada in dados.get("rodadas") or []:
+        for passo, resultado in (rodada.get("passos") or {}).items():
+            if "p50_ms" in resultado:
+                medidas[f"{rodada['tecnicos']} técnicos / {passo}"] = resultado["p50_ms"]
+    for nome, resultado in (dados.get("medidas") or {}).items():
+        if isinstance(resultado, dict) and "p50_ms" in resultado:
+            medidas[nome] = resultado["p50_ms"]
+    return medidas
+
+def comparar(antes: dict, depois: dict, tolerancia: float = 0.2) -> list:
+    """
+    Compara a mediana (p50) de cada medida presente nos dois resultados.
+    Retorna [(nome, antes_ms, depois_ms, variação, regrediu)], com `regrediu`
+    verdadeiro quando o tempo aumentou mais que `tolerancia` (0.2 = 20%).
+    """
+    medidas_antes, medidas_depois = _medidas(antes), _medidas(depois)
+    linhas = []
+    for nome in sorted(medidas_antes.keys() & medidas_depois.keys()):
+        a, d = medidas_antes[nome], medidas_depois[nome]
+        variacao = (d - a) / a if a else 0.0
+        linhas.append((nome, a, d, variacao, variacao > tolerancia))
+    return linhas
+
+def _main():
+    parser = argparse.ArgumentParser(description="Compara dois arquivos de resultados de benchmark.")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    cmp = sub.add_parser("comparar", help="compara a mediana de cada medida")
+    cmp.add_argument("antes")
+    cmp.add_argument("depois")
+    cmp.add_argument("--tolerancia", type=float, default=0.2, help="aumento tolerado (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    antes = json.loads(Path(args.antes).read_text(encoding="utf-8"))
+    depois = json.loads(Path(args.depois).read_text(encoding="utf-8"))
+    linhas = comparar(antes, depois, args.tolerancia)
+    largura = max((len(nome) for nome, *_ in linhas), default=10)
+    print(f"{'medida':<{largura}}  {'antes':>10}  {'depois':>10}  variação")
+    for nome, a, d, variacao, regrediu in linhas:
+        marca = "  <-- REGRESSÃO" if regrediu else ""
+        print(f"{nome:<{largura}}  {a:>8.2f}ms  {d:>8.2f}ms  {variacao:+7.1%}{marca}")
+    regressoes = sum(1 for *_, regrediu in linhas if regrediu)
+    print(f"\n{len(linhas)} medidas comparadas, {regressoes} regressão(ões).")
+    sys.exit(1 if regressoes else 0)
+
+if __name__ == "__main__":
+    _main()
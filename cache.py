@@ -0,0 +1,245 @@
+# Arquivo: cache.py (cache de respostas das rotas de leitura)
+
+import os
+import json
+import time
+import pickle
+import hashlib
+import uuid
+import threading
+from collections import OrderedDict
+from itertools import chain
+from pathlib import Path
+from typing import Optional, Tuple
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+# =================================================================
+# Configuração
+# =================================================================
+# "memoria" (LRU em memória), "disco" ou "desligado"
+RESPONSE_CACHE_BACKEND = os.environ.get("RESPONSE_CACHE_BACKEND", "memoria").lower()
+RESPONSE_CACHE_MAX_ITENS = int(os.environ.get("RESPONSE_CACHE_MAX_ITENS", "512"))
+RESPONSE_CACHE_DIR = os.environ.get(
+    "RESPONSE_CACHE_DIR", str(Path(__file__).resolve().parent / ".cache" / "respostas")
+)
+# A invalidação acontece na própria instância; o TTL limita por quanto tempo
+# outra instância (ex: Cloud Run com várias réplicas) pode servir dado antigo.
+RESPONSE_CACHE_TTL_SECONDS = int(os.environ.get("RESPONSE_CACHE_TTL_SECONDS", "60"))
+
+# Tabelas das quais cada grupo de respostas depende
+TABELAS_POR_GRUPO = {
+    "areas": {"areas", "servicos"},
+    "pragas": {"pragas"},
+    "produtos": {"produtos"},
+    "dispositivos": {"dispositivos", "areas"},
+    "dashboard": {
+        "servicos", "servico_produto", "produtos", "dispositivos",
+        "resumo_mensal_servicos", "resumo_mensal_produtos", "resumo_dispositivos",
+    },
+    # Não guarda respostas: só marca a versão dos dados dos relatórios (ver tarefas.py)
+    "relatorios": {
+        "areas", "servicos", "servico_produto", "produtos", "dispositivos",
+        "contagens_pragas", "mip_registros", "servico_dispositivo_status",
+    },
+}
+
+_GRUPOS_POR_TABELA = {}
+for _grupo, _tabelas in TABELAS_POR_GRUPO.items():
+    for _tabela in _tabelas:
+        _GRUPOS_POR_TABELA.setdefault(_tabela, set()).add(_grupo)
+
+# Item guardado: (etag, corpo JSON, instante de expiração)
+ItemCache = Tuple[str, bytes, float]
+
+# =================================================================
+# Backends
+# =================================================================
+
+class BackendMemoriaLRU:
+    """Cache em memória com descarte do item usado há mais tempo."""
+
+    def __init__(self, max_itens: int = RESPONSE_CACHE_MAX_ITENS):
+        self.max_itens = max_itens
+        self._itens = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, grupo: str, chave: str) -> Optional[ItemCache]:
+        with self._lock:
+            item = self._itens.get((grupo, chave))
+            if item is None:
+                return None
+            if item[2] <= time.time():
+                del self._itens[(grupo, chave)]
+                return None
+            self._itens.move_to_end((grupo, chave))
+            return item
+
+    def set(self, grupo: str, chave: str, item: ItemCache):
+        with self._lock:
+            self._itens[(grupo, chave)] = item
+            self._itens.move_to_end((grupo, chave))
+            while len(self._itens) > self.max_itens:
+                self._itens.popitem(last=False)
+
+    def invalidar(self, grupo: str):
+        with self._lock:
+            for chave in [k for k in self._itens if k[0] == grupo]:
+                del self._itens[chave]
+
+
+class BackendDisco:
+    """Cache em arquivos: um diretório por grupo e um arquivo por chave."""
+
+    def __init__(self, diretorio: str = RESPONSE_CACHE_DIR):
+        self.diretorio = Path(diretorio)
+
+    def _arquivo(self, grupo: str, chave: str) -> Path:
+        return self.diretorio / grupo / (hashlib.sha1(chave.encode()).hexdigest() + ".cache")
+
+    def get(self, grupo: str, chave: str) -> Optional[ItemCache]:
+        arquivo = self._arquivo(grupo, chave)
+        try:
+            with open(arquivo, "rb") as f:
+                item = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+        if item[2] <= time.time():
+            arquivo.unlink(missing_ok=True)
+            return None
+        return item
+
+    def set(self, grupo: str, chave: str, item: ItemCache):
+        arquivo = self._arquivo(grupo, chave)
+        arquivo.parent.mkdir(parents=True, exist_ok=True)
+        # Grava em um arquivo temporário e troca, para nunca ler um arquivo pela metade
+        temporario = arquivo.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(temporario, "wb") as f:
+            pickle.dump(item, f)
+        os.replace(temporario, arquivo)
+
+    def invalidar(self, grupo: str):
+        pasta = self.diretorio / grupo
+        if not pasta.is_dir():
+            return
+        for arquivo in pasta.glob("*.cache"):
+            arquivo.unlink(missing_ok=True)
+
+
+def _criar_backend():
+    if RESPONSE_CACHE_BACKEND == "disco":
+        return BackendDisco()
+    if RESPONSE_CACHE_BACKEND == "memoria":
+        return BackendMemoriaLRU()
+    return None
+
+backend = _criar_backend()
+
+# =================================================================
+# Invalidação
+# =================================================================
+
+# Geração de cada grupo: muda a cada invalidação. Uma resposta gerada
+# enquanto o grupo era invalidado não é guardada (poderia estar desatualizada).
+_geracoes = {}
+_geracoes_lock = threading.Lock()
+
+# Identifica este processo: gerações de outro processo (ou de antes de um
+# reinício) nunca são confundidas com as daqui.
+_ID_PROCESSO = uuid.uuid4().hex
+
+def invalidar(*grupos: str):
+    """Descarta as respostas em cache dos grupos informados."""
+    for grupo in grupos:
+        with _geracoes_lock:
+            _geracoes[grupo] = _geracoes.get(grupo, 0) + 1
+        if backend is not None:
+            backend.invalidar(grupo)
+
+def versao_dos_dados(grupo: str) -> str:
+    """
+    Versão atual dos dados de um grupo neste processo: muda a cada commit que
+    altera uma das tabelas do grupo.
+    """
+    return f"{_ID_PROCESSO}:{_geracoes.get(grupo, 0)}"
+
+def invalidar_tabelas(tabelas):
+    """Descarta as respostas que dependem de alguma das tabelas informadas."""
+    grupos = set()
+    for tabela in tabelas:
+        grupos |= _GRUPOS_POR_TABELA.get(tabela, set())
+    invalidar(*grupos)
+
+# As escritas feitas por qualquer função do crud/ passam por uma Session.
+# Anotamos as tabelas alteradas durante a transação e invalidamos os grupos
+# só depois do commit, para que uma leitura concorrente não guarde o dado antigo.
+def _anotar_tabelas(session, tabelas):
+    session.info.setdefault("tabelas_alteradas", set()).update(tabelas)
+
+def _antes_do_flush(session, flush_context, instances):
+    _anotar_tabelas(session, {
+        obj.__tablename__
+        for obj in chain(session.new, session.dirty, session.deleted)
+        if hasattr(obj, "__tablename__")
+    })
+
+def _antes_de_executar(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        tabela = getattr(orm_execute_state.statement, "table", None)
+        if tabela is not None:
+            _anotar_tabelas(orm_execute_state.session, {tabela.name})
+
+def _depois_do_commit(session):
+    tabelas = session.info.pop("tabelas_alteradas", None)
+    if tabelas:
+        invalidar_tabelas(tabelas)
+
+def _depois_do_rollback(session):
+    session.info.pop("tabelas_alteradas", None)
+
+event.listen(Session, "before_flush", _antes_do_flush)
+event.listen(Session, "do_orm_execute", _antes_de_executar)
+event.listen(Session, "after_commit", _depois_do_commit)
+event.listen(Session, "after_rollback", _depois_do_rollback)
+
+# =================================================================
+# Resposta com cache e ETag
+# =================================================================
+
+def _etag_confere(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    candidatos = [c.strip() for c in if_none_match.split(",")]
+    return "*" in candidatos or etag in [c[2:] if c.startswith("W/") else c for c in candidatos]
+
+def _resposta(request: Request, etag: str, corpo: bytes) -> Response:
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if _etag_confere(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=corpo, media_type="application/json", headers=headers)
+
+async def responder_com_cache(request: Request, grupo: str, gerar) -> Response:
+    """
+    Devolve a resposta de uma rota de leitura a partir do cache, chaveado por
+    rota e parâmetros de consulta. `gerar` é chamada (e aguardada) só quando
+    não há item válido. Envia ETag e responde 304 se o cliente já tem a versão atual.
+    """
+    chave = request.url.path + "?" + "&".join(sorted(f"{k}={v}" for k, v in request.query_params.multi_items()))
+
+    item = backend.get(grupo, chave) if backend is not None else None
+    if item is not None:
+        return _resposta(request, item[0], item[1])
+
+    geracao = _geracoes.get(grupo, 0)
+    dados = await gerar()
+    corpo = json.dumps(
+        jsonable_encoder(dados), ensure_ascii=False, allow_nan=False, separators=(",", ":")
+    ).encode("utf-8")
+    etag = '"' + hashlib.sha1(corpo).hexdigest() + '"'
+    if backend is not None and _geracoes.get(grupo, 0) == geracao:
+        backend.set(grupo, chave, (etag, corpo, time.time() + RESPONSE_CACHE_TTL_SECONDS))
+    return _resposta(request, etag, corpo)
@@ -0,0 +1,199 @@
+# Arquivo: consultas_lentas.py (registro de consultas lentas com o plano de execução)
+
+import os
+import re
+import time
+import hashlib
+import threading
+from collections import deque, OrderedDict
+from datetime import datetime
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+import metricas
+
+# =================================================================
+# Configuração
+# =================================================================
+# Desligado por padrão. Com SLOW_QUERY_MS=200, toda consulta que passar de
+# 200 ms é registrada com os parâmetros, a rota que a fez e o plano
+# (EXPLAIN no PostgreSQL, EXPLAIN QUERY PLAN no SQLite), capturado uma vez
+# por "impressão digital" da consulta. Ver /api/sistema/consultas-lentas.
+SLOW_QUERY_MS = float(os.environ.get("SLOW_QUERY_MS", "0"))
+# Quantas ocorrências recentes guardar
+SLOW_QUERY_MAX_REGISTROS = int(os.environ.get("SLOW_QUERY_MAX_REGISTROS", "200"))
+# Quantas impressões digitais guardar; passando disso, sai a vista há mais tempo
+SLOW_QUERY_MAX_CONSULTAS = int(os.environ.get("SLOW_QUERY_MAX_CONSULTAS", "500"))
+SLOW_QUERY_EXPLAIN = os.environ.get("SLOW_QUERY_EXPLAIN", "1") == "1"
+# Tamanho máximo de cada parâmetro guardado (textos longos são cortados)
+_TAMANHO_MAXIMO_PARAMETRO = 200
+
+ROTA_SEGUNDO_PLANO = "(segundo plano)"
+
+# =================================================================
+# Impressão digital
+# =================================================================
+# A mesma consulta com outros valores deve cair na mesma impressão digital.
+# Os valores já vêm como marcadores (?, %s, $1, :nome), mas listas do IN
+# viram um marcador por item, LIMIT/OFFSET podem vir como números e SQL
+# montado à mão pode trazer textos literais.
+
+_MARCADOR = r"(?:\?|%s|%\(\w+\)s|\$\d+|:\w+|\d+)"
+_LISTA = re.compile(rf"\(\s*{_MARCADOR}(?:\s*,\s*{_MARCADOR})+\s*\)")
+_NUMERO = re.compile(r"\b\d+\b")
+_TEXTO = re.compile(r"'(?:[^']|'')*'")
+_ESPACOS = re.compile(r"\s+")
+
+def impressao_digital(sql: str) -> str:
+    normalizado = _ESPACOS.sub(" ", _NUMERO.sub("N", _LISTA.sub("(...)", _TEXTO.sub("S", sql)))).strip()
+    return hashlib.sha1(normalizado.encode("utf-8")).hexdigest()[:16]
+
+# =================================================================
+# Registro
+# =================================================================
+
+# {impressão digital: {"sql", "plano", "ocorrencias", "tempo_total_ms", "tempo_max_ms", "rotas", "ultima_vez"}},
+# da vista há mais tempo para a mais recente (no máximo SLOW_QUERY_MAX_CONSULTAS)
+_consultas = OrderedDict()
+# Ocorrências mais recentes, da mais antiga para a mais nova
+_recentes = deque(maxlen=SLOW_QUERY_MAX_REGISTROS)
+_lock = threading.Lock()
+
+def _parametros_para_registro(parametros):
+    def cortar(valor):
+        texto = repr(valor)
+        return texto if len(texto) <= _TAMANHO_MAXIMO_PARAMETRO else texto[:_TAMANHO_MAXIMO_PARAMETRO] + "..."
+    if isinstance(parametros, dict):
+        return {chave: cortar(valor) for chave, valor in parametros.items()}
+    if isinstance(parametros, (list, tuple)):
+        return [cortar(valor) for valor in parametros]
+    return cortar(parametros)
+
+def _capturar_plano(conn, statement: str, parameters) -> str:
+    """
+    Roda o EXPLAIN (sem ANALYZE: a consulta não é executada de novo) em um
+    cursor próprio da mesma conexão, com os mesmos parâmetros.
+    No PostgreSQL, um SAVEPOINT impede que uma falha aqui aborte a transação.
+    """
+    dialeto = conn.dialect.name
+    prefixo = "EXPLAIN QUERY PLAN " if dialeto == "sqlite" else "EXPLAIN "
+    cursor = conn.connection.dbapi_connection.cursor()
+    try:
+        if dialeto == "postgresql":
+            cursor.execute("SAVEPOINT sise_explain")
+        try:
+            cursor.execute(prefixo + statement, parameters)
+            linhas = cursor.fetchall()
+        except Exception as e:
+            if dialeto == "postgresql":
+                cursor.execute("ROLLBACK TO SAVEPOINT sise_explain")
+            return f"(não foi possível obter o plano: {e})"
+        if dialeto == "postgresql":
+            cursor.execute("RELEASE SAVEPOINT sise_explain")
+    finally:
+        cursor.close()
+
+    if dialeto == "sqlite":
+        # (id, parent, notused, detail): indenta cada passo sob o seu pai
+        niveis = {0: -1}
+        saida = []
+        for id_, pai, _, detalhe in linhas:
+            niveis[id_] = niveis.get(pai, -1) + 1
+            saida.append("  " * niveis[id_] + detalhe)
+        return "\n".join(saida)
+    return "\n".join(str(linha[0]) for linha in linhas)
+
+def _antes_da_consulta(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("consultas_lentas_inicio", []).append(time.perf_counter())
+
+def _depois_da_consulta(conn, cursor, statement, parameters, context, executemany):
+    inicios = conn.info.get("consultas_lentas_inicio")
+    if not inicios:
+        return
+    duracao_ms = (time.perf_counter() - inicios.pop()) * 1000
+    if duracao_ms < SLOW_QUERY_MS:
+        return
+
+    rota = metricas.rota_atual() or ROTA_SEGUNDO_PLANO
+    digital = impressao_digital(statement)
+    agora = datetime.now()
+    with _lock:
+        consulta = _consultas.get(digital)
+        capturar = consulta is None
+        if capturar:
+            consulta = _consultas[digital] = {
+                "sql": statement, "plano": None, "ocorrencias": 0, "tempo_total_ms": 0.0,
+                "tempo_max_ms": 0.0, "rotas": {}, "ultima_vez": agora,
+            }
+            while len(_consultas) > SLOW_QUERY_MAX_CONSULTAS:
+                _consultas.popitem(last=False)
+        else:
+            _consultas.move_to_end(digital)
+        consulta["ocorrencias"] += 1
+        consulta["tempo_total_ms"] += duracao_ms
+        consulta["tempo_max_ms"] = max(consulta["tempo_max_ms"], duracao_ms)
+        consulta["rotas"][rota] = consulta["rotas"].get(rota, 0) + 1
+        consulta["ultima_vez"] = agora
+        _recentes.append({
+            "impressao_digital": digital, "quando": agora, "tempo_ms": round(duracao_ms, 2), "rota": rota,
+            "parametros": None if executemany else _parametros_para_registro(parameters),
+        })
+
+    # O plano é capturado fora da trava, só pela primeira ocorrência de cada
+    # impressão digital; executemany e comandos que não são SELECT ficam sem plano
+    if capturar and SLOW_QUERY_EXPLAIN and not executemany:
+        comando = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ""
+        if comando in ("SELECT", "WITH"):
+            plano = _capturar_plano(conn, statement, parameters)
+        else:
+            plano = f"(plano capturado só para SELECT; comando: {comando})"
+        with _lock:
+            consulta["plano"] = plano
+
+def _consulta_falhou(contexto_da_excecao):
+    # Sem o after_cursor_execute, o início empilhado ficaria para trás
+    inicios = contexto_da_excecao.connection is not None and \
+        contexto_da_excecao.connection.info.get("consultas_lentas_inicio")
+    if inicios:
+        inicios.pop()
+
+def ativo() -> bool:
+    return SLOW_QUERY_MS > 0
+
+def instrumentar_engine(engine: Engine):
+    """Liga o registro de consultas lentas em uma engine (síncrona ou `async_engine.sync_engine`), se SLOW_QUERY_MS > 0."""
+    if ativo() and not event.contains(engine, "before_cursor_execute", _antes_da_consulta):
+        event.listen(engine, "before_cursor_execute", _antes_da_consulta)
+        event.listen(engine, "after_cursor_execute", _depois_da_consulta)
+        event.listen(engine, "handle_error", _consulta_falhou)
+
+# =================================================================
+# Consulta do registro
+# =================================================================
+
+def resumo(limite: int = 50) -> dict:
+    """As consultas lentas (mais lentas primeiro) e as ocorrências mais recentes."""
+    with _lock:
+        consultas = sorted(
+            ({"impressao_digital": digital, **consulta, "rotas": dict(consulta["rotas"])}
+             for digital, consulta in _consultas.items()),
+            key=lambda consulta: consulta["tempo_max_ms"], reverse=True
+        )[:limite]
+        recentes = list(_recentes)[-limite:][::-1]
+    for consulta in consultas:
+        consulta["tempo_total_ms"] = round(consulta["tempo_total_ms"], 2)
+        consulta["tempo_max_ms"] = round(consulta["tempo_max_ms"], 2)
+        consulta["tempo_medio_ms"] = round(consulta["tempo_total_ms"] / consulta["ocorrencias"], 2)
+    return {
+        "ativo": ativo(),
+        "limite_ms": SLOW_QUERY_MS,
+        "consultas": consultas,
+        "recentes": recentes,
+    }
+
+def limpar():
+    """Esquece as consultas registradas (os planos serão capturados de novo)."""
+    with _lock:
+        _consultas.clear()
+        _recentes.clear()
@@ -2,12 +2,12 @@
 
 # Importa as ferramentas que precisamos
 from database import SessionLocal, engine
-import models, schemas, security
+import schemas, security, migracoes
 from crud import crud_usuario
 
 # Garante que as tabelas existam no banco de dados
 print("Inicializando... Garantindo que as tabelas existem.")
-models.Base.metadata.create_all(bind=engine)
+migracoes.preparar_esquema(engine)
 print("Tabelas prontas.")
 
 # Cria uma sessão com o banco de dados
@@ -0,0 +1,56 @@
+# Arquivo: crud/carregamento.py
+
+from typing import Optional
+
+from sqlalchemy.orm import joinedload, selectinload
+
+# =================================================================
+# Estratégias de carregamento dos relacionamentos
+# =================================================================
+# Os esquemas de resposta (from_attributes) percorrem os relacionamentos dos
+# objetos; o que não foi carregado junto vira uma consulta por objeto (N+1).
+# Cada listagem declara aqui os caminhos que o seu esquema percorre:
+#
+#     OPCOES_SERVICO = carregamento.opcoes_de_carga(
+#         models.Servico.area,
+#         (models.Servico.produtos_associados, models.ServicoProdutoAssociado.produto),
+#     )
+#
+# e a estratégia sai do tipo do relacionamento:
+# - muitos-para-um (area, produto): joinedload, um JOIN na mesma consulta;
+# - coleções (produtos_associados): selectinload, uma consulta extra com
+#   `WHERE ... IN (...)` para todos os objetos da página. Um JOIN em coleção
+#   repetiria cada linha pai uma vez por filho (e não combina com LIMIT).
+# Assim o número de consultas depende só do número de caminhos, não de linhas.
+
+SELECTIN = "selectin"
+JOINED = "joined"
+
+_ESTRATEGIAS = {SELECTIN: selectinload, JOINED: joinedload}
+
+def estrategia_para(relacionamento) -> str:
+    """SELECTIN para coleções e JOINED para muitos-para-um."""
+    return SELECTIN if relacionamento.property.uselist else JOINED
+
+def _opcao(caminho, estrategia: Optional[str]):
+    if not isinstance(caminho, (tuple, list)):
+        caminho = (caminho,)
+    opcao = None
+    for relacionamento in caminho:
+        nome = estrategia or estrategia_para(relacionamento)
+        if nome not in _ESTRATEGIAS:
+            raise ValueError(f"Estratégia de carregamento desconhecida: '{nome}'.")
+        if opcao is None:
+            opcao = _ESTRATEGIAS[nome](relacionamento)
+        else:
+            opcao = getattr(opcao, f"{nome}load")(relacionamento)
+    return opcao
+
+def opcoes_de_carga(*caminhos, estrategia: Optional[str] = None) -> tuple:
+    """
+    Monta as opções de carregamento (para `.options(*...)`) dos caminhos
+    informados. Cada caminho é um relacionamento ou uma tupla deles, do objeto
+    consultado para dentro. `estrategia` (SELECTIN ou JOINED) força a mesma
+    estratégia em todos os níveis, para o endpoint que precisar.
+    """
+    return tuple(_opcao(caminho, estrategia) for caminho in caminhos)
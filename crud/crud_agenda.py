@@ -4,7 +4,14 @@ from sqlalchemy.orm import Session
 import models
 import schemas
 from typing import List, Optional
-from sqlalchemy import extract
+from sqlalchemy import literal_column, select, union_all, String
+
+from .periodos import filtro_mes
+from . import carregamento
+
+# O que os schemas.Agendamento e schemas.Ocorrencia percorrem (ver crud/carregamento.py)
+OPCOES_AGENDAMENTO = carregamento.opcoes_de_carga(models.Agendamento.area, models.Agendamento.responsavel)
+OPCOES_OCORRENCIA = carregamento.opcoes_de_carga(models.Ocorrencia.area, models.Ocorrencia.registrado_por)
 
 # =================================================================
 # Funções CRUD para Agendamentos
@@ -28,9 +35,8 @@ def get_agendamento_by_id(db: Session, agendamento_id: int) -> Optional[models.A
 
 def get_agendamentos(db: Session, year: int, month: int, skip: int = 0, limit: int = 100) -> List[models.Agendamento]:
     """ Busca uma lista de agendamentos, filtrando por ano e mês. """
-    query = db.query(models.Agendamento).filter(
-        extract('year', models.Agendamento.data_agendamento) == year,
-        extract('month', models.Agendamento.data_agendamento) == month
+    query = db.query(models.Agendamento).options(*OPCOES_AGENDAMENTO).filter(
+        filtro_mes(models.Agendamento.data_agendamento, year, month)
     )
     return query.order_by(models.Agendamento.data_agendamento).offset(skip).limit(limit).all()
 
@@ -81,9 +87,8 @@ def get_ocorrencia_by_id(db: Session, ocorrencia_id: int) -> Optional[models.Oco
 
 def get_ocorrencias(db: Session, year: int, month: int, skip: int = 0, limit: int = 100) -> List[models.Ocorrencia]:
     """ Busca uma lista de ocorrências, filtrando por ano e mês. """
-    query = db.query(models.Ocorrencia).filter(
-        extract('year', models.Ocorrencia.data_ocorrencia) == year,
-        extract('month', models.Ocorrencia.data_ocorrencia) == month
+    query = db.query(models.Ocorrencia).options(*OPCOES_OCORRENCIA).filter(
+        filtro_mes(models.Ocorrencia.data_ocorrencia, year, month)
     )
     return query.order_by(models.Ocorrencia.data_ocorrencia).offset(skip).limit(limit).all()
 
@@ -108,4 +113,51 @@ def delete_ocorrencia(db: Session, ocorrencia_id: int) -> Optional[models.Ocorre
     if db_ocorrencia:
         db.delete(db_ocorrencia)
         db.commit()
-    return db_ocorrencia
\ No newline at end of file
+    return db_ocorrencia
+
+
+# =================================================================
+# Consulta unificada para o Calendário
+# =================================================================
+
+def get_eventos_calendario(db: Session, year: int, month: int):
+    """
+    Busca serviços, ocorrências e agendamentos de um mês em uma única
+    consulta (UNION ALL), já trazendo o nome da área de cada evento.
+    Evita uma consulta extra por evento ao acessar `.area.nome`.
+    """
+    servicos = select(
+        models.Servico.id.label("id"),
+        models.Servico.data.label("data"),
+        models.Servico.descricao.label("descricao"),
+        models.Servico.status.label("status"),
+        literal_column("'servico'", String).label("tipo"),
+        models.Area.nome.label("area_nome"),
+    ).outerjoin(models.Area, models.Servico.area_id == models.Area.id).where(
+        filtro_mes(models.Servico.data, year, month)
+    )
+
+    ocorrencias = select(
+        models.Ocorrencia.id,
+        models.Ocorrencia.data_ocorrencia,
+        models.Ocorrencia.descricao,
+        models.Ocorrencia.status,
+        literal_column("'ocorrencia'", String),
+        models.Area.nome,
+    ).outerjoin(models.Area, models.Ocorrencia.area_id == models.Area.id).where(
+        filtro_mes(models.Ocorrencia.data_ocorrencia, year, month)
+    )
+
+    agendamentos = select(
+        models.Agendamento.id,
+        models.Agendamento.data_agendamento,
+        models.Agendamento.tipo_servico,
+        models.Agendamento.status,
+        literal_column("'agendamento'", String),
+        models.Area.nome,
+    ).outerjoin(models.Area, models.Agendamento.area_id == models.Area.id).where(
+        filtro_mes(models.Agendamento.data_agendamento, year, month)
+    )
+
+    eventos = union_all(servicos, ocorrencias, agendamentos).subquery()
+    return db.execute(select(eventos).order_by(eventos.c.data, eventos.c.tipo, eventos.c.id)).all()
@@ -1,12 +1,12 @@
 # Arquivo: crud/crud_area.py
 
 from sqlalchemy.orm import Session
-from sqlalchemy import extract, func, case
-from datetime import date
+from sqlalchemy import func, case
 from typing import List # ✅ ADICIONE ESTA LINHA
 import models
 import schemas
 from collections import defaultdict # Garanta que esta também esteja aqui
+from .periodos import filtro_mes_atual
 
 
 # =================================================================
@@ -26,16 +26,13 @@ def get_areas(db: Session) -> List[models.Area]:
     Retorna uma lista de todas as áreas, e para cada uma, calcula
     o número de visitas de rotina no mês atual.
     """
-    hoje = date.today()
-
     # Subquery para contar os serviços de rotina para cada área no mês atual
     subquery = db.query(
         models.Servico.area_id,
         func.count(models.Servico.id).label("visitas_no_mes")
     ).filter(
         models.Servico.tipo_atividade == "Visita de Rotina",
-        extract('year', models.Servico.data) == hoje.year,
-        extract('month', models.Servico.data) == hoje.month
+        filtro_mes_atual(models.Servico.data)
     ).group_by(models.Servico.area_id).subquery()
 
     # Query principal que busca todas as áreas e junta com a contagem
@@ -1,27 +1,22 @@
 # Em crud/crud_dashboard.py
 from sqlalchemy.orm import Session
-from sqlalchemy import extract, func, case
 from datetime import date
-import models
-from collections import defaultdict
+from . import crud_resumos
 
 def get_dashboard_summary(db: Session):
+    """
+    Monta o resumo do Dashboard a partir das tabelas pré-agregadas
+    (crud_resumos), lendo poucas linhas qualquer que seja o histórico.
+    """
     hoje = date.today()
 
-    # Dados de Serviços e Produtos (Lógica existente)
-    servicos_no_mes = db.query(func.count(models.Servico.id)).filter(extract('year', models.Servico.data) == hoje.year, extract('month', models.Servico.data) == hoje.month).scalar() or 0
-    produtos_usados_query = db.query(models.Produto.nome, func.sum(models.ServicoProdutoAssociado.quantidade_usada).label('total_usado'), models.Produto.unidade_uso).join(models.ServicoProdutoAssociado).join(models.Servico).filter(extract('year', models.Servico.data) == hoje.year, extract('month', models.Servico.data) == hoje.month).group_by(models.Produto.id).order_by(func.sum(models.ServicoProdutoAssociado.quantidade_usada).desc()).limit(5).all()
+    # Dados de Serviços e Produtos
+    servicos_no_mes = crud_resumos.get_servicos_no_mes(db, hoje.year, hoje.month)
+    produtos_usados_query = crud_resumos.get_produtos_usados_no_mes(db, hoje.year, hoje.month, limite=5)
     produtos_usados_no_mes = [{"nome": n, "total_usado": t, "unidade_uso": u} for n, t, u in produtos_usados_query]
 
     # ✅ LÓGICA DE DISPOSITIVOS ADICIONADA DE VOLTA
-    contagem_dispositivos = db.query(
-        models.Dispositivo.tipo,
-        models.Dispositivo.status,
-        func.count(models.Dispositivo.id).label('contagem')
-    ).group_by(models.Dispositivo.tipo, models.Dispositivo.status).all()
-    dispositivos_summary = defaultdict(lambda: defaultdict(int))
-    for tipo, status, contagem in contagem_dispositivos:
-        dispositivos_summary[tipo][status] = contagem
+    dispositivos_summary = crud_resumos.get_dispositivos_por_tipo_e_status(db)
 
     # RETORNO COMPLETO
     return {
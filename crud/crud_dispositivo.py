@@ -1,6 +1,8 @@
 # Arquivo: crud/crud_dispositivo.py
 
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, contains_eager
+from sqlalchemy.sql import Select
+from sqlalchemy import select, insert, update, delete
 from typing import Optional, List
 
 import models
@@ -8,6 +10,7 @@ import schemas
 
 # ✅ Importamos a função de outro módulo crud para reutilizar o código!
 from .crud_area import get_area_by_name
+from . import crud_resumos, carregamento
 
 # =================================================================
 # Funções CRUD para Dispositivos
@@ -17,19 +20,36 @@ def get_dispositivo(db: Session, dispositivo_id: int):
     """Busca um único dispositivo pelo seu ID."""
     return db.query(models.Dispositivo).filter(models.Dispositivo.id == dispositivo_id).first()
 
-def get_dispositivos(db: Session, area_id: Optional[int] = None, tipo: Optional[str] = None):
-    """Busca todos os dispositivos, com filtros opcionais por área e tipo."""
-    query = db.query(models.Dispositivo).join(models.Area).order_by(models.Area.nome, models.Dispositivo.numero)
+# Ordem estável da listagem paginada (ver crud/paginacao.py). Segue o índice
+# (area_id, numero) em vez do nome da área, para não ordenar a tabela a cada página.
+CHAVES_DISPOSITIVOS = (
+    (models.Dispositivo.area_id, False), (models.Dispositivo.numero, False), (models.Dispositivo.id, False)
+)
+
+# O que o schemas.Dispositivo percorre (ver crud/carregamento.py)
+OPCOES_DISPOSITIVO = carregamento.opcoes_de_carga(models.Dispositivo.area)
+
+def query_dispositivos(area_id: Optional[int] = None, tipo: Optional[str] = None) -> Select:
+    """Monta o SELECT dos dispositivos com os filtros opcionais, sem ordenação."""
+    consulta = select(models.Dispositivo)
     if area_id:
-        query = query.filter(models.Dispositivo.area_id == area_id)
+        consulta = consulta.where(models.Dispositivo.area_id == area_id)
     if tipo:
-        query = query.filter(models.Dispositivo.tipo == tipo)
-    return query.all()
+        consulta = consulta.where(models.Dispositivo.tipo == tipo)
+    return consulta
+
+def get_dispositivos(db: Session, area_id: Optional[int] = None, tipo: Optional[str] = None):
+    """Busca todos os dispositivos, com filtros opcionais por área e tipo."""
+    consulta = query_dispositivos(area_id, tipo).join(models.Area)\
+        .options(contains_eager(models.Dispositivo.area))\
+        .order_by(models.Area.nome, models.Dispositivo.numero)
+    return db.scalars(consulta).all()
 
 def create_dispositivo(db: Session, dispositivo: schemas.DispositivoCreate):
     """Cria um novo dispositivo individual."""
     db_dispositivo = models.Dispositivo(**dispositivo.dict())
     db.add(db_dispositivo)
+    crud_resumos.registrar_dispositivos(db, dispositivo.tipo, dispositivo.status, 1)
     db.commit()
     db.refresh(db_dispositivo)
     return db_dispositivo
@@ -40,9 +60,11 @@ def update_dispositivo(db: Session, dispositivo_id: int, dispositivo_data: schem
     if not db_dispositivo:
         return None
         
+    crud_resumos.registrar_dispositivos(db, db_dispositivo.tipo, db_dispositivo.status, -1)
     update_data = dispositivo_data.dict(exclude_unset=True)
     for key, value in update_data.items():
         setattr(db_dispositivo, key, value)
+    crud_resumos.registrar_dispositivos(db, db_dispositivo.tipo, db_dispositivo.status, 1)
         
     db.commit()
     db.refresh(db_dispositivo)
@@ -52,14 +74,22 @@ def delete_dispositivo(db: Session, dispositivo_id: int):
     """Deleta um dispositivo."""
     db_dispositivo = get_dispositivo(db, dispositivo_id)
     if db_dispositivo:
+        crud_resumos.registrar_dispositivos(db, db_dispositivo.tipo, db_dispositivo.status, -1)
+        crud_resumos.desvincular_contagens(db, dispositivo_id=dispositivo_id)
         db.delete(db_dispositivo)
         db.commit()
         return {"ok": True}
     return None
 
+# Números por consulta ao reler um lote no SQLite sem RETURNING
+NUMEROS_POR_CONSULTA = 500
+
 def create_dispositivos_em_lote(db: Session, lote_info: schemas.DispositivoLoteCreate):
-    """Cria múltiplos dispositivos em uma única transação."""
-    novos_dispositivos = []
+    """
+    Cria múltiplos dispositivos em uma única transação.
+    Os números já existentes são buscados em uma consulta só e os novos são
+    gravados com um único INSERT em lote, qualquer que seja o tamanho da faixa.
+    """
     if lote_info.numero_inicio > lote_info.numero_fim:
         raise ValueError("O número inicial não pode ser maior que o número final.")
         
@@ -67,48 +97,102 @@ def create_dispositivos_em_lote(db: Session, lote_info: schemas.DispositivoLoteC
     area_obj = get_area_by_name(db, nome=lote_info.area)
     if not area_obj:
         raise ValueError(f"Área '{lote_info.area}' não foi encontrada. Cadastre a área primeiro.")
-        
-    for i in range(lote_info.numero_inicio, lote_info.numero_fim + 1):
-        existe = db.query(models.Dispositivo).filter(
+
+    numeros_existentes = set(db.scalars(
+        select(models.Dispositivo.numero).where(
             models.Dispositivo.area_id == area_obj.id,
-            models.Dispositivo.numero == str(i),
             models.Dispositivo.tipo == lote_info.tipo
-        ).first()
-        
-        if not existe:
-            descricao = lote_info.descricao_base or f"{lote_info.tipo} na área {lote_info.area}"
-            db_dispositivo = models.Dispositivo(
-                numero=str(i),
-                tipo=lote_info.tipo,
-                area_id=area_obj.id,
-                descricao=descricao,
-                status=lote_info.status
-            )
-            db.add(db_dispositivo)
-            novos_dispositivos.append(db_dispositivo)
+        )
+    ))
+    descricao = lote_info.descricao_base or f"{lote_info.tipo} na área {lote_info.area}"
+    valores = [
+        {
+            "numero": str(i),
+            "tipo": lote_info.tipo,
+            "area_id": area_obj.id,
+            "descricao": descricao,
+            "status": lote_info.status,
+        }
+        for i in range(lote_info.numero_inicio, lote_info.numero_fim + 1)
+        if str(i) not in numeros_existentes
+    ]
             
-    if not novos_dispositivos:
+    if not valores:
         raise ValueError("Nenhum dispositivo novo para criar (talvez todos já existam para esta área).")
+
+    if db.get_bind().dialect.insert_executemany_returning:
+        # INSERT ... RETURNING (PostgreSQL e SQLite >= 3.35): os objetos criados
+        # voltam do próprio INSERT, sem uma segunda consulta
+        novos_dispositivos = list(db.scalars(insert(models.Dispositivo).returning(models.Dispositivo), valores))
+    else:
+        # SQLite antigo: executemany e as linhas novas relidas pelos números, em
+        # partes para não passar do limite de parâmetros do SQLite (999 antes da 3.32)
+        db.execute(insert(models.Dispositivo.__table__), valores)
+        numeros = [v["numero"] for v in valores]
+        novos_dispositivos = []
+        for inicio in range(0, len(numeros), NUMEROS_POR_CONSULTA):
+            novos_dispositivos += db.scalars(
+                select(models.Dispositivo).where(
+                    models.Dispositivo.area_id == area_obj.id,
+                    models.Dispositivo.tipo == lote_info.tipo,
+                    models.Dispositivo.numero.in_(numeros[inicio:inicio + NUMEROS_POR_CONSULTA])
+                )
+            ).all()
+        novos_dispositivos.sort(key=lambda dispositivo: dispositivo.id)
         
+    crud_resumos.registrar_dispositivos(db, lote_info.tipo, lote_info.status, len(novos_dispositivos))
     db.commit()
-    for disp in novos_dispositivos:
-        db.refresh(disp)
-        
     return novos_dispositivos
 
-def atualizar_status_dispositivos(db: Session, servico_id: int, status_updates: List[schemas.DispositivoStatusUpdate]):
-    """Cria registros históricos de status de dispositivos para um serviço."""
-    db.query(models.ServicoDispositivoStatus).filter(models.ServicoDispositivoStatus.servico_id == servico_id).delete()
+def atualizar_status_dispositivos(
+    db: Session, servico_id: int, status_updates: List[schemas.DispositivoStatusUpdate], parcial: bool = False
+) -> dict:
+    """
+    Grava os status de dispositivos verificados em um serviço, escrevendo só o que mudou.
+    Com `parcial=False` (PUT) a lista recebida é a lista completa e os registros que
+    ficaram de fora são removidos; com `parcial=True` (PATCH) só os itens enviados são tocados.
+    Retorna quantos registros foram inseridos, atualizados, removidos e mantidos.
+    """
+    servico_existe = db.query(models.Servico.id).filter(models.Servico.id == servico_id).with_for_update().first()
+    if not servico_existe:
+        raise ValueError(f"Serviço com ID {servico_id} não encontrado.")
 
-    lista_retorno = []
-    for update in status_updates:
-        db_status = models.ServicoDispositivoStatus(
-            servico_id=servico_id,
-            dispositivo_id=update.dispositivo_id,
-            status_registrado=update.status
-        )
-        db.add(db_status)
-        lista_retorno.append(db_status)
+    gravados = dict(db.query(
+        models.ServicoDispositivoStatus.dispositivo_id, models.ServicoDispositivoStatus.status_registrado
+    ).filter(models.ServicoDispositivoStatus.servico_id == servico_id).all())
+    # Se o mesmo dispositivo vier repetido, vale o último status
+    recebidos = {update.dispositivo_id: update.status for update in status_updates}
+
+    inserir = [
+        {"servico_id": servico_id, "dispositivo_id": dispositivo_id, "status_registrado": status_registrado}
+        for dispositivo_id, status_registrado in recebidos.items() if dispositivo_id not in gravados
+    ]
+    atualizar = [
+        {"servico_id": servico_id, "dispositivo_id": dispositivo_id, "status_registrado": status_registrado}
+        for dispositivo_id, status_registrado in recebidos.items()
+        if dispositivo_id in gravados and gravados[dispositivo_id] != status_registrado
+    ]
+    remover = [] if parcial else [dispositivo_id for dispositivo_id in gravados if dispositivo_id not in recebidos]
+
+    if inserir:
+        ids_novos = [item["dispositivo_id"] for item in inserir]
+        encontrados = set(db.scalars(select(models.Dispositivo.id).where(models.Dispositivo.id.in_(ids_novos))))
+        faltando = sorted(set(ids_novos) - encontrados)
+        if faltando:
+            raise ValueError(f"Dispositivo(s) não encontrado(s): {', '.join(map(str, faltando))}.")
+        db.execute(insert(models.ServicoDispositivoStatus), inserir)
+    if atualizar:
+        db.execute(update(models.ServicoDispositivoStatus), atualizar)
+    if remover:
+        db.execute(delete(models.ServicoDispositivoStatus).where(
+            models.ServicoDispositivoStatus.servico_id == servico_id,
+            models.ServicoDispositivoStatus.dispositivo_id.in_(remover)
+        ))
     
     db.commit()
-    return lista_retorno
\ No newline at end of file
+    return {
+        "inseridos": len(inserir),
+        "atualizados": len(atualizar),
+        "removidos": len(remover),
+        "inalterados": len(recebidos) - len(inserir) - len(atualizar),
+    }
\ No newline at end of file
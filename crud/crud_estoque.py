@@ -0,0 +1,110 @@
+# Arquivo: crud/crud_estoque.py
+
+import os
+from sqlalchemy.orm import Session
+from sqlalchemy import func, select, insert
+from datetime import datetime, date, time, timedelta
+from typing import Optional
+
+import models
+
+# A cada quantos movimentos de um produto um novo snapshot é gravado.
+# Limita quantos movimentos precisam ser somados para saber o estoque em um instante.
+MOVIMENTOS_POR_SNAPSHOT = int(os.environ.get("ESTOQUE_MOVIMENTOS_POR_SNAPSHOT", "200"))
+
+# =================================================================
+# Gravação no livro de movimentos
+# =================================================================
+# Toda função que altera Produto.estoque_atual registra aqui o mesmo delta,
+# na mesma transação. O livro só recebe inserções.
+
+def registrar_movimentos(db: Session, deltas: dict, origem: str, servico_id: Optional[int] = None):
+    """
+    Grava um movimento por produto em `deltas` ({produto_id: quantidade}, negativa
+    na saída) e cria os snapshots dos produtos que acumularam movimentos suficientes.
+    """
+    agora = datetime.now()
+    movimentos = [
+        {"produto_id": produto_id, "momento": agora, "quantidade": quantidade, "origem": origem, "servico_id": servico_id}
+        for produto_id, quantidade in deltas.items() if quantidade
+    ]
+    if not movimentos:
+        return
+    db.execute(insert(models.MovimentoEstoque), movimentos)
+    _gravar_snapshots_pendentes(db, [m["produto_id"] for m in movimentos])
+
+def _gravar_snapshots_pendentes(db: Session, produto_ids: list):
+    """Grava um snapshot para cada produto com MOVIMENTOS_POR_SNAPSHOT movimentos desde o último."""
+    movimento = models.MovimentoEstoque
+    snapshot = models.SnapshotEstoque
+    ultimo_snapshot = select(
+        snapshot.produto_id, func.max(snapshot.movimento_id).label("movimento_id")
+    ).where(snapshot.produto_id.in_(produto_ids)).group_by(snapshot.produto_id).subquery()
+
+    pendentes = db.execute(
+        select(movimento.produto_id, func.max(movimento.id), func.max(movimento.momento), models.Produto.estoque_atual)
+        .join(models.Produto, models.Produto.id == movimento.produto_id)
+        .outerjoin(ultimo_snapshot, ultimo_snapshot.c.produto_id == movimento.produto_id)
+        .where(movimento.produto_id.in_(produto_ids), movimento.id > func.coalesce(ultimo_snapshot.c.movimento_id, 0))
+        .group_by(movimento.produto_id, models.Produto.estoque_atual)
+        .having(func.count(movimento.id) >= MOVIMENTOS_POR_SNAPSHOT)
+    ).all()
+    if pendentes:
+        # O estoque_atual já inclui os movimentos desta transação, pois as linhas
+        # dos produtos foram alteradas (e travadas) antes de chegar aqui.
+        db.execute(insert(snapshot), [
+            {"produto_id": produto_id, "movimento_id": movimento_id, "momento": momento, "estoque": estoque}
+            for produto_id, movimento_id, momento, estoque in pendentes
+        ])
+
+def garantir_livro_estoque(db: Session) -> int:
+    """
+    Registra um movimento de saldo inicial para os produtos que ainda não têm
+    nenhum movimento (ex: produtos cadastrados antes do livro existir).
+    O estoque desses produtos antes do saldo inicial é considerado zero.
+    Retorna quantos produtos foram registrados.
+    """
+    sem_movimento = db.query(models.Produto.id, models.Produto.estoque_atual).filter(
+        ~select(models.MovimentoEstoque.id).where(
+            models.MovimentoEstoque.produto_id == models.Produto.id
+        ).exists()
+    ).all()
+    if not sem_movimento:
+        return 0
+    registrar_movimentos(db, {produto_id: estoque or 0.0 for produto_id, estoque in sem_movimento}, "saldo_inicial")
+    db.commit()
+    return len(sem_movimento)
+
+# =================================================================
+# Consultas históricas
+# =================================================================
+
+def get_estoque_em(db: Session, produto_id: int, momento: datetime) -> float:
+    """
+    Estoque de um produto em um instante: o último snapshot até `momento`
+    mais os movimentos gravados depois dele (no máximo MOVIMENTOS_POR_SNAPSHOT).
+    """
+    movimento = models.MovimentoEstoque
+    snapshot = db.query(models.SnapshotEstoque).filter(
+        models.SnapshotEstoque.produto_id == produto_id,
+        models.SnapshotEstoque.momento <= momento
+    ).order_by(models.SnapshotEstoque.momento.desc(), models.SnapshotEstoque.movimento_id.desc()).first()
+
+    query = db.query(func.coalesce(func.sum(movimento.quantidade), 0.0)).filter(
+        movimento.produto_id == produto_id,
+        movimento.momento <= momento
+    )
+    if snapshot is None:
+        return query.scalar()
+    return snapshot.estoque + query.filter(
+        movimento.momento >= snapshot.momento,
+        movimento.id > snapshot.movimento_id
+    ).scalar()
+
+def get_movimentos(db: Session, produto_id: int, data_inicio: date, data_fim: date):
+    """Movimentos de um produto entre duas datas (inclusive), em ordem cronológica."""
+    return db.query(models.MovimentoEstoque).filter(
+        models.MovimentoEstoque.produto_id == produto_id,
+        models.MovimentoEstoque.momento >= datetime.combine(data_inicio, time.min),
+        models.MovimentoEstoque.momento < datetime.combine(data_fim + timedelta(days=1), time.min)
+    ).order_by(models.MovimentoEstoque.momento, models.MovimentoEstoque.id).all()
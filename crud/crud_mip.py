@@ -1,10 +1,17 @@
 # Arquivo: crud/crud_mip.py
 
 from sqlalchemy.orm import Session
+from sqlalchemy import insert, update, delete, func
 from typing import List
+from collections import defaultdict
+from datetime import date
 
 import models
 import schemas
+from . import crud_resumos
+
+class ContagemInvalida(ValueError):
+    """Contagem com armadilha AL ou praga que não está cadastrada (erro nos dados enviados)."""
 
 # =================================================================
 # Funções CRUD para Pragas
@@ -30,6 +37,7 @@ def delete_praga(db: Session, praga_id: int):
     """Deleta um tipo de praga."""
     db_praga = db.query(models.Praga).filter(models.Praga.id == praga_id).first()
     if db_praga:
+        crud_resumos.desvincular_contagens(db, praga_id=praga_id)
         db.delete(db_praga)
         db.commit()
         return {"ok": True}
@@ -40,44 +48,158 @@ def delete_praga(db: Session, praga_id: int):
 # =================================================================
 
 def get_mip_data_for_servico(db: Session, servico_id: int):
-    """Busca todos os registros MIP e de Contagem para um serviço específico."""
+    """
+    Busca todos os registros MIP e de Contagem para um serviço específico.
+    O número e o nome vêm do dispositivo e da praga atuais; o texto gravado na
+    contagem só é usado se eles tiverem sido excluídos.
+    """
     ocorrencias = db.query(models.MIPRegistro).filter(models.MIPRegistro.servico_id == servico_id).all()
-    contagens = db.query(models.ContagemPraga).filter(models.ContagemPraga.servico_id == servico_id).all()
+    contagens = db.query(
+        models.ContagemPraga.id,
+        models.ContagemPraga.servico_id,
+        models.ContagemPraga.dispositivo_id,
+        models.ContagemPraga.praga_id,
+        func.coalesce(models.Dispositivo.numero, models.ContagemPraga.dispositivo_numero).label("dispositivo_numero"),
+        func.coalesce(models.Praga.nome, models.ContagemPraga.praga_nome).label("praga_nome"),
+        models.ContagemPraga.quantidade
+    ).outerjoin(models.Dispositivo, models.ContagemPraga.dispositivo_id == models.Dispositivo.id)\
+     .outerjoin(models.Praga, models.ContagemPraga.praga_id == models.Praga.id)\
+     .filter(models.ContagemPraga.servico_id == servico_id)\
+     .order_by(models.ContagemPraga.id).all()
     return {"ocorrencias": ocorrencias, "contagens": contagens}
 
+def _resolver_dispositivos_e_pragas(db: Session, area_id: int, contagens: list):
+    """
+    Converte os números de dispositivo (armadilhas AL da área, as únicas da
+    grade de contagem) e os nomes de praga das contagens em IDs, com uma
+    consulta para cada. Lança ContagemInvalida se algum não estiver cadastrado.
+    """
+    if not contagens:
+        return {}, {}
+    numeros = {c.dispositivo_numero for c in contagens}
+    nomes = {c.praga_nome for c in contagens}
+
+    # Números de AL repetidos na área: fica a mais antiga (menor ID)
+    dispositivo_ids = {
+        numero: dispositivo_id for dispositivo_id, numero in db.query(models.Dispositivo.id, models.Dispositivo.numero)
+        .filter(
+            models.Dispositivo.area_id == area_id,
+            models.Dispositivo.tipo == models.Dispositivo.TIPO_CONTAGEM,
+            models.Dispositivo.numero.in_(numeros)
+        )
+        .order_by(models.Dispositivo.id.desc())
+    }
+    praga_ids = dict(db.query(models.Praga.nome, models.Praga.id).filter(models.Praga.nome.in_(nomes)))
+
+    faltando = sorted(numeros - dispositivo_ids.keys())
+    if faltando:
+        raise ContagemInvalida(f"Armadilha(s) AL não cadastrada(s) na área do serviço: {', '.join(faltando)}.")
+    faltando = sorted(nomes - praga_ids.keys())
+    if faltando:
+        raise ContagemInvalida(f"Praga(s) não cadastrada(s): {', '.join(faltando)}.")
+    return dispositivo_ids, praga_ids
+
 def save_mip_data_for_servico(db: Session, servico_id: int, mip_data: schemas.MIPDataCreate):
-    """ Salva (sobrescrevendo) os dados de MIP e Contagem para um serviço. """
-    db_servico = db.query(models.Servico).filter(models.Servico.id == servico_id).first()
+    """
+    Salva (sobrescrevendo) os dados de MIP e Contagem para um serviço.
+    Compara o que chegou com o que já está gravado e escreve só as diferenças,
+    em lote: um INSERT, um UPDATE e um DELETE no máximo para cada tabela.
+    As contagens são identificadas por (servico_id, dispositivo_id, praga_id); o
+    número do dispositivo e o nome da praga que chegam são convertidos em IDs
+    (armadilhas AL da área do serviço e pragas cadastradas).
+    """
+    # FOR UPDATE serializa gravações simultâneas do mesmo serviço no PostgreSQL
+    db_servico = db.query(models.Servico).filter(models.Servico.id == servico_id).with_for_update().first()
     if not db_servico:
         raise ValueError(f"Serviço com ID {servico_id} não encontrado.")
-        
-    # Apaga dados antigos para este serviço
-    db.query(models.MIPRegistro).filter(models.MIPRegistro.servico_id == servico_id).delete()
-    db.query(models.ContagemPraga).filter(models.ContagemPraga.servico_id == servico_id).delete()
-    
-    # Adiciona novos dados de ocorrências
-    novas_ocorrencias = []
-    for praga_nome in mip_data.ocorrencias:
-        db_ocorrencia = models.MIPRegistro(praga_observada=praga_nome, servico_id=servico_id)
-        db.add(db_ocorrencia)
-        novas_ocorrencias.append(db_ocorrencia)
-
-    # Adiciona novos dados de contagens
-    novas_contagens = []
-    for contagem in mip_data.contagens:
-        db_contagem = models.ContagemPraga(**contagem.dict(), servico_id=servico_id)
-        db.add(db_contagem)
-        novas_contagens.append(db_contagem)
+    # Valida dispositivos e pragas antes de escrever qualquer coisa
+    dispositivo_ids, praga_ids = _resolver_dispositivos_e_pragas(db, db_servico.area_id, mip_data.contagens)
+
+    # --- Ocorrências (uma linha por praga observada) ---
+    # O POST /api/mip-registros/ pode ter gravado a mesma praga mais de uma vez
+    ocorrencias_gravadas = defaultdict(list)
+    for registro_id, praga in db.query(
+        models.MIPRegistro.id, models.MIPRegistro.pragas_observadas
+    ).filter(models.MIPRegistro.servico_id == servico_id).order_by(models.MIPRegistro.id):
+        ocorrencias_gravadas[praga].append(registro_id)
+    ocorrencias_novas = list(dict.fromkeys(mip_data.ocorrencias))
 
+    # Saem as pragas que não vieram e, das que ficam, as repetidas (fica a primeira)
+    remover = [
+        registro_id
+        for praga, registro_ids in ocorrencias_gravadas.items()
+        for registro_id in (registro_ids if praga not in ocorrencias_novas else registro_ids[1:])
+    ]
+    if remover:
+        db.execute(delete(models.MIPRegistro).where(models.MIPRegistro.id.in_(remover)))
+    inserir = [
+        {
+            "servico_id": servico_id,
+            "data_observacao": db_servico.data or date.today(),
+            "pragas_observadas": praga_nome,
+            "observacao_texto": f"Praga(s) observada(s): {praga_nome}",
+        }
+        for praga_nome in ocorrencias_novas if praga_nome not in ocorrencias_gravadas
+    ]
+    if inserir:
+        db.execute(insert(models.MIPRegistro), inserir)
+
+    # --- Contagens ---
+    contagens_gravadas = {}
+    remover, deltas = [], defaultdict(int)
+    for contagem_id, dispositivo_id, praga_id, quantidade in db.query(
+        models.ContagemPraga.id, models.ContagemPraga.dispositivo_id,
+        models.ContagemPraga.praga_id, models.ContagemPraga.quantidade
+    ).filter(models.ContagemPraga.servico_id == servico_id):
+        if dispositivo_id is None or praga_id is None:
+            # Dispositivo ou praga excluídos: a grade nova substitui a contagem
+            remover.append(contagem_id)
+            if praga_id is not None:
+                deltas[(None, praga_id)] -= quantidade
+        elif (dispositivo_id, praga_id) in contagens_gravadas:
+            # Contagem repetida (gravada antes da chave por IDs): fica só a primeira
+            remover.append(contagem_id)
+            deltas[(dispositivo_id, praga_id)] -= quantidade
+        else:
+            contagens_gravadas[(dispositivo_id, praga_id)] = (contagem_id, quantidade)
+    # Se a mesma chave vier repetida, vale a última
+    contagens_novas = {
+        (dispositivo_ids[c.dispositivo_numero], praga_ids[c.praga_nome]): (c.dispositivo_numero, c.praga_nome, c.quantidade)
+        for c in mip_data.contagens
+    }
+
+    remover += [contagem_id for chave, (contagem_id, _) in contagens_gravadas.items() if chave not in contagens_novas]
+    if remover:
+        db.execute(delete(models.ContagemPraga).where(models.ContagemPraga.id.in_(remover)))
+    atualizar = [
+        {"id": contagens_gravadas[chave][0], "quantidade": quantidade}
+        for chave, (_, _, quantidade) in contagens_novas.items()
+        if chave in contagens_gravadas and contagens_gravadas[chave][1] != quantidade
+    ]
+    if atualizar:
+        db.execute(update(models.ContagemPraga), atualizar)
+    inserir = [
+        {
+            "servico_id": servico_id, "dispositivo_id": dispositivo_id, "praga_id": praga_id,
+            "dispositivo_numero": numero, "praga_nome": praga_nome, "quantidade": quantidade
+        }
+        for (dispositivo_id, praga_id), (numero, praga_nome, quantidade) in contagens_novas.items()
+        if (dispositivo_id, praga_id) not in contagens_gravadas
+    ]
+    if inserir:
+        db.execute(insert(models.ContagemPraga), inserir)
+
+    # A série diária recebe só a diferença entre o gravado e o novo
+    for chave, (_, _, quantidade) in contagens_novas.items():
+        deltas[chave] += quantidade
+    for chave, (_, quantidade) in contagens_gravadas.items():
+        deltas[chave] -= quantidade
+    crud_resumos.registrar_contagens(db, db_servico.data, db_servico.area_id, deltas)
+
+    # Uma consulta por tabela devolve o estado final, já com os IDs
+    resultado = get_mip_data_for_servico(db, servico_id)
     db.commit()
-    
-    # O refresh é necessário para carregar IDs e outros dados gerados pelo banco
-    for ocorrencia in novas_ocorrencias:
-        db.refresh(ocorrencia)
-    for contagem in novas_contagens:
-        db.refresh(contagem)
-        
-    return {"ocorrencias": novas_ocorrencias, "contagens": novas_contagens}
+    return resultado
 
 def create_mip_registro(db: Session, registro: schemas.MIPRegistroCreate) -> models.MIPRegistro:
     """Cria um único registro de MIP (observação)."""
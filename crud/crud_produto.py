@@ -1,14 +1,16 @@
 # Arquivo: crud/crud_produto.py
 
 from sqlalchemy.orm import Session
-from sqlalchemy import func, extract
-from datetime import datetime
+from sqlalchemy import select
+from sqlalchemy.sql import Select
 
 # Importamos os modelos e schemas do diretório pai (../)
 # A forma de importar pode variar um pouco dependendo da sua estrutura
 # mas para FastAPI/Uvicorn, isso geralmente funciona:
 import models
 import schemas
+from datetime import date
+from . import crud_resumos, crud_estoque
 
 # =================================================================
 # Funções CRUD para Produtos
@@ -18,14 +20,23 @@ def get_produto(db: Session, produto_id: int):
     """Busca um único produto pelo seu ID."""
     return db.query(models.Produto).filter(models.Produto.id == produto_id).first()
 
+# Ordem estável da listagem paginada (ver crud/paginacao.py)
+CHAVES_PRODUTOS = ((models.Produto.nome, False), (models.Produto.id, False))
+
+def query_produtos() -> Select:
+    """Monta o SELECT dos produtos, sem ordenação."""
+    return select(models.Produto)
+
 def get_produtos(db: Session):
     """Retorna uma lista de todos os produtos, ordenados por nome."""
-    return db.query(models.Produto).order_by(models.Produto.nome).all()
+    return db.scalars(query_produtos().order_by(models.Produto.nome)).all()
 
 def create_produto(db: Session, produto: schemas.ProdutoCreate):
     """Cria um novo produto no banco de dados."""
     db_produto = models.Produto(**produto.dict())
     db.add(db_produto)
+    db.flush()
+    crud_estoque.registrar_movimentos(db, {db_produto.id: db_produto.estoque_atual}, "cadastro")
     db.commit()
     db.refresh(db_produto)
     return db_produto
@@ -67,6 +78,8 @@ def add_estoque(db: Session, produto_id: int, quantidade: float):
         
     db_produto.estoque_atual += quantidade
     db.add(db_produto)
+    db.flush()
+    crud_estoque.registrar_movimentos(db, {produto_id: quantidade}, "entrada")
     db.commit()
     db.refresh(db_produto)
     return db_produto
@@ -74,20 +87,8 @@ def add_estoque(db: Session, produto_id: int, quantidade: float):
 def get_produtos_usados_detalhado_mes_atual(db: Session):
     """
     Retorna uma lista de produtos usados no mês atual,
-    com o total de uso para cada um.
+    com o total de uso para cada um (lido do resumo mensal).
     """
-    agora = datetime.now()
-    query = (
-        db.query(
-            models.Produto.nome,
-            func.sum(models.ServicoProdutoAssociado.quantidade_usada).label("total_usado"),
-            models.Produto.unidade_uso,
-        )
-        .join(models.ServicoProdutoAssociado, models.Produto.id == models.ServicoProdutoAssociado.produto_id)
-        .join(models.Servico, models.ServicoProdutoAssociado.servico_id == models.Servico.id)
-        .filter(extract('year', models.Servico.data) == agora.year)
-        .filter(extract('month', models.Servico.data) == agora.month)
-        .group_by(models.Produto.nome, models.Produto.unidade_uso)
-        .order_by(models.Produto.nome)
-    )
-    return query.all()
+    hoje = date.today()
+    produtos = crud_resumos.get_produtos_usados_no_mes(db, hoje.year, hoje.month)
+    return sorted(produtos, key=lambda p: p.nome)
@@ -1,10 +1,15 @@
 # Arquivo: crud/crud_relatorio.py
 
 from sqlalchemy.orm import Session
-from sqlalchemy import func, extract
-from datetime import datetime, date
+from sqlalchemy import func, select, case
+from datetime import date, datetime
+from typing import Optional
+from collections import defaultdict
 
 import models
+from . import crud_resumos
+from .periodos import periodos_entre
+from .dialeto import inicio_do_periodo_sql
 
 # =================================================================
 # Funções para o Dashboard
@@ -13,88 +18,174 @@ import models
 def count_servicos_mes_atual(db: Session):
     """Conta quantos serviços foram realizados no mês e ano correntes."""
     hoje = datetime.utcnow()
-    return db.query(models.Servico).filter(
-        extract('year', models.Servico.data) == hoje.year,
-        extract('month', models.Servico.data) == hoje.month
-    ).count()
+    return crud_resumos.get_servicos_no_mes(db, hoje.year, hoje.month)
 
 def sum_produtos_usados_mes_atual(db: Session):
     """Soma a quantidade de produtos usados em serviços do mês e ano correntes."""
     hoje = datetime.utcnow()
-    total = db.query(func.sum(models.ServicoProdutoAssociado.quantidade_usada))\
-        .join(models.Servico)\
-        .filter(
-            extract('year', models.Servico.data) == hoje.year,
-            extract('month', models.Servico.data) == hoje.month
-        ).scalar()
+    total = db.query(func.sum(models.ResumoMensalProdutos.total_usado)).filter(
+        models.ResumoMensalProdutos.ano == hoje.year,
+        models.ResumoMensalProdutos.mes == hoje.month
+    ).scalar()
     return total or 0.0
 
 def count_dispositivos_por_tipo_e_status(db: Session):
     """Conta dispositivos agrupando por tipo e status."""
-    resultado = db.query(
-        models.Dispositivo.tipo,
-        models.Dispositivo.status,
-        func.count(models.Dispositivo.id)
-    ).group_by(models.Dispositivo.tipo, models.Dispositivo.status).all()
-    
-    dados_formatados = {}
-    for tipo, status, contagem in resultado:
-        if tipo not in dados_formatados:
-            dados_formatados[tipo] = {}
-        dados_formatados[tipo][status] = contagem
-    return dados_formatados
+    return crud_resumos.get_dispositivos_por_tipo_e_status(db)
 
 # =================================================================
 # Funções para Relatórios
 # =================================================================
 
 def get_relatorio_contagem_pragas(db: Session, data_inicio: date, data_fim: date):
-    """Busca e totaliza a contagem de pragas por tipo dentro de um período."""
-    resultado = db.query(
-        models.ContagemPraga.praga_nome,
-        func.sum(models.ContagemPraga.quantidade).label("total_contado")
-    ).join(models.Servico, models.ContagemPraga.servico_id == models.Servico.id)\
-     .filter(models.Servico.data >= data_inicio)\
-     .filter(models.Servico.data <= data_fim)\
-     .group_by(models.ContagemPraga.praga_nome)\
-     .order_by(func.sum(models.ContagemPraga.quantidade).desc())\
-     .all()
-    
-    return resultado
+    """
+    Busca e totaliza a contagem de pragas por tipo dentro de um período.
+    As pragas cadastradas vêm da série diária; as contagens de pragas já
+    excluídas saem da série e são somadas pelo nome gravado na contagem.
+    """
+    serie = models.SeriePragaDiaria
+    totais = defaultdict(int)
+    cadastradas = db.query(models.Praga.nome, func.sum(serie.total))\
+        .join(models.Praga, models.Praga.id == serie.praga_id)\
+        .filter(serie.dia >= data_inicio)\
+        .filter(serie.dia <= data_fim)\
+        .group_by(models.Praga.nome)
+    excluidas = db.query(models.ContagemPraga.praga_nome, func.sum(models.ContagemPraga.quantidade))\
+        .join(models.Servico, models.ContagemPraga.servico_id == models.Servico.id)\
+        .filter(models.ContagemPraga.praga_id.is_(None))\
+        .filter(models.Servico.data >= data_inicio)\
+        .filter(models.Servico.data <= data_fim)\
+        .group_by(models.ContagemPraga.praga_nome)
+    for consulta in (cadastradas, excluidas):
+        for praga_nome, total in consulta:
+            totais[praga_nome] += total or 0
+
+    return [
+        {"praga_nome": praga_nome, "total_contado": total}
+        for praga_nome, total in sorted(totais.items(), key=lambda item: item[1], reverse=True)
+    ]
+
+def get_tendencia_pragas(
+    db: Session, area_id: int, data_inicio: date, data_fim: date, periodo: str = "semana",
+    praga_nome: Optional[str] = None, dispositivo_numero: Optional[str] = None,
+    janela: int = 4, limite_alerta: Optional[int] = None
+):
+    """
+    Tendência das contagens de pragas de uma área, por semana ou por mês.
+    Lê a série diária já agregada (a da área ou, se `dispositivo_numero` for
+    informado, a do dispositivo), agrupa os dias no banco e completa
+    no Python os períodos sem contagem com zero, a média móvel das últimas
+    `janela` barras e os alertas (`total >= limite_alerta`).
+    """
+    serie = models.SeriePragaDiariaDispositivo if dispositivo_numero else models.SeriePragaDiaria
+    inicio = inicio_do_periodo_sql(db, serie.dia, periodo).label("inicio")
+    query = db.query(inicio, serie.praga_id, func.sum(serie.total)).filter(
+        serie.area_id == area_id,
+        serie.dia >= data_inicio,
+        serie.dia <= data_fim
+    )
+    if dispositivo_numero:
+        query = query.filter(serie.dispositivo_id.in_(
+            select(models.Dispositivo.id).where(
+                models.Dispositivo.area_id == area_id, models.Dispositivo.numero == dispositivo_numero,
+                models.Dispositivo.tipo == models.Dispositivo.TIPO_CONTAGEM
+            )
+        ))
+    if praga_nome:
+        query = query.filter(serie.praga_id.in_(select(models.Praga.id).where(models.Praga.nome == praga_nome)))
+
+    por_praga_id = defaultdict(dict)
+    for inicio_periodo, praga_id, total in query.group_by(inicio, serie.praga_id):
+        por_praga_id[praga_id][inicio_periodo] = total
+    nomes = dict(db.query(models.Praga.id, models.Praga.nome).filter(models.Praga.id.in_(list(por_praga_id))))
+    totais = {nomes.get(praga_id, f"Praga {praga_id}"): valores for praga_id, valores in por_praga_id.items()}
+
+    periodos = periodos_entre(data_inicio, data_fim, periodo)
+    series, alertas = [], []
+    for praga in sorted(totais):
+        valores = [totais[praga].get(inicio_periodo, 0) for inicio_periodo in periodos]
+        pontos = []
+        for i, (inicio_periodo, total) in enumerate(zip(periodos, valores)):
+            ultimos = valores[max(0, i - janela + 1):i + 1]
+            alerta = limite_alerta is not None and total >= limite_alerta
+            pontos.append({
+                "inicio": inicio_periodo,
+                "total": total,
+                "media_movel": round(sum(ultimos) / len(ultimos), 2),
+                "alerta": alerta,
+            })
+            if alerta:
+                alertas.append({"praga_nome": praga, "inicio": inicio_periodo, "total": total})
+        series.append({"praga_nome": praga, "total": sum(valores), "pontos": pontos})
+
+    return {"series": series, "alertas": alertas}
 
 def get_relatorio_compilado_area(db: Session, area_id: int, data_inicio: date, data_fim: date):
-    """Busca todas as informações compiladas de uma área em um período."""
-    servicos_no_periodo = db.query(models.Servico).filter(
+    """
+    Busca todas as informações compiladas de uma área em um período.
+    Cada seção é uma consulta que junta a tabela dela com os serviços do período
+    (uma CTE sobre o índice (area_id, data)), em vez de trazer os serviços para o
+    Python e repassar os IDs em uma lista IN que cresce com o período.
+    """
+    servicos_do_periodo = select(models.Servico.id, models.Servico.observacoes).where(
         models.Servico.area_id == area_id,
         models.Servico.data >= data_inicio,
         models.Servico.data <= data_fim
-    ).all()
+    ).cte("servicos_do_periodo")
 
-    if not servicos_no_periodo:
+    if not db.query(select(servicos_do_periodo.c.id).exists()).scalar():
         return None
 
-    servico_ids = [s.id for s in servicos_no_periodo]
-
     produtos = db.query(
         models.Produto.nome,
         models.Produto.unidade_uso,
         func.sum(models.ServicoProdutoAssociado.quantidade_usada).label("total_usado")
     ).join(models.ServicoProdutoAssociado, models.Produto.id == models.ServicoProdutoAssociado.produto_id)\
-     .filter(models.ServicoProdutoAssociado.servico_id.in_(servico_ids))\
+     .join(servicos_do_periodo, servicos_do_periodo.c.id == models.ServicoProdutoAssociado.servico_id)\
      .group_by(models.Produto.nome, models.Produto.unidade_uso).all()
 
-    contagens = db.query(models.ContagemPraga).filter(models.ContagemPraga.servico_id.in_(servico_ids)).all()
-
-    ocorrencias = db.query(models.MIPRegistro).filter(models.MIPRegistro.servico_id.in_(servico_ids)).all()
+    # Contagens somadas por dispositivo e praga (pelos IDs) no banco; os nomes
+    # atuais entram depois, só nas linhas já agrupadas. Contagens de dispositivo
+    # ou praga excluídos ficam agrupadas pelo texto gravado.
+    contagem = models.ContagemPraga
+    numero_gravado = case((contagem.dispositivo_id.is_(None), contagem.dispositivo_numero))
+    nome_gravado = case((contagem.praga_id.is_(None), contagem.praga_nome))
+    somas = db.query(
+        contagem.dispositivo_id,
+        contagem.praga_id,
+        numero_gravado.label("numero_gravado"),
+        nome_gravado.label("nome_gravado"),
+        func.sum(contagem.quantidade).label("quantidade")
+    ).join(servicos_do_periodo, servicos_do_periodo.c.id == contagem.servico_id)\
+     .group_by(contagem.dispositivo_id, contagem.praga_id, numero_gravado, nome_gravado).subquery()
+
+    dispositivo_numero = func.coalesce(models.Dispositivo.numero, somas.c.numero_gravado)
+    praga_nome = func.coalesce(models.Praga.nome, somas.c.nome_gravado)
+    contagens = db.query(
+        dispositivo_numero.label("dispositivo_numero"),
+        praga_nome.label("praga_nome"),
+        somas.c.quantidade
+    ).select_from(somas)\
+     .outerjoin(models.Dispositivo, models.Dispositivo.id == somas.c.dispositivo_id)\
+     .outerjoin(models.Praga, models.Praga.id == somas.c.praga_id)\
+     .order_by(praga_nome, dispositivo_numero).all()
+
+    ocorrencias = db.query(models.MIPRegistro)\
+     .join(servicos_do_periodo, servicos_do_periodo.c.id == models.MIPRegistro.servico_id)\
+     .order_by(models.MIPRegistro.data_observacao, models.MIPRegistro.id).all()
 
     status_dispositivos = db.query(
         models.Dispositivo.numero,
         models.Dispositivo.tipo,
         models.ServicoDispositivoStatus.status_registrado
     ).join(models.Dispositivo, models.ServicoDispositivoStatus.dispositivo_id == models.Dispositivo.id)\
-     .filter(models.ServicoDispositivoStatus.servico_id.in_(servico_ids)).all()
+     .join(servicos_do_periodo, servicos_do_periodo.c.id == models.ServicoDispositivoStatus.servico_id).all()
 
-    observacoes = [{"servico_id": s.id, "observacoes": s.observacoes} for s in servicos_no_periodo if s.observacoes]
+    observacoes = db.query(
+        servicos_do_periodo.c.id.label("servico_id"),
+        servicos_do_periodo.c.observacoes
+    ).filter(servicos_do_periodo.c.observacoes.is_not(None), servicos_do_periodo.c.observacoes != "")\
+     .order_by(servicos_do_periodo.c.id).all()
 
     return {
         "produtos_utilizados": produtos,
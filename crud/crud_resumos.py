@@ -0,0 +1,234 @@
+# Arquivo: crud/crud_resumos.py
+
+from sqlalchemy.orm import Session
+from sqlalchemy import func, select, insert, update, delete
+from datetime import date
+from typing import Optional
+from collections import defaultdict
+
+import models
+from .dialeto import insert_do_dialeto
+
+# =================================================================
+# Manutenção incremental das tabelas de resumo
+# =================================================================
+# As funções abaixo rodam na mesma transação da escrita que as originou
+# (create/update/delete de serviços e dispositivos), então o resumo nunca
+# fica à frente nem atrás dos dados reais.
+
+def _incrementar(db: Session, modelo, chaves: dict, campo: str, delta):
+    """Soma `delta` ao contador `campo` da linha `chaves`, criando a linha se preciso."""
+    if not delta:
+        return
+    stmt = insert_do_dialeto(db, modelo).values(**chaves, **{campo: delta})
+    stmt = stmt.on_conflict_do_update(
+        index_elements=list(chaves.keys()),
+        set_={campo: getattr(modelo, campo) + stmt.excluded[campo]},
+    )
+    db.execute(stmt)
+
+def registrar_servico(db: Session, data: Optional[date], area_id: int, produtos_associados: list, sinal: int):
+    """
+    Aplica um serviço aos resumos mensais: `sinal=1` ao criar, `sinal=-1` ao remover.
+    `produtos_associados` são itens com `produto_id` e `quantidade_usada`.
+    """
+    if data is None:
+        return
+    mes = {"ano": data.year, "mes": data.month}
+    _incrementar(db, models.ResumoMensalServicos, {**mes, "area_id": area_id}, "total", sinal)
+    for prod_assoc in produtos_associados:
+        _incrementar(
+            db, models.ResumoMensalProdutos,
+            {**mes, "produto_id": prod_assoc.produto_id},
+            "total_usado", sinal * prod_assoc.quantidade_usada
+        )
+
+def _somar_na_serie(db: Session, modelo, linhas: list, **filtro_zeradas):
+    """Soma as linhas (com a chave primária e `total`) à série e apaga as que zeraram."""
+    if not linhas:
+        return
+    stmt = insert_do_dialeto(db, modelo)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[coluna.name for coluna in modelo.__table__.primary_key],
+        set_={"total": modelo.total + stmt.excluded.total},
+    )
+    db.execute(stmt, linhas)
+    # Mantém a série compacta: o que zerou no dia não precisa de linha
+    condicoes = [getattr(modelo, coluna).in_(valores) for coluna, valores in filtro_zeradas.items()]
+    db.execute(delete(modelo).where(*condicoes, modelo.total == 0))
+
+def registrar_contagens(db: Session, data: Optional[date], area_id: int, deltas: dict):
+    """
+    Aplica às séries diárias de pragas as contagens de um serviço.
+    `deltas` é {(dispositivo_id, praga_id): quantidade}, com quantidades
+    negativas para o que saiu. Cada série recebe um único INSERT ... ON CONFLICT em lote.
+    Contagens de dispositivo excluído (dispositivo_id None) só entram na série da área.
+    """
+    deltas = {chave: delta for chave, delta in deltas.items() if delta}
+    if data is None or not deltas:
+        return
+    por_praga = defaultdict(int)
+    for (_, praga_id), delta in deltas.items():
+        por_praga[praga_id] += delta
+
+    _somar_na_serie(
+        db, models.SeriePragaDiaria,
+        [{"area_id": area_id, "praga_id": praga_id, "dia": data, "total": delta} for praga_id, delta in por_praga.items() if delta],
+        area_id=[area_id], praga_id=list(por_praga), dia=[data]
+    )
+    por_dispositivo = {(dispositivo_id, praga_id): delta for (dispositivo_id, praga_id), delta in deltas.items() if dispositivo_id is not None}
+    _somar_na_serie(
+        db, models.SeriePragaDiariaDispositivo,
+        [{"area_id": area_id, "dispositivo_id": dispositivo_id, "dia": data, "praga_id": praga_id, "total": delta}
+         for (dispositivo_id, praga_id), delta in por_dispositivo.items()],
+        area_id=[area_id], dispositivo_id=list({dispositivo_id for dispositivo_id, _ in por_dispositivo}), dia=[data]
+    )
+
+def desvincular_contagens(db: Session, dispositivo_id: Optional[int] = None, praga_id: Optional[int] = None):
+    """
+    Antes de excluir um dispositivo ou uma praga: as contagens ficam só com o
+    texto gravado (como o ON DELETE SET NULL faria, mas também no SQLite, que
+    não aplica as chaves estrangeiras) e saem das séries diárias.
+    """
+    for coluna, valor in (("dispositivo_id", dispositivo_id), ("praga_id", praga_id)):
+        if valor is None:
+            continue
+        db.execute(
+            update(models.ContagemPraga).where(getattr(models.ContagemPraga, coluna) == valor)
+            .values({coluna: None}).execution_options(synchronize_session=False)
+        )
+        db.execute(delete(models.SeriePragaDiariaDispositivo).where(getattr(models.SeriePragaDiariaDispositivo, coluna) == valor))
+        if coluna == "praga_id":
+            db.execute(delete(models.SeriePragaDiaria).where(models.SeriePragaDiaria.praga_id == valor))
+
+def contagens_do_servico(db: Session, servico_id: int) -> dict:
+    """Contagens gravadas de um serviço, no formato usado por `registrar_contagens`."""
+    contagens = defaultdict(int)
+    for dispositivo_id, praga_id, quantidade in db.query(
+        models.ContagemPraga.dispositivo_id, models.ContagemPraga.praga_id, models.ContagemPraga.quantidade
+    ).filter(models.ContagemPraga.servico_id == servico_id, models.ContagemPraga.praga_id.is_not(None)):
+        contagens[(dispositivo_id, praga_id)] += quantidade
+    return dict(contagens)
+
+def registrar_dispositivos(db: Session, tipo: str, status: str, quantidade: int):
+    """Soma `quantidade` (pode ser negativa) ao resumo de dispositivos por tipo e status."""
+    _incrementar(db, models.ResumoDispositivos, {"tipo": tipo, "status": status}, "total", quantidade)
+
+# =================================================================
+# Reconstrução completa (carga inicial ou correção)
+# =================================================================
+
+def reconstruir_resumos(db: Session):
+    """Recalcula todas as tabelas de resumo (e a série de pragas) a partir dos dados de origem."""
+    db.query(models.ResumoMensalServicos).delete()
+    db.query(models.ResumoMensalProdutos).delete()
+    db.query(models.ResumoDispositivos).delete()
+
+    servicos = defaultdict(int)
+    for data, area_id in db.query(models.Servico.data, models.Servico.area_id).filter(models.Servico.data.is_not(None)):
+        servicos[(data.year, data.month, area_id)] += 1
+    db.bulk_insert_mappings(models.ResumoMensalServicos, [
+        {"ano": ano, "mes": mes, "area_id": area_id, "total": total}
+        for (ano, mes, area_id), total in servicos.items()
+    ])
+
+    produtos = defaultdict(float)
+    usos = db.query(
+        models.Servico.data, models.ServicoProdutoAssociado.produto_id, models.ServicoProdutoAssociado.quantidade_usada
+    ).join(models.Servico).filter(models.Servico.data.is_not(None))
+    for data, produto_id, quantidade in usos:
+        produtos[(data.year, data.month, produto_id)] += quantidade
+    db.bulk_insert_mappings(models.ResumoMensalProdutos, [
+        {"ano": ano, "mes": mes, "produto_id": produto_id, "total_usado": total}
+        for (ano, mes, produto_id), total in produtos.items()
+    ])
+
+    dispositivos = db.query(
+        models.Dispositivo.tipo, models.Dispositivo.status, func.count(models.Dispositivo.id)
+    ).group_by(models.Dispositivo.tipo, models.Dispositivo.status).all()
+    db.bulk_insert_mappings(models.ResumoDispositivos, [
+        {"tipo": tipo, "status": status, "total": total} for tipo, status, total in dispositivos
+    ])
+
+    _preencher_serie_pragas(db)
+    db.commit()
+
+def _preencher_serie_pragas(db: Session):
+    """Recalcula as séries de pragas inteiramente no banco (INSERT ... SELECT ... GROUP BY)."""
+    db.query(models.SeriePragaDiaria).delete()
+    db.query(models.SeriePragaDiariaDispositivo).delete()
+    contagem, servico = models.ContagemPraga, models.Servico
+    com_data_e_praga = (servico.data.is_not(None), contagem.praga_id.is_not(None))
+    total = func.sum(contagem.quantidade)
+
+    db.execute(insert(models.SeriePragaDiaria.__table__).from_select(
+        ["area_id", "praga_id", "dia", "total"],
+        select(servico.area_id, contagem.praga_id, servico.data, total)
+        .join(servico, contagem.servico_id == servico.id)
+        .where(*com_data_e_praga)
+        .group_by(servico.area_id, contagem.praga_id, servico.data)
+        .having(total != 0)
+    ))
+    db.execute(insert(models.SeriePragaDiariaDispositivo.__table__).from_select(
+        ["area_id", "dispositivo_id", "dia", "praga_id", "total"],
+        select(servico.area_id, contagem.dispositivo_id, servico.data, contagem.praga_id, total)
+        .join(servico, contagem.servico_id == servico.id)
+        .where(*com_data_e_praga, contagem.dispositivo_id.is_not(None))
+        .group_by(servico.area_id, contagem.dispositivo_id, servico.data, contagem.praga_id)
+        .having(total != 0)
+    ))
+
+def garantir_resumos(db: Session) -> bool:
+    """
+    Reconstrói os resumos se eles estiverem vazios mas já existirem dados
+    (ex: primeira execução após a criação das tabelas). Retorna True se reconstruiu.
+    """
+    resumos_vazios = not any(
+        db.execute(select(modelo).limit(1)).first()
+        for modelo in (models.ResumoMensalServicos, models.ResumoMensalProdutos, models.ResumoDispositivos)
+    )
+    tem_dados = db.query(models.Servico.id).first() or db.query(models.Dispositivo.id).first()
+    if resumos_vazios and tem_dados:
+        reconstruir_resumos(db)
+        return True
+    # A série de pragas veio depois dos outros resumos: bancos que já tinham
+    # resumos ganham só a série
+    serie_vazia = not db.execute(select(models.SeriePragaDiaria).limit(1)).first()
+    if serie_vazia and db.query(models.ContagemPraga.id).first():
+        _preencher_serie_pragas(db)
+        db.commit()
+        return True
+    return False
+
+# =================================================================
+# Leitura (Dashboard)
+# =================================================================
+
+def get_servicos_no_mes(db: Session, year: int, month: int) -> int:
+    """Total de serviços do mês, somando uma linha por área."""
+    return db.query(func.sum(models.ResumoMensalServicos.total)).filter(
+        models.ResumoMensalServicos.ano == year,
+        models.ResumoMensalServicos.mes == month
+    ).scalar() or 0
+
+def get_produtos_usados_no_mes(db: Session, year: int, month: int, limite: Optional[int] = None):
+    """Produtos usados no mês com o total de uso, do mais usado para o menos usado."""
+    query = db.query(
+        models.Produto.nome,
+        models.ResumoMensalProdutos.total_usado.label("total_usado"),
+        models.Produto.unidade_uso
+    ).join(models.Produto, models.ResumoMensalProdutos.produto_id == models.Produto.id).filter(
+        models.ResumoMensalProdutos.ano == year,
+        models.ResumoMensalProdutos.mes == month,
+        models.ResumoMensalProdutos.total_usado > 0
+    ).order_by(models.ResumoMensalProdutos.total_usado.desc())
+    if limite:
+        query = query.limit(limite)
+    return query.all()
+
+def get_dispositivos_por_tipo_e_status(db: Session) -> dict:
+    """Contagem de dispositivos agrupada por tipo e status."""
+    resultado = defaultdict(dict)
+    for linha in db.query(models.ResumoDispositivos).filter(models.ResumoDispositivos.total > 0):
+        resultado[linha.tipo][linha.status] = linha.total
+    return dict(resultado)
@@ -1,75 +1,116 @@
 # Arquivo: crud/crud_servico.py
 
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import Select
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy import select, update, values, column, case, or_, func, cast, Integer, Float, String
 from typing import Optional, List
 from datetime import date
-from sqlalchemy import extract
+from collections import defaultdict
 import models
 import schemas
 
-# ✅ Reutilizando a lógica de produto que já separamos!
-from .crud_produto import get_produto
+from .periodos import filtro_mes
+from .dialeto import eh_postgresql, agregar_textos
+from . import crud_resumos, crud_estoque, carregamento
 
 # =================================================================
 # Funções CRUD para Serviços
 # =================================================================
 
-def _ajustar_estoque_para_servico(db: Session, produtos_associados: list, operacao: str):
-    """Função auxiliar interna para adicionar ou subtrair do estoque."""
+def _ajustar_estoque_para_servico(db: Session, produtos_associados: list, operacao: str) -> dict:
+    """
+    Função auxiliar interna para adicionar ou subtrair do estoque.
+    Todos os produtos são ajustados em um único UPDATE, que só altera a linha se
+    o estoque não ficar negativo; assim a verificação e a baixa acontecem juntas
+    e duas baixas simultâneas do mesmo produto não se sobrescrevem.
+    Retorna o delta aplicado a cada produto ({produto_id: quantidade}).
+    """
+    sinal = -1 if operacao == 'subtrair' else 1
+    deltas = defaultdict(float)
     for prod_assoc in produtos_associados:
-        # Usando a função importada para mais organização
-        produto_db = get_produto(db, prod_assoc.produto_id)
-        if not produto_db:
-            raise ValueError(f"Produto ID {prod_assoc.produto_id} não encontrado no estoque.")
-            
-        if operacao == 'subtrair':
-            if produto_db.estoque_atual < prod_assoc.quantidade_usada:
-                raise ValueError(f"Estoque insuficiente para '{produto_db.nome}'.")
-            produto_db.estoque_atual -= prod_assoc.quantidade_usada
-        elif operacao == 'adicionar':
-            produto_db.estoque_atual += prod_assoc.quantidade_usada
-            
-        db.add(produto_db)
-
-def get_servicos(db: Session, area_id: Optional[int] = None, data: Optional[date] = None):
-    """Busca serviços com filtros opcionais, carregando dados relacionados."""
-    query = db.query(models.Servico).options(
-        joinedload(models.Servico.area),
-        joinedload(models.Servico.produtos_associados).joinedload(models.ServicoProdutoAssociado.produto)
-    )
+        deltas[prod_assoc.produto_id] += sinal * prod_assoc.quantidade_usada
+    if not deltas:
+        return {}
+
+    produto = models.Produto
+    if eh_postgresql(db):
+        # Trava as linhas sempre na mesma ordem (por id) para evitar deadlock
+        # entre serviços que usam os mesmos produtos em ordem diferente
+        db.execute(select(produto.id).where(produto.id.in_(deltas)).order_by(produto.id).with_for_update())
+        v = values(column("produto_id", Integer), column("delta", Float), name="v").data(list(deltas.items()))
+        stmt = update(produto).where(produto.id == v.c.produto_id)
+        delta = v.c.delta
+    else:
+        # O SQLite não aceita VALUES com nomes de coluna no FROM; o CASE faz o mesmo papel
+        stmt = update(produto).where(produto.id.in_(deltas))
+        delta = case(deltas, value=produto.id)
+    stmt = stmt.where(or_(delta >= 0, produto.estoque_atual + delta >= 0)).values(
+        estoque_atual=produto.estoque_atual + delta
+    ).returning(produto.id, produto.estoque_atual).execution_options(synchronize_session=False)
+    ajustados = dict(db.execute(stmt).all())
+
+    # Mantém os objetos Produto já carregados na sessão com o valor gravado
+    for produto_id, estoque_atual in ajustados.items():
+        produto_db = db.identity_map.get(db.identity_key(produto, produto_id))
+        if produto_db is not None:
+            set_committed_value(produto_db, "estoque_atual", estoque_atual)
+
+    faltando = [produto_id for produto_id in deltas if produto_id not in ajustados]
+    if faltando:
+        nomes = dict(db.query(produto.id, produto.nome).filter(produto.id.in_(faltando)).all())
+        for produto_id in faltando:
+            if produto_id not in nomes:
+                raise ValueError(f"Produto ID {produto_id} não encontrado no estoque.")
+        raise ValueError(f"Estoque insuficiente para '{nomes[faltando[0]]}'.")
+    return dict(deltas)
+
+# Ordem estável da listagem paginada (ver crud/paginacao.py): mais recentes primeiro
+CHAVES_SERVICOS = ((models.Servico.data, True), (models.Servico.id, True))
+
+# O que o schemas.Servico percorre (ver crud/carregamento.py)
+OPCOES_SERVICO = carregamento.opcoes_de_carga(
+    models.Servico.area,
+    (models.Servico.produtos_associados, models.ServicoProdutoAssociado.produto),
+)
+
+# O que o schemas.ServicoCompleto percorre a mais
+OPCOES_SERVICO_COMPLETO = OPCOES_SERVICO + carregamento.opcoes_de_carga(
+    models.Servico.contagens_praga,
+    (models.Servico.dispositivos_verificados, models.ServicoDispositivoStatus.dispositivo),
+)
+
+def query_servicos(area_id: Optional[int] = None, data: Optional[date] = None) -> Select:
+    """Monta o SELECT dos serviços com os filtros opcionais, sem ordenação."""
+    consulta = select(models.Servico)
     if area_id:
-        query = query.filter(models.Servico.area_id == area_id)
+        consulta = consulta.where(models.Servico.area_id == area_id)
     if data:
-        query = query.filter(models.Servico.data == data)
-    return query.order_by(models.Servico.data.desc()).all()
+        consulta = consulta.where(models.Servico.data == data)
+    return consulta
+
+def get_servicos(db: Session, area_id: Optional[int] = None, data: Optional[date] = None, opcoes=OPCOES_SERVICO):
+    """Busca serviços com filtros opcionais, carregando dados relacionados."""
+    consulta = query_servicos(area_id, data).options(*opcoes).order_by(models.Servico.data.desc())
+    return db.scalars(consulta).unique().all()
 
 def get_service(db: Session, service_id: int):
     """Busca um único serviço pelo seu ID, carregando os dados relacionados."""
-    return db.query(models.Servico).options(
-        joinedload(models.Servico.area),
-        joinedload(models.Servico.produtos_associados).joinedload(models.ServicoProdutoAssociado.produto)
-    ).filter(models.Servico.id == service_id).first()
+    return db.query(models.Servico).options(*OPCOES_SERVICO).filter(models.Servico.id == service_id).first()
 
 def get_servico_completo(db: Session, servico_id: int):
     """
     Busca um serviço e todos os seus dados relacionados para um relatório completo.
     """
-    servico = db.query(models.Servico).options(
-        # Carrega os dados da área relacionada
-        joinedload(models.Servico.area),
-        # Carrega os produtos e os detalhes de cada produto
-        joinedload(models.Servico.produtos_associados).joinedload(models.ServicoProdutoAssociado.produto),
-        # Carrega as contagens de pragas feitas neste serviço
-        joinedload(models.Servico.contagens_praga),
-        # Carrega os dispositivos que foram verificados neste serviço
-        joinedload(models.Servico.dispositivos_verificados).joinedload(models.ServicoDispositivoStatus.dispositivo)
-    ).filter(models.Servico.id == servico_id).first()
+    servico = db.query(models.Servico).options(*OPCOES_SERVICO_COMPLETO)\
+        .filter(models.Servico.id == servico_id).first()
 
     return servico
 
 def create_servico(db: Session, servico: schemas.ServicoCreate):
     """Cria um novo serviço e ajusta o estoque dos produtos utilizados."""
-    _ajustar_estoque_para_servico(db, servico.produtos_associados, 'subtrair')
+    deltas = _ajustar_estoque_para_servico(db, servico.produtos_associados, 'subtrair')
+    crud_resumos.registrar_servico(db, servico.data, servico.area_id, servico.produtos_associados, 1)
     
     produtos_para_salvar = servico.produtos_associados
     servico_data = servico.dict(exclude={'produtos_associados'})
@@ -83,6 +124,9 @@ def create_servico(db: Session, servico: schemas.ServicoCreate):
         db_servico.produtos_associados.append(assoc)
         
     db.add(db_servico)
+    # O flush gera o ID do serviço, que vai para o livro de movimentos de estoque
+    db.flush()
+    crud_estoque.registrar_movimentos(db, deltas, "servico", db_servico.id)
     db.commit()
     db.refresh(db_servico)
     return db_servico
@@ -98,10 +142,24 @@ def update_servico(db: Session, servico_id: int, servico_update: schemas.Servico
         schemas.ProdutoParaServicoBase(produto_id=p.produto_id, quantidade_usada=p.quantidade_usada) 
         for p in db_servico.produtos_associados
     ]
-    _ajustar_estoque_para_servico(db, produtos_antigos, 'adicionar')
+    devolvido = _ajustar_estoque_para_servico(db, produtos_antigos, 'adicionar')
+    crud_resumos.registrar_servico(db, db_servico.data, db_servico.area_id, produtos_antigos, -1)
     
     # Subtrai o estoque dos novos produtos
-    _ajustar_estoque_para_servico(db, servico_update.produtos_associados, 'subtrair')
+    retirado = _ajustar_estoque_para_servico(db, servico_update.produtos_associados, 'subtrair')
+    crud_resumos.registrar_servico(db, servico_update.data, servico_update.area_id, servico_update.produtos_associados, 1)
+
+    # O livro recebe só o efeito líquido da troca de produtos
+    liquido = defaultdict(float, devolvido)
+    for produto_id, quantidade in retirado.items():
+        liquido[produto_id] += quantidade
+    crud_estoque.registrar_movimentos(db, liquido, "servico", servico_id)
+
+    # Mudou o dia ou a área: as contagens do serviço mudam de lugar na série de pragas
+    if (db_servico.data, db_servico.area_id) != (servico_update.data, servico_update.area_id):
+        contagens = crud_resumos.contagens_do_servico(db, servico_id)
+        crud_resumos.registrar_contagens(db, db_servico.data, db_servico.area_id, {k: -v for k, v in contagens.items()})
+        crud_resumos.registrar_contagens(db, servico_update.data, servico_update.area_id, contagens)
     
     # Atualiza os dados do serviço
     update_data = servico_update.dict(exclude={'produtos_associados'})
@@ -131,7 +189,11 @@ def delete_servico(db: Session, servico_id: int):
         schemas.ProdutoParaServicoBase(produto_id=p.produto_id, quantidade_usada=p.quantidade_usada) 
         for p in db_servico.produtos_associados
     ]
-    _ajustar_estoque_para_servico(db, produtos_para_devolver, 'adicionar')
+    devolvido = _ajustar_estoque_para_servico(db, produtos_para_devolver, 'adicionar')
+    crud_estoque.registrar_movimentos(db, devolvido, "servico", servico_id)
+    crud_resumos.registrar_servico(db, db_servico.data, db_servico.area_id, produtos_para_devolver, -1)
+    contagens = crud_resumos.contagens_do_servico(db, servico_id)
+    crud_resumos.registrar_contagens(db, db_servico.data, db_servico.area_id, {k: -v for k, v in contagens.items()})
     
     db.delete(db_servico)
     db.commit()
@@ -151,16 +213,66 @@ def concluir_servico(db: Session, servico_id: int):
     db.refresh(db_servico)
     return db_servico
 
-def get_servicos_por_periodo(db: Session, data_inicio: date, data_fim: date):
-    """Busca todos os serviços dentro de um intervalo de datas."""
-    return db.query(models.Servico).filter(
+def get_servicos_por_periodo(db: Session, data_inicio: date, data_fim: date, opcoes=OPCOES_SERVICO):
+    """Busca todos os serviços dentro de um intervalo de datas, com os dados relacionados."""
+    return db.query(models.Servico).options(*opcoes).filter(
         models.Servico.data >= data_inicio,
         models.Servico.data <= data_fim
     ).order_by(models.Servico.data).all()
 
+# Colunas da exportação de serviços (ver query_exportacao_servicos)
+CABECALHO_EXPORTACAO_SERVICOS = [
+    "ID", "Data", "Início", "Término", "Área", "Tipo de Atividade",
+    "Descrição", "Status", "Produtos Utilizados", "Observações",
+]
+
+def query_exportacao_servicos(data_inicio: date, data_fim: date) -> Select:
+    """
+    Monta a consulta da exportação de serviços: uma linha plana por serviço,
+    com os produtos já concatenados pelo banco. Não carrega objetos ORM, para
+    que o resultado possa ser percorrido em partes (stream/yield_per).
+    """
+    periodo = (models.Servico.data >= data_inicio, models.Servico.data <= data_fim)
+    produto = models.Produto
+    associado = models.ServicoProdutoAssociado
+    # Os produtos de cada serviço em ordem de nome (e de ID, no empate): a
+    # subconsulta ordenada garante a ordem também no SQLite sem ORDER BY no agregado
+    produtos_dos_servicos = (
+        select(
+            associado.servico_id, produto.nome, associado.produto_id,
+            (produto.nome + " (" + cast(associado.quantidade_usada, String) + " "
+             + func.coalesce(produto.unidade_uso, "") + ")").label("texto")
+        )
+        .join(produto, produto.id == associado.produto_id)
+        .join(models.Servico, models.Servico.id == associado.servico_id)
+        .where(*periodo)
+        .order_by(associado.servico_id, produto.nome, associado.produto_id)
+        .subquery()
+    )
+    produtos_por_servico = (
+        select(
+            produtos_dos_servicos.c.servico_id,
+            agregar_textos(
+                produtos_dos_servicos.c.texto, "; ", produtos_dos_servicos.c.nome, produtos_dos_servicos.c.produto_id
+            ).label("produtos")
+        )
+        .group_by(produtos_dos_servicos.c.servico_id)
+        .subquery()
+    )
+    return (
+        select(
+            models.Servico.id, models.Servico.data, models.Servico.horario_inicio, models.Servico.horario_termino,
+            models.Area.nome, models.Servico.tipo_atividade, models.Servico.descricao, models.Servico.status,
+            produtos_por_servico.c.produtos, models.Servico.observacoes
+        )
+        .join(models.Area, models.Area.id == models.Servico.area_id)
+        .outerjoin(produtos_por_servico, produtos_por_servico.c.servico_id == models.Servico.id)
+        .where(*periodo)
+        .order_by(models.Servico.data, models.Servico.id)
+    )
+
 def get_servicos_para_agenda(db: Session, year: int, month: int):
     """Busca todos os serviços de um determinado ano e mês para a agenda."""
     return db.query(models.Servico).filter(
-        extract('year', models.Servico.data) == year,
-        extract('month', models.Servico.data) == month
+        filtro_mes(models.Servico.data, year, month)
     ).all()
\ No newline at end of file
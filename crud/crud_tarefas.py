@@ -0,0 +1,126 @@
+# Arquivo: crud/crud_tarefas.py
+
+from sqlalchemy.orm import Session
+from sqlalchemy import select, update, delete
+from datetime import datetime
+from typing import Optional
+
+import models
+
+ATIVAS = ("pendente", "executando")
+
+# =================================================================
+# Funções CRUD para a fila de tarefas de relatório
+# =================================================================
+
+def get_tarefa(db: Session, tarefa_id: int):
+    """Busca uma tarefa pelo seu ID."""
+    return db.query(models.TarefaRelatorio).filter(models.TarefaRelatorio.id == tarefa_id).first()
+
+def criar_ou_reaproveitar_tarefa(db: Session, tipo: str, parametros: dict, chave: str, usuario_id: Optional[int]):
+    """
+    Enfileira uma tarefa. Se já existe uma tarefa com a mesma chave (mesmo tipo,
+    parâmetros e versão dos dados) na fila ou concluída, ela é devolvida no lugar.
+    """
+    existente = db.query(models.TarefaRelatorio).filter(
+        models.TarefaRelatorio.chave == chave,
+        models.TarefaRelatorio.status.in_(ATIVAS + ("concluida",))
+    ).order_by(models.TarefaRelatorio.id.desc()).first()
+    if existente:
+        return existente
+
+    db_tarefa = models.TarefaRelatorio(
+        tipo=tipo, parametros=parametros, chave=chave, status="pendente", usuario_id=usuario_id
+    )
+    db.add(db_tarefa)
+    db.commit()
+    db.refresh(db_tarefa)
+    return db_tarefa
+
+def reservar_proxima_tarefa(db: Session):
+    """
+    Passa a tarefa pendente mais antiga para "executando" e a retorna (ou None).
+    O UPDATE só vale se ela ainda estiver pendente, então dois trabalhadores
+    nunca pegam a mesma tarefa; no PostgreSQL o SKIP LOCKED evita que esperem um pelo outro.
+    """
+    tarefa = models.TarefaRelatorio
+    proxima = select(tarefa.id).where(tarefa.status == "pendente").order_by(tarefa.id).limit(1)\
+        .with_for_update(skip_locked=True).scalar_subquery()
+    reservada = db.execute(
+        update(tarefa).where(tarefa.id == proxima, tarefa.status == "pendente")
+        .values(status="executando", iniciado_em=datetime.now())
+        .returning(tarefa.id, tarefa.tipo, tarefa.parametros)
+        .execution_options(synchronize_session=False)
+    ).first()
+    db.commit()
+    return reservada
+
+def concluir_tarefa(db: Session, tarefa_id: int, resultado) -> bool:
+    """Grava o resultado. Não faz nada se a tarefa foi cancelada enquanto executava."""
+    return _finalizar(db, tarefa_id, status="concluida", resultado=resultado)
+
+def falhar_tarefa(db: Session, tarefa_id: int, mensagem: str) -> bool:
+    """Marca a tarefa como "erro" com a mensagem informada."""
+    return _finalizar(db, tarefa_id, status="erro", mensagem_erro=mensagem)
+
+def _finalizar(db: Session, tarefa_id: int, **valores) -> bool:
+    alteradas = db.execute(
+        update(models.TarefaRelatorio).where(
+            models.TarefaRelatorio.id == tarefa_id,
+            models.TarefaRelatorio.status == "executando"
+        ).values(concluido_em=datetime.now(), **valores)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.commit()
+    return alteradas > 0
+
+def cancelar_tarefa(db: Session, tarefa_id: int):
+    """
+    Cancela uma tarefa pendente ou em execução e a retorna.
+    Lança ValueError se ela não existir ou já tiver terminado.
+    """
+    db_tarefa = get_tarefa(db, tarefa_id)
+    if not db_tarefa:
+        raise ValueError("Tarefa não encontrada.")
+    if db_tarefa.status not in ATIVAS:
+        raise ValueError(f"A tarefa já terminou (status: {db_tarefa.status}).")
+    db_tarefa.status = "cancelada"
+    db_tarefa.concluido_em = datetime.now()
+    db.commit()
+    db.refresh(db_tarefa)
+    return db_tarefa
+
+def recolocar_tarefas_presas(db: Session, iniciadas_antes_de: datetime) -> int:
+    """Devolve para a fila as tarefas "executando" há tempo demais (ex: o processo caiu no meio)."""
+    alteradas = db.execute(
+        update(models.TarefaRelatorio).where(
+            models.TarefaRelatorio.status == "executando",
+            models.TarefaRelatorio.iniciado_em < iniciadas_antes_de
+        ).values(status="pendente", iniciado_em=None)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.commit()
+    return alteradas
+
+def devolver_para_fila(db: Session, tarefa_ids: list) -> int:
+    """Volta para "pendente" as tarefas informadas que ainda estão em execução."""
+    alteradas = db.execute(
+        update(models.TarefaRelatorio).where(
+            models.TarefaRelatorio.id.in_(tarefa_ids),
+            models.TarefaRelatorio.status == "executando"
+        ).values(status="pendente", iniciado_em=None)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.commit()
+    return alteradas
+
+def apagar_tarefas_antigas(db: Session, criadas_antes_de: datetime) -> int:
+    """Apaga tarefas terminadas (e seus resultados) criadas antes da data informada."""
+    apagadas = db.execute(
+        delete(models.TarefaRelatorio).where(
+            models.TarefaRelatorio.status.not_in(ATIVAS),
+            models.TarefaRelatorio.criado_em < criadas_antes_de
+        ).execution_options(synchronize_session=False)
+    ).rowcount
+    db.commit()
+    return apagadas
@@ -1,11 +1,15 @@
 # Arquivo: crud/crud_usuario.py
 
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from sqlalchemy.sql import Select
 from typing import Optional
 
 import models
 import schemas
 import security
+from database import executar_crud
 
 # =================================================================
 # Funções de Autenticação (que tocam o banco de dados)
@@ -19,10 +23,43 @@ def authenticate_user(db: Session, username: str, password: str) -> Optional[mod
     user = get_user_by_username(db, username=username)
     if not user:
         return None
-    if not security.verify_password(password, user.hashed_password):
+    valido, novo_hash = security.verify_and_update_password(password, user.hashed_password)
+    if not valido:
         return None
+    if novo_hash:
+        update_user_password_hash(db, user, novo_hash)
     return user
 
+async def authenticate_user_async(db: AsyncSession, username: str, password: str) -> Optional[models.User]:
+    """
+    Mesma lógica de `authenticate_user`, para rotas assíncronas: as consultas
+    usam a sessão assíncrona e o bcrypt roda no executor dedicado
+    (security.py), então os logins não disputam threads com as demais rotas.
+
+    A transação da leitura termina antes do bcrypt: uma onda de logins
+    esperando o executor não segura conexões do pool. O usuário sai da sessão
+    antes do rollback para manter os atributos carregados.
+    """
+    user = await db.run_sync(get_user_by_username, username)
+    if user:
+        db.expunge(user)
+    await db.rollback()
+    if not user:
+        return None
+    valido, novo_hash = await security.verify_and_update_password_async(password, user.hashed_password)
+    if not valido:
+        return None
+    if novo_hash:
+        # Gravação pela fila única de escrita, como nas demais rotas
+        await executar_crud(db, _atualizar_hash_por_id, user.id, novo_hash, escrita=True)
+        user.hashed_password = novo_hash
+    return user
+
+def _atualizar_hash_por_id(db: Session, user_id: int, hashed_password: str):
+    user = db.get(models.User, user_id)
+    if user:
+        update_user_password_hash(db, user, hashed_password)
+
 # =================================================================
 # Funções CRUD para Usuários
 # =================================================================
@@ -49,6 +86,21 @@ def create_user(db: Session, user: schemas.UserCreate, permissions: str = None):
     db.refresh(db_user)
     return db_user
 
+def update_user_password_hash(db: Session, user: models.User, hashed_password: str):
+    """Substitui o hash da senha de um usuário (ex: atualização do custo do bcrypt)."""
+    user.hashed_password = hashed_password
+    db.add(user)
+    db.commit()
+    db.refresh(user)
+    return user
+
+# Ordem estável da listagem paginada (ver crud/paginacao.py)
+CHAVES_USUARIOS = ((models.User.id, False),)
+
+def query_users() -> Select:
+    """Monta o SELECT dos usuários, sem ordenação."""
+    return select(models.User)
+
 def get_users(db: Session):
     """Retorna uma lista de todos os usuários."""
     return db.query(models.User).all()
@@ -63,6 +115,7 @@ def update_user_permissions(db: Session, user_id: int, permissions: str):
     db.add(db_user)
     db.commit()
     db.refresh(db_user)
+    security.invalidar_usuario_em_cache(user_id)
     return db_user
 
 def delete_user(db: Session, user_id: int):
@@ -71,5 +124,6 @@ def delete_user(db: Session, user_id: int):
     if db_user:
         db.delete(db_user)
         db.commit()
+        security.invalidar_usuario_em_cache(user_id)
         return {"ok": True}
     return None
\ No newline at end of file
@@ -0,0 +1,63 @@
+# Arquivo: crud/dialeto.py
+
+from sqlalchemy.orm import Session
+from sqlalchemy import func, cast, literal, Date, String
+from sqlalchemy.sql.functions import FunctionElement
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.dialects import postgresql, sqlite
+
+# =================================================================
+# Funções auxiliares para recursos que variam entre PostgreSQL e SQLite
+# =================================================================
+
+def eh_postgresql(db: Session) -> bool:
+    """Indica se a sessão está ligada a um banco PostgreSQL."""
+    return db.get_bind().dialect.name == "postgresql"
+
+def insert_do_dialeto(db: Session, modelo):
+    """Retorna o INSERT do dialeto em uso, que suporta ON CONFLICT."""
+    if eh_postgresql(db):
+        return postgresql.insert(modelo)
+    return sqlite.insert(modelo)
+
+def inicio_do_periodo_sql(db: Session, coluna, periodo: str):
+    """
+    Expressão SQL com o primeiro dia da semana (segunda-feira) ou do mês de
+    `coluna`. Mesmo resultado de `periodos.inicio_do_periodo`, mas no banco.
+    """
+    if eh_postgresql(db):
+        return cast(func.date_trunc("week" if periodo == "semana" else "month", coluna), Date)
+    if periodo == "semana":
+        # "weekday 0" avança até o domingo (ou fica, se já for domingo); 6 dias antes é a segunda
+        return func.date(coluna, "weekday 0", "-6 days", type_=Date)
+    return func.date(coluna, "start of month", type_=Date)
+
+class agregar_textos(FunctionElement):
+    """
+    `agregar_textos(texto, separador, *ordem)`: concatena os textos do grupo
+    na ordem de `ordem` (string_agg no PostgreSQL, group_concat no SQLite).
+    O SQLite só aceita ORDER BY dentro do group_concat a partir da 3.44; antes
+    disso vale a ordem em que as linhas chegam, então a consulta deve agregar
+    uma subconsulta já ordenada pelas mesmas colunas.
+    """
+    type = String()
+    inherit_cache = True
+
+    def __init__(self, texto, separador: str, *ordem):
+        super().__init__(texto, literal(separador), *ordem)
+
+def _partes_da_agregacao(element, compiler, **kw):
+    texto, separador, *ordem = [compiler.process(clausula, **kw) for clausula in element.clauses]
+    return texto, separador, ", ".join(ordem)
+
+@compiles(agregar_textos)
+def _agregar_textos_postgresql(element, compiler, **kw):
+    texto, separador, ordem = _partes_da_agregacao(element, compiler, **kw)
+    return f"string_agg({texto}, {separador} ORDER BY {ordem})"
+
+@compiles(agregar_textos, "sqlite")
+def _agregar_textos_sqlite(element, compiler, **kw):
+    texto, separador, ordem = _partes_da_agregacao(element, compiler, **kw)
+    if (compiler.dialect.server_version_info or ()) >= (3, 44):
+        return f"group_concat({texto}, {separador} ORDER BY {ordem})"
+    return f"group_concat({texto}, {separador})"
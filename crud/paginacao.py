@@ -0,0 +1,161 @@
+# Arquivo: crud/paginacao.py
+
+import json
+import base64
+from datetime import date, datetime
+from typing import Optional, Sequence, Tuple
+
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import Select
+from sqlalchemy import and_, or_, false
+
+# =================================================================
+# Paginação por cursor (keyset) e seleção de campos
+# =================================================================
+# Cada listagem define suas chaves de ordenação, terminando sempre em uma
+# coluna única (o id), como em:
+#
+#     CHAVES_SERVICOS = ((models.Servico.data, True), (models.Servico.id, True))
+#
+# onde True indica ordem decrescente. A próxima página começa logo depois da
+# última linha da anterior (`WHERE (data, id) < (...)`), então o banco vai
+# direto ao ponto pelo índice em vez de contar e descartar linhas como no OFFSET.
+# O cursor devolvido ao cliente são os valores das chaves da última linha.
+
+LIMITE_PADRAO = 100
+LIMITE_MAXIMO = 1000
+
+Chaves = Sequence[Tuple[object, bool]]
+
+def _para_json(valor):
+    if isinstance(valor, (date, datetime)):
+        return valor.isoformat()
+    return valor
+
+def codificar_cursor(valores: Sequence) -> str:
+    """Transforma os valores das chaves da última linha em um texto opaco para a URL."""
+    texto = json.dumps([_para_json(valor) for valor in valores], separators=(",", ":"))
+    return base64.urlsafe_b64encode(texto.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decodificar_cursor(cursor: str, chaves: Chaves) -> list:
+    """Lê um cursor gerado por `codificar_cursor`. Lança ValueError se ele não for válido para as chaves."""
+    try:
+        valores = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except ValueError:
+        raise ValueError("Cursor inválido.")
+    if not isinstance(valores, list) or len(valores) != len(chaves):
+        raise ValueError("Cursor inválido.")
+
+    convertidos = []
+    for (coluna, _), valor in zip(chaves, valores):
+        if valor is None:
+            if not coluna.nullable:
+                raise ValueError("Cursor inválido.")
+            convertidos.append(valor)
+            continue
+        tipo = coluna.type.python_type
+        try:
+            if issubclass(tipo, datetime):
+                valor = datetime.fromisoformat(valor)
+            elif issubclass(tipo, date):
+                valor = date.fromisoformat(valor)
+        except (TypeError, ValueError):
+            raise ValueError("Cursor inválido.")
+        # Um cursor editado à mão com o tipo errado viraria erro do banco (500
+        # no PostgreSQL); o JSON não distingue float de int, e bool não vale como int
+        aceitos = (int, float) if tipo is float else tipo
+        if (isinstance(valor, bool) and tipo is not bool) or not isinstance(valor, aceitos):
+            raise ValueError("Cursor inválido.")
+        convertidos.append(valor)
+    return convertidos
+
+def _ordenacao(chaves: Chaves) -> list:
+    """ORDER BY das chaves. Colunas que aceitam NULL levam os nulos para o fim, nos dois bancos."""
+    ordem = []
+    for coluna, decrescente in chaves:
+        expressao = coluna.desc() if decrescente else coluna.asc()
+        ordem.append(expressao.nulls_last() if coluna.nullable else expressao)
+    return ordem
+
+def _depois_do_cursor(chaves: Chaves, valores: list):
+    """
+    Condição "linha vem depois do cursor" na ordem de `_ordenacao`:
+    (a > va) OR (a = va AND b > vb) OR ..., tratando os nulos (que ficam no fim).
+    """
+    alternativas = []
+    for i, ((coluna, decrescente), valor) in enumerate(zip(chaves, valores)):
+        iguais = [
+            anterior.is_(None) if valor_anterior is None else anterior == valor_anterior
+            for (anterior, _), valor_anterior in zip(chaves[:i], valores[:i])
+        ]
+        if valor is None:
+            continue  # nada vem depois de um nulo nesta coluna, só os nulos iguais (próxima chave)
+        depois = coluna < valor if decrescente else coluna > valor
+        if coluna.nullable:
+            depois = or_(depois, coluna.is_(None))
+        alternativas.append(and_(*iguais, depois) if iguais else depois)
+    return or_(*alternativas) if alternativas else false()
+
+def campos_selecionados(fields: Optional[str], modelo, esquema) -> Optional[list]:
+    """
+    Valida a lista `fields` ("id,numero,status"). Só valem campos do esquema de
+    resposta que são colunas da tabela (nada de relacionamentos nem de colunas
+    que a API não expõe). Lança ValueError com os campos disponíveis.
+    """
+    if fields is None:
+        return None
+    pedidos = list(dict.fromkeys(campo.strip() for campo in fields.split(",") if campo.strip()))
+    colunas = modelo.__table__.columns.keys()
+    disponiveis = [campo for campo in esquema.model_fields if campo in colunas]
+    invalidos = [campo for campo in pedidos if campo not in disponiveis]
+    if invalidos or not pedidos:
+        raise ValueError(
+            f"Campo(s) inválido(s): {', '.join(invalidos) or '(nenhum)'}. Disponíveis: {', '.join(disponiveis)}."
+        )
+    return pedidos
+
+def paginar(
+    db: Session, consulta: Select, modelo, chaves: Chaves, limite: Optional[int] = None,
+    cursor: Optional[str] = None, campos: Optional[list] = None, opcoes: Sequence = ()
+) -> dict:
+    """
+    Executa `consulta` (um select do `modelo`, já com os filtros) uma página por vez.
+    Sem `limite` nem `cursor`, devolve todas as linhas (útil só com `campos`).
+    Com `campos`, só essas colunas são lidas do banco e os itens são dicionários;
+    sem, os itens são objetos do modelo carregados com as `opcoes` (joinedload etc.).
+    Retorna {"itens": [...], "proximo_cursor": str ou None}.
+    """
+    if cursor:
+        consulta = consulta.where(_depois_do_cursor(chaves, decodificar_cursor(cursor, chaves)))
+    consulta = consulta.order_by(None).order_by(*_ordenacao(chaves))
+    if limite is None and cursor:
+        limite = LIMITE_PADRAO
+    if limite is not None:
+        limite = max(1, min(limite, LIMITE_MAXIMO))
+        consulta = consulta.limit(limite + 1)
+
+    nomes_chaves = [coluna.key for coluna, _ in chaves]
+    if campos:
+        lidas = list(dict.fromkeys(campos + nomes_chaves))
+        linhas = db.execute(consulta.with_only_columns(*(getattr(modelo, nome) for nome in lidas))).all()
+        tem_mais = limite is not None and len(linhas) > limite
+        linhas = linhas[:limite]
+        itens = [{nome: getattr(linha, nome) for nome in campos} for linha in linhas]
+        ultima = [getattr(linhas[-1], nome) for nome in nomes_chaves] if linhas else None
+    else:
+        linhas = db.scalars(consulta.options(*opcoes)).unique().all()
+        tem_mais = limite is not None and len(linhas) > limite
+        itens = linhas[:limite]
+        ultima = [getattr(itens[-1], nome) for nome in nomes_chaves] if itens else None
+
+    return {"itens": itens, "proximo_cursor": codificar_cursor(ultima) if tem_mais else None}
+
+def cabecalhos_da_pagina(url, proximo_cursor: Optional[str]) -> dict:
+    """
+    Cabeçalhos da resposta paginada: o cursor da próxima página em
+    X-Next-Cursor e a URL dela em Link (rel="next"). `url` é o `request.url`.
+    """
+    if not proximo_cursor:
+        return {}
+    proxima = url.include_query_params(cursor=proximo_cursor)
+    return {"X-Next-Cursor": proximo_cursor, "Link": f'<{proxima}>; rel="next"'}
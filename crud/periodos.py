@@ -0,0 +1,59 @@
+# Arquivo: crud/periodos.py
+
+from datetime import date, timedelta
+from typing import List, Tuple
+from sqlalchemy import and_
+
+# =================================================================
+# Funções auxiliares para filtros por período
+# =================================================================
+
+# Anos aceitos nos filtros por mês: o `date` vai até 9999 e o fim do
+# intervalo é o primeiro dia do mês seguinte (ver as rotas da agenda)
+ANO_MINIMO, ANO_MAXIMO = 1, 9998
+
+def intervalo_do_mes(year: int, month: int) -> Tuple[date, date]:
+    """Retorna o primeiro dia do mês e o primeiro dia do mês seguinte."""
+    primeiro_dia = date(year, month, 1)
+    if month == 12:
+        proximo_mes = date(year + 1, 1, 1)
+    else:
+        proximo_mes = date(year, month + 1, 1)
+    return primeiro_dia, proximo_mes
+
+def filtro_mes(coluna, year: int, month: int):
+    """
+    Monta o filtro `coluna >= primeiro_dia AND coluna < proximo_mes`.
+    Diferente de extract('year'/'month', coluna), a coluna fica "limpa"
+    e o banco (PostgreSQL ou SQLite) consegue usar o índice dela.
+    """
+    inicio, fim = intervalo_do_mes(year, month)
+    return and_(coluna >= inicio, coluna < fim)
+
+def filtro_mes_atual(coluna):
+    """Atalho de `filtro_mes` para o mês corrente."""
+    hoje = date.today()
+    return filtro_mes(coluna, hoje.year, hoje.month)
+
+# =================================================================
+# Agrupamento por semana ou mês (séries temporais)
+# =================================================================
+# As semanas começam na segunda-feira, como no date_trunc('week') do PostgreSQL.
+
+def inicio_do_periodo(dia: date, periodo: str) -> date:
+    """Primeiro dia da semana ou do mês que contém `dia`."""
+    if periodo == "semana":
+        return dia - timedelta(days=dia.weekday())
+    return dia.replace(day=1)
+
+def periodos_entre(inicio: date, fim: date, periodo: str) -> List[date]:
+    """Início de cada semana ou mês que toca o intervalo [inicio, fim], em ordem."""
+    periodos = []
+    atual = inicio_do_periodo(inicio, periodo)
+    while atual <= fim:
+        periodos.append(atual)
+        if periodo == "semana":
+            atual += timedelta(days=7)
+        else:
+            atual = intervalo_do_mes(atual.year, atual.month)[1]
+    return periodos
@@ -0,0 +1,189 @@
+# Arquivo: exportacao.py (exportação de relatórios em CSV e XLSX, em fluxo)
+
+import io
+import os
+import csv
+import re
+import zipfile
+from datetime import date, datetime, time
+from typing import AsyncIterator, Iterable, List, Sequence
+from xml.sax.saxutils import escape
+
+# =================================================================
+# Conversão de valores
+# =================================================================
+# As funções deste módulo recebem as linhas em partes (listas de tuplas),
+# como chegam de `AsyncResult.partitions()`, e devolvem os bytes do arquivo
+# aos poucos. Nenhuma delas guarda o relatório inteiro em memória.
+
+# Quantas linhas são lidas do banco (e escritas no arquivo) por vez
+TAMANHO_PARTE = int(os.environ.get("EXPORTACAO_TAMANHO_PARTE", "500"))
+
+MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+def _texto(valor) -> str:
+    if valor is None:
+        return ""
+    if isinstance(valor, (date, time)):
+        return valor.isoformat()
+    return str(valor)
+
+# =================================================================
+# CSV
+# =================================================================
+
+async def gerar_csv(cabecalho: Sequence[str], partes: AsyncIterator[Iterable[tuple]]) -> AsyncIterator[bytes]:
+    """
+    Gera um CSV separado por ";" (o padrão do Excel em português) com BOM,
+    para que os acentos apareçam corretamente ao abrir o arquivo.
+    """
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer, delimiter=";")
+    escritor.writerow(cabecalho)
+    yield ("\ufeff" + buffer.getvalue()).encode("utf-8")
+
+    async for linhas in partes:
+        buffer.seek(0)
+        buffer.truncate()
+        escritor.writerows([_texto(valor) for valor in linha] for linha in linhas)
+        yield buffer.getvalue().encode("utf-8")
+
+# =================================================================
+# XLSX
+# =================================================================
+# Um XLSX é um ZIP com alguns XMLs. Montamos só o mínimo (uma planilha,
+# textos "inline" e um estilo de data) e escrevemos a planilha linha a linha
+# direto no ZIP, que o zipfile consegue gravar em um destino não pesquisável.
+
+_CARACTERES_INVALIDOS_XML = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    '</Types>'
+)
+_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="{nome}" sheetId="1" r:id="rId1"/></sheets>'
+    '</workbook>'
+)
+_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+    '<Relationship Id="rId2" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>'
+    '</Relationships>'
+)
+# Estilo 0: padrão. Estilo 1: data (formato 14, a data curta do idioma da planilha).
+# Estilo 2: data e hora.
+_STYLES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<numFmts count="1"><numFmt numFmtId="164" formatCode="dd/mm/yyyy hh:mm"/></numFmts>'
+    '<fonts count="1"><font><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="2"><fill><patternFill patternType="none"/></fill><fill><patternFill patternType="gray125"/></fill></fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="3">'
+    '<xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="14" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+    '<xf numFmtId="164" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+    '</cellXfs>'
+    '</styleSheet>'
+)
+_ESTILO_DATA, _ESTILO_DATA_HORA = 1, 2
+# Dia zero das datas do Excel (sistema 1900, já contando o 29/02/1900 que não existiu)
+_EPOCA_EXCEL = datetime(1899, 12, 30)
+
+class _SaidaEmPartes:
+    """Destino de escrita do ZIP: acumula os bytes até serem entregues ao cliente."""
+
+    def __init__(self):
+        self._partes: List[bytes] = []
+
+    def write(self, dados: bytes) -> int:
+        self._partes.append(bytes(dados))
+        return len(dados)
+
+    def flush(self):
+        pass
+
+    def retirar(self) -> bytes:
+        dados = b"".join(self._partes)
+        self._partes.clear()
+        return dados
+
+def _coluna(indice: int) -> str:
+    """Converte 0, 1, ..., 26 em A, B, ..., AA."""
+    letras = ""
+    indice += 1
+    while indice:
+        indice, resto = divmod(indice - 1, 26)
+        letras = chr(65 + resto) + letras
+    return letras
+
+def _numero_de_serie(valor):
+    """Data (ou data e hora) como número de série do Excel: dias desde _EPOCA_EXCEL."""
+    if isinstance(valor, datetime):
+        return (valor.replace(tzinfo=None) - _EPOCA_EXCEL).total_seconds() / 86400
+    return (valor - _EPOCA_EXCEL.date()).days
+
+def _linha_xml(numero: int, valores: Sequence) -> str:
+    celulas = []
+    for i, valor in enumerate(valores):
+        referencia = f"{_coluna(i)}{numero}"
+        if isinstance(valor, date):
+            # Número com estilo de data: a planilha consegue ordenar e filtrar
+            estilo = _ESTILO_DATA_HORA if isinstance(valor, datetime) else _ESTILO_DATA
+            celulas.append(f'<c r="{referencia}" s="{estilo}"><v>{_numero_de_serie(valor)}</v></c>')
+        elif isinstance(valor, (int, float)) and not isinstance(valor, bool):
+            celulas.append(f'<c r="{referencia}"><v>{valor}</v></c>')
+        elif valor is not None:
+            texto = escape(_CARACTERES_INVALIDOS_XML.sub("", _texto(valor)))
+            celulas.append(f'<c r="{referencia}" t="inlineStr"><is><t xml:space="preserve">{texto}</t></is></c>')
+    return f'<row r="{numero}">{"".join(celulas)}</row>'
+
+async def gerar_xlsx(
+    cabecalho: Sequence[str], partes: AsyncIterator[Iterable[tuple]], nome_planilha: str = "Relatorio"
+) -> AsyncIterator[bytes]:
+    """Gera um XLSX de uma planilha, entregando os bytes conforme as linhas chegam."""
+    saida = _SaidaEmPartes()
+    with zipfile.ZipFile(saida, "w", compression=zipfile.ZIP_DEFLATED) as arquivo_zip:
+        arquivo_zip.writestr("[Content_Types].xml", _CONTENT_TYPES)
+        arquivo_zip.writestr("_rels/.rels", _RELS)
+        arquivo_zip.writestr("xl/workbook.xml", _WORKBOOK.format(nome=escape(nome_planilha[:31], {'"': "&quot;"})))
+        arquivo_zip.writestr("xl/_rels/workbook.xml.rels", _WORKBOOK_RELS)
+        arquivo_zip.writestr("xl/styles.xml", _STYLES)
+
+        with arquivo_zip.open("xl/worksheets/sheet1.xml", "w") as planilha:
+            planilha.write((
+                '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+                + _linha_xml(1, cabecalho)
+            ).encode("utf-8"))
+            numero = 1
+            async for linhas in partes:
+                trecho = []
+                for linha in linhas:
+                    numero += 1
+                    trecho.append(_linha_xml(numero, linha))
+                planilha.write("".join(trecho).encode("utf-8"))
+                yield saida.retirar()
+            planilha.write(b"</sheetData></worksheet>")
+    yield saida.retirar()
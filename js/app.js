@@ -12,7 +12,7 @@ import { loadServicosModule, iniciarEdicaoServico, excluirServico, concluirServi
 import { loadContagemModule, carregarGradeContagem, salvarContagem } from './module_contagem.js';
 import { loadConfiguracoesModule, excluirPraga } from './module_configuracoes.js';
 import { loadSegurancaModule, salvarPermissoes, excluirUsuario } from './module_seguranca.js';
-import { loadRelatoriosModule, gerarRelatorioServicos, exportarRelatorioServicosPDF, gerarRelatorioProdutos, exportarRelatorioProdutosPDF, gerarRelatorioArea } from './module_relatorios.js';
+import { loadRelatoriosModule, gerarRelatorioServicos, exportarRelatorioServicosPDF, exportarRelatorioServicosArquivo, gerarRelatorioProdutos, exportarRelatorioProdutosPDF, gerarRelatorioArea } from './module_relatorios.js';
 import { abrirModalObservacaoMIP } from './module_mip_modal.js';
 import { loadAgendaModule, abrirModalAgendamento, abrirModalOcorrencia, iniciarExclusaoOcorrencia, iniciarEdicaoOcorrencia, iniciarExclusaoAgendamento, iniciarEdicaoAgendamento } from './module_agenda.js';
 import { exibirRelatorioServico } from './module_servico_relatorio.js';
@@ -212,6 +212,7 @@ function handleMainContentClick(e) {
         // Relatórios
         case 'gerar-relatorio-servicos': gerarRelatorioServicos(); break;
         case 'exportar-pdf-servicos': exportarRelatorioServicosPDF(); break;
+        case 'exportar-arquivo-servicos': exportarRelatorioServicosArquivo(target.dataset.formato); break;
         case 'gerar-relatorio-produtos': gerarRelatorioProdutos(); break;
         case 'exportar-pdf-produtos': exportarRelatorioProdutosPDF(); break;
         case 'gerar-relatorio-area': gerarRelatorioArea(); break;
@@ -79,7 +79,11 @@ export async function gerarRelatorioServicos() {
         let tabelaHtml = `
             <div class="d-flex justify-content-between align-items-center mb-3">
                 <h3>Resultados</h3>
-                <button class="btn btn-success" data-action="exportar-pdf-servicos"><i class="bi bi-file-earmark-arrow-down-fill me-2"></i>Exportar para PDF</button>
+                <div class="btn-group">
+                    <button class="btn btn-success" data-action="exportar-pdf-servicos"><i class="bi bi-file-earmark-arrow-down-fill me-2"></i>Exportar para PDF</button>
+                    <button class="btn btn-outline-success" data-action="exportar-arquivo-servicos" data-formato="csv">CSV</button>
+                    <button class="btn btn-outline-success" data-action="exportar-arquivo-servicos" data-formato="xlsx">XLSX</button>
+                </div>
             </div>
             <div class="table-responsive">
                 <table class="table table-striped">
@@ -124,6 +128,31 @@ export function exportarRelatorioServicosPDF() {
     doc.save(`relatorio_servicos_${new Date().toISOString().slice(0, 10)}.pdf`);
 }
 
+// Baixa o relatório de serviços em CSV ou XLSX, gerado pelo servidor em fluxo
+// (não depende dos dados já carregados na tela, serve para períodos longos)
+export async function exportarRelatorioServicosArquivo(formato) {
+    const dataInicio = document.getElementById('data-inicio').value;
+    const dataFim = document.getElementById('data-fim').value;
+    if (!dataInicio || !dataFim) {
+        showToast("Por favor, selecione a data de início e de fim.", "error");
+        return;
+    }
+    try {
+        const url = `${apiUrl}/api/relatorios/servicos/exportar?data_inicio=${dataInicio}&data_fim=${dataFim}&formato=${formato}`;
+        const response = await fetch(url, { headers: { 'Authorization': `Bearer ${token}` } });
+        if (!response.ok) throw new Error('Falha ao exportar o relatório.');
+
+        const blob = await response.blob();
+        const link = document.createElement('a');
+        link.href = URL.createObjectURL(blob);
+        link.download = `relatorio_servicos_${dataInicio}_${dataFim}.${formato}`;
+        link.click();
+        URL.revokeObjectURL(link.href);
+    } catch (error) {
+        showToast(error.message, 'error');
+    }
+}
+
 export async function gerarRelatorioProdutos() {
     const resultadoDiv = document.getElementById('resultado-relatorio');
     resultadoDiv.innerHTML = '<p class="text-center">Buscando dados de produtos...</p>';
@@ -1,10 +1,15 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request, Response, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 import os
 
 # Importando seus módulos de banco de dados e routers
-import models
-from database import engine
+import migracoes, metricas
+from database import (
+    engine, async_engine, SessionLocal, aquecer_pool, get_pool_stats, iniciar_conectores, fechar_conectores,
+    FilaDeEscritaOcupada
+)
 from routers import (
     usuarios, 
     areas, 
@@ -14,22 +19,62 @@ from routers import (
     mip, 
     relatorios, 
     agenda, 
-    dashboard
+    dashboard,
+    sistema,
+    tarefas as tarefas_router
 )
+import tarefas
 
 # =================================================================
 # INICIALIZAÇÃO E CONFIGURAÇÃO DA APLICAÇÃO
 # =================================================================
 
-# Cria as tabelas no banco de dados se elas não existirem.
-# Ideal para desenvolvimento e para a primeira execução na produção.
-models.Base.metadata.create_all(bind=engine)
+# Nada aqui toca no banco durante o import (cada worker do wsgi.py e cada
+# cold start do Cloud Run importa este módulo): o banco é preparado no
+# lifespan, de acordo com ESQUEMA_NA_INICIALIZACAO:
+#   "criar"     (padrão) cria tabelas e índices que faltam, aplica as migrações
+#               e os preenchimentos únicos. Ideal para desenvolvimento e desktop.
+#   "verificar" só confere o carimbo de versão do esquema (uma consulta). Para
+#               produção, com `python -m migracoes` rodando a cada implantação.
+ESQUEMA_NA_INICIALIZACAO = os.environ.get("ESQUEMA_NA_INICIALIZACAO", "criar").lower()
+
+def preparar_banco():
+    """Prepara (ou só confere) o esquema do banco. Chamado pelo lifespan (o wsgi.py também o executa)."""
+    if ESQUEMA_NA_INICIALIZACAO == "verificar":
+        migracoes.verificar_esquema(engine)
+        return
+    # Colunas novas em tabelas que já existiam (ver migracoes.py)
+    for migracao in migracoes.preparar_esquema(engine):
+        print(f"--- MIGRAÇÃO APLICADA: {migracao} ---")
+    # Preenche as tabelas de resumo do Dashboard e o livro de estoque na primeira execução
+    with SessionLocal() as db:
+        for mensagem in migracoes.preparar_dados(db):
+            print(f"--- {mensagem} ---")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Executado na inicialização: cria os conectores do Cloud SQL, prepara o banco
+    (ver ESQUEMA_NA_INICIALIZACAO), pré-abre conexões do pool (DB_POOL_PREWARM) e
+    inicia os trabalhadores da fila de relatórios. No desligamento, as tarefas
+    interrompidas voltam para a fila e os conectores são fechados.
+    """
+    await iniciar_conectores()
+    preparar_banco()
+    abertas = await aquecer_pool()
+    if abertas:
+        print(f"--- POOL AQUECIDO COM {abertas} CONEXÃO(ÕES) ---")
+    await tarefas.iniciar_trabalhadores()
+    yield
+    await tarefas.parar_trabalhadores()
+    await fechar_conectores()
 
 # Cria a instância principal do FastAPI
 app = FastAPI(
     title="API do Sistema SISE",
     description="API com lógica de negócio para a aplicação web do SISE.",
     version="1.2.0",
+    lifespan=lifespan,
 )
 
 # =================================================================
@@ -50,8 +95,21 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"], # Permite todos os métodos (GET, POST, PUT, DELETE, etc.)
     allow_headers=["*"], # Permite todos os cabeçalhos
+    expose_headers=["X-Next-Cursor", "Link"], # Cursor da próxima página nas listagens paginadas
 )
 
+# Latência, consultas SQL e tempo de banco por rota (ver metricas.py e a rota /metrics).
+# Adicionado por último para ficar por fora de todos os outros middlewares.
+metricas.instrumentar_engine(engine)
+metricas.instrumentar_engine(async_engine.sync_engine)
+app.add_middleware(metricas.MiddlewareMetricas)
+
+# Escrita que esperou demais na fila única do SQLite (ver database.py):
+# o cliente pode tentar de novo em seguida
+@app.exception_handler(FilaDeEscritaOcupada)
+async def fila_de_escrita_ocupada(request: Request, exc: FilaDeEscritaOcupada):
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "1"})
+
 # =================================================================
 # INCLUSÃO DOS ROUTERS (Módulos da API)
 # =================================================================
@@ -66,6 +124,8 @@ app.include_router(mip.router)
 app.include_router(relatorios.router)
 app.include_router(agenda.router)
 app.include_router(dashboard.router)
+app.include_router(sistema.router)
+app.include_router(tarefas_router.router)
 
 # =================================================================
 # ROTA PRINCIPAL
@@ -76,6 +136,13 @@ def read_root():
     """Rota raiz para verificar se a API está online."""
     return {"Sistema": "API do SISE", "Status": "Online"}
 
+@app.get("/metrics", tags=["Root"], include_in_schema=False)
+def read_metrics(request: Request):
+    """Métricas no formato texto do Prometheus (protegidas por METRICAS_TOKEN, se definido)."""
+    if metricas.METRICAS_TOKEN and request.headers.get("authorization") != f"Bearer {metricas.METRICAS_TOKEN}":
+        raise HTTPException(status_code=401, detail="Token de métricas inválido")
+    return Response(metricas.exportar(get_pool_stats()), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 # =================================================================
 # BLOCO DE EXECUÇÃO LOCAL
 # =================================================================
@@ -0,0 +1,259 @@
+# Arquivo: metricas.py (latência e consultas SQL por rota, no formato do Prometheus)
+
+import os
+import time
+import threading
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# =================================================================
+# Configuração
+# =================================================================
+# Ligado por padrão: o custo é um perf_counter e algumas somas por consulta
+# e por requisição, sem E/S e sem travas no caminho das consultas.
+METRICAS_ENABLED = os.environ.get("METRICAS_ENABLED", "1") == "1"
+# Cabeçalho Server-Timing nas respostas (aparece na aba Network do navegador)
+METRICAS_SERVER_TIMING = os.environ.get("METRICAS_SERVER_TIMING", "1") == "1"
+
+# Limites (em segundos) dos baldes do histograma de latência
+BALDES_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Limites dos baldes do histograma de consultas SQL por requisição (N+1 aparece no fim)
+BALDES_CONSULTAS = (0, 1, 2, 5, 10, 20, 50, 100, 250)
+
+# Se definido, o /metrics exige "Authorization: Bearer <METRICAS_TOKEN>"
+METRICAS_TOKEN = os.environ.get("METRICAS_TOKEN")
+
+# Rótulo das requisições que não casaram com nenhuma rota (evita um rótulo por URL)
+ROTA_DESCONHECIDA = "(sem rota)"
+
+# =================================================================
+# Acumuladores
+# =================================================================
+
+class _Requisicao:
+    """Consultas feitas durante uma requisição (uma por requisição, via ContextVar)."""
+    __slots__ = ("escopo", "consultas", "tempo_db", "linhas")
+
+    def __init__(self, escopo: dict):
+        self.escopo = escopo
+        self.consultas = 0
+        self.tempo_db = 0.0
+        self.linhas = 0
+
+# O SQLAlchemy repassa o contexto para o greenlet do run_sync e o Starlette
+# para as threads do threadpool, então os eventos do banco enxergam a requisição.
+_requisicao_atual: ContextVar[Optional[_Requisicao]] = ContextVar("metricas_requisicao", default=None)
+
+def _nome_da_rota(escopo: dict) -> str:
+    return getattr(escopo.get("route"), "path", None) or ROTA_DESCONHECIDA
+
+def rota_atual() -> Optional[str]:
+    """Método e modelo da rota da requisição em andamento (ex: "GET /api/areas/"), ou None fora de uma."""
+    requisicao = _requisicao_atual.get()
+    if requisicao is None:
+        return None
+    return f"{requisicao.escopo['method']} {_nome_da_rota(requisicao.escopo)}"
+
+class _Histograma:
+    __slots__ = ("limites", "baldes", "soma", "total")
+
+    def __init__(self, limites):
+        self.limites = limites
+        self.baldes = [0] * (len(limites) + 1)  # o último é o +Inf
+        self.soma = 0.0
+        self.total = 0
+
+    def observar(self, valor):
+        self.baldes[bisect_left(self.limites, valor)] += 1
+        self.soma += valor
+        self.total += 1
+
+class _MetricasDaRota:
+    __slots__ = ("latencia", "consultas", "tempo_db", "linhas", "por_status")
+
+    def __init__(self):
+        self.latencia = _Histograma(BALDES_LATENCIA)
+        self.consultas = _Histograma(BALDES_CONSULTAS)
+        self.tempo_db = 0.0
+        self.linhas = 0
+        self.por_status = {}
+
+# {(método, rota): _MetricasDaRota}
+_rotas = {}
+# Protege a gravação contra a leitura do /metrics (que pode rodar em outra thread)
+_rotas_lock = threading.Lock()
+
+def _registrar(metodo: str, rota: str, status: int, duracao: float, requisicao: _Requisicao):
+    with _rotas_lock:
+        metricas = _rotas.get((metodo, rota))
+        if metricas is None:
+            metricas = _rotas[(metodo, rota)] = _MetricasDaRota()
+        metricas.latencia.observar(duracao)
+        metricas.consultas.observar(requisicao.consultas)
+        metricas.tempo_db += requisicao.tempo_db
+        metricas.linhas += requisicao.linhas
+        metricas.por_status[status] = metricas.por_status.get(status, 0) + 1
+
+# =================================================================
+# Eventos do banco
+# =================================================================
+
+def _antes_da_consulta(conn, cursor, statement, parameters, context, executemany):
+    if _requisicao_atual.get() is not None:
+        conn.info.setdefault("metricas_inicio", []).append(time.perf_counter())
+
+def _depois_da_consulta(conn, cursor, statement, parameters, context, executemany):
+    requisicao = _requisicao_atual.get()
+    if requisicao is None:
+        return
+    inicios = conn.info.get("metricas_inicio")
+    if inicios:
+        requisicao.tempo_db += time.perf_counter() - inicios.pop()
+    requisicao.consultas += 1
+    # rowcount vale para INSERT/UPDATE/DELETE (e SELECT no PostgreSQL); nos
+    # adaptadores assíncronos do SQLAlchemy o resultado já veio inteiro em _rows
+    linhas = cursor.rowcount
+    if linhas is None or linhas < 0:
+        linhas = len(getattr(cursor, "_rows", None) or ())
+    requisicao.linhas += linhas
+
+def _consulta_falhou(contexto_da_excecao):
+    # Sem o after_cursor_execute, o início empilhado ficaria para trás
+    inicios = contexto_da_excecao.connection is not None and \
+        contexto_da_excecao.connection.info.get("metricas_inicio")
+    if inicios and _requisicao_atual.get() is not None:
+        inicios.pop()
+
+def instrumentar_engine(engine: Engine):
+    """Liga a contagem de consultas e do tempo de banco em uma engine (síncrona ou `async_engine.sync_engine`)."""
+    if not event.contains(engine, "before_cursor_execute", _antes_da_consulta):
+        event.listen(engine, "before_cursor_execute", _antes_da_consulta)
+        event.listen(engine, "after_cursor_execute", _depois_da_consulta)
+        event.listen(engine, "handle_error", _consulta_falhou)
+
+# =================================================================
+# Middleware ASGI
+# =================================================================
+
+def _server_timing(duracao: float, requisicao: _Requisicao) -> bytes:
+    return (
+        f'app;dur={duracao * 1000:.1f}, '
+        f'db;dur={requisicao.tempo_db * 1000:.1f};desc="{requisicao.consultas} consultas"'
+    ).encode("latin-1")
+
+class MiddlewareMetricas:
+    """
+    Mede cada requisição HTTP: latência até o fim do corpo, consultas SQL, tempo
+    de banco e linhas, agrupados por método e modelo da rota ("/api/servicos/{service_id}").
+    Acrescenta o cabeçalho Server-Timing com o que foi medido até o envio dos cabeçalhos.
+    ASGI puro (e não BaseHTTPMiddleware) para não atrapalhar as respostas em stream.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not METRICAS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        inicio = time.perf_counter()
+        requisicao = _Requisicao(scope)
+        token = _requisicao_atual.set(requisicao)
+        status = 500
+
+        async def enviar(mensagem):
+            nonlocal status
+            if mensagem["type"] == "http.response.start":
+                status = mensagem["status"]
+                if METRICAS_SERVER_TIMING:
+                    cabecalhos = list(mensagem.get("headers", ()))
+                    cabecalhos.append((b"server-timing", _server_timing(time.perf_counter() - inicio, requisicao)))
+                    mensagem = {**mensagem, "headers": cabecalhos}
+            await send(mensagem)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            _requisicao_atual.reset(token)
+            _registrar(scope["method"], _nome_da_rota(scope), status, time.perf_counter() - inicio, requisicao)
+
+# =================================================================
+# Exposição no formato texto do Prometheus
+# =================================================================
+
+def _escapar(valor) -> str:
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _rotulos(**rotulos) -> str:
+    return "{" + ",".join(f'{nome}="{_escapar(valor)}"' for nome, valor in rotulos.items()) + "}"
+
+def _linhas_do_histograma(nome: str, histograma: _Histograma, rotulos: dict) -> list:
+    linhas = []
+    acumulado = 0
+    for limite, quantidade in zip(histograma.limites + ("+Inf",), histograma.baldes):
+        acumulado += quantidade
+        linhas.append(f"{nome}_bucket{_rotulos(**rotulos, le=limite)} {acumulado}")
+    linhas.append(f"{nome}_sum{_rotulos(**rotulos)} {histograma.soma}")
+    linhas.append(f"{nome}_count{_rotulos(**rotulos)} {histograma.total}")
+    return linhas
+
+def exportar(estatisticas_do_pool: Optional[dict] = None) -> str:
+    """Monta o texto do /metrics. `estatisticas_do_pool` é o database.get_pool_stats()."""
+    with _rotas_lock:
+        retrato = sorted(_rotas.items())
+        blocos = {
+            "requisicoes": [], "latencia": [], "consultas": [], "tempo_db": [], "linhas": [],
+        }
+        for (metodo, rota), metricas in retrato:
+            rotulos = {"method": metodo, "route": rota}
+            for status, quantidade in sorted(metricas.por_status.items()):
+                blocos["requisicoes"].append(f"sise_http_requests_total{_rotulos(**rotulos, status=status)} {quantidade}")
+            blocos["latencia"] += _linhas_do_histograma("sise_http_request_duration_seconds", metricas.latencia, rotulos)
+            blocos["consultas"] += _linhas_do_histograma("sise_db_statements_per_request", metricas.consultas, rotulos)
+            blocos["tempo_db"].append(f"sise_db_time_seconds_total{_rotulos(**rotulos)} {metricas.tempo_db}")
+            blocos["linhas"].append(f"sise_db_rows_total{_rotulos(**rotulos)} {metricas.linhas}")
+
+    saida = [
+        "# HELP sise_http_requests_total Requisições HTTP por rota e status.",
+        "# TYPE sise_http_requests_total counter",
+        *blocos["requisicoes"],
+        "# HELP sise_http_request_duration_seconds Latência das requisições HTTP.",
+        "# TYPE sise_http_request_duration_seconds histogram",
+        *blocos["latencia"],
+        "# HELP sise_db_statements_per_request Consultas SQL executadas por requisição.",
+        "# TYPE sise_db_statements_per_request histogram",
+        *blocos["consultas"],
+        "# HELP sise_db_time_seconds_total Tempo gasto no banco pelas requisições.",
+        "# TYPE sise_db_time_seconds_total counter",
+        *blocos["tempo_db"],
+        "# HELP sise_db_rows_total Linhas lidas ou alteradas no banco pelas requisições.",
+        "# TYPE sise_db_rows_total counter",
+        *blocos["linhas"],
+    ]
+
+    if estatisticas_do_pool:
+        saida += [
+            "# HELP sise_db_pool_checked_out Conexões do pool em uso.",
+            "# TYPE sise_db_pool_checked_out gauge",
+        ]
+        for nome, stats in estatisticas_do_pool.items():
+            if "em_uso" in stats:
+                saida.append(f"sise_db_pool_checked_out{_rotulos(pool=nome)} {stats['em_uso']}")
+        saida += [
+            "# HELP sise_db_pool_wait_seconds_total Tempo esperando por uma conexão livre do pool.",
+            "# TYPE sise_db_pool_wait_seconds_total counter",
+        ]
+        for nome, stats in estatisticas_do_pool.items():
+            if "tempo_espera_total_s" in stats:
+                saida.append(f"sise_db_pool_wait_seconds_total{_rotulos(pool=nome)} {stats['tempo_espera_total_s']}")
+    return "\n".join(saida) + "\n"
+
+def limpar():
+    """Zera as métricas acumuladas (útil nos scripts de benchmark)."""
+    with _rotas_lock:
+        _rotas.clear()
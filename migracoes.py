@@ -0,0 +1,193 @@
+# Arquivo: migracoes.py (ajustes de esquema em bancos já existentes)
+
+import hashlib
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import inspect, select, update, delete, insert, func, MetaData, Table, Column, String, DateTime
+from sqlalchemy.engine import Connection, Engine
+
+import models
+
+# =================================================================
+# Migrações
+# =================================================================
+# O create_all só cria tabelas que não existem. As mudanças em tabelas que já
+# existem ficam aqui, cada uma verificando se já foi aplicada; `migrar` roda
+# todas em `preparar_esquema`, depois do create_all e antes da criação dos índices.
+
+# Tabelas que podem ser apagadas e recriadas sem perda: são calculadas a
+# partir de outras (o crud_resumos.garantir_resumos as preenche de novo)
+TABELAS_DERIVADAS = (models.SeriePragaDiaria, models.SeriePragaDiariaDispositivo)
+
+def _colunas(conexao: Connection, tabela: str) -> set:
+    return {coluna["name"] for coluna in inspect(conexao).get_columns(tabela)}
+
+def _recriar_tabelas_derivadas(conexao: Connection) -> bool:
+    """Recria as tabelas derivadas cujas colunas não batem mais com o models.py."""
+    recriou = False
+    for modelo in TABELAS_DERIVADAS:
+        tabela = modelo.__table__
+        if _colunas(conexao, tabela.name) != {coluna.name for coluna in tabela.columns}:
+            tabela.drop(conexao)
+            tabela.create(conexao)
+            recriou = True
+    return recriou
+
+def _contagens_com_ids(conexao: Connection) -> bool:
+    """
+    Adiciona dispositivo_id e praga_id em contagens_pragas e os preenche a
+    partir do número do dispositivo (na área do serviço) e do nome da praga.
+    Contagens de dispositivo ou praga que não existem mais ficam com NULL.
+    """
+    colunas = _colunas(conexao, "contagens_pragas")
+    if {"dispositivo_id", "praga_id"} <= colunas:
+        return False
+
+    if "dispositivo_id" not in colunas:
+        conexao.exec_driver_sql(
+            "ALTER TABLE contagens_pragas ADD COLUMN dispositivo_id INTEGER "
+            "REFERENCES dispositivos (id) ON DELETE SET NULL"
+        )
+    if "praga_id" not in colunas:
+        conexao.exec_driver_sql(
+            "ALTER TABLE contagens_pragas ADD COLUMN praga_id INTEGER "
+            "REFERENCES pragas (id) ON DELETE SET NULL"
+        )
+
+    contagem = models.ContagemPraga.__table__
+    praga = models.Praga.__table__
+    conexao.execute(
+        update(contagem).where(praga.c.nome == contagem.c.praga_nome).values(praga_id=praga.c.id)
+    )
+
+    # Subconsulta por linha, mas cada uma é uma busca no índice (area_id, numero)
+    dispositivo = models.Dispositivo.__table__
+    for indice in dispositivo.indexes:
+        indice.create(conexao, checkfirst=True)
+    conexao.execute(update(contagem).values(dispositivo_id=_armadilha_da_contagem()))
+    return True
+
+def _armadilha_da_contagem():
+    """
+    O ID da armadilha AL da área do serviço com o número gravado na contagem,
+    como no crud_mip: outros tipos podem repetir o número, e números de AL
+    repetidos na área ficam com a mais antiga.
+    """
+    contagem = models.ContagemPraga.__table__
+    dispositivo = models.Dispositivo.__table__
+    servico = models.Servico.__table__
+    return select(func.min(dispositivo.c.id)).where(
+        servico.c.id == contagem.c.servico_id,
+        dispositivo.c.area_id == servico.c.area_id,
+        dispositivo.c.tipo == models.Dispositivo.TIPO_CONTAGEM,
+        dispositivo.c.numero == contagem.c.dispositivo_numero
+    ).scalar_subquery()
+
+MIGRACOES = (
+    ("recriar tabelas derivadas", _recriar_tabelas_derivadas),
+    ("contagens de pragas por ID", _contagens_com_ids),
+)
+
+def migrar(engine: Engine) -> list:
+    """Aplica, em uma transação, as migrações pendentes. Retorna os nomes das aplicadas."""
+    aplicadas = []
+    with engine.begin() as conexao:
+        for nome, migracao in MIGRACOES:
+            if migracao(conexao):
+                aplicadas.append(nome)
+    return aplicadas
+
+# =================================================================
+# Carimbo da versão do esquema
+# =================================================================
+# Em produção (ESQUEMA_NA_INICIALIZACAO=verificar no main_api) a API não
+# cria nem altera tabelas: o esquema é preparado uma vez por implantação com
+# `python -m migracoes`, que grava aqui a versão aplicada, e cada inicialização
+# só confere o carimbo com uma consulta.
+
+# Fora de models.Base: não é criada pelo create_all dos scripts nem apagada pelo drop_all
+_METADADOS_VERSAO = MetaData()
+versao_esquema = Table(
+    "versao_esquema", _METADADOS_VERSAO,
+    Column("versao", String(40), primary_key=True),
+    Column("aplicada_em", DateTime, nullable=False),
+)
+
+def versao_do_esquema() -> str:
+    """
+    Impressão digital do esquema declarado em models.py (tabelas, colunas,
+    índices) e das migrações: muda sozinha quando qualquer um deles muda.
+    """
+    partes = [nome for nome, _ in MIGRACOES]
+    for tabela in models.Base.metadata.sorted_tables:
+        partes.append(tabela.name)
+        partes.extend(f"{c.name}:{c.type}:{c.nullable}" for c in tabela.columns)
+        partes.extend(sorted(f"{i.name}:{','.join(c.name for c in i.columns)}:{i.unique}" for i in tabela.indexes))
+    return hashlib.sha1("\n".join(partes).encode("utf-8")).hexdigest()[:16]
+
+def versao_gravada(engine: Engine) -> Optional[str]:
+    """A versão carimbada no banco, ou None se o banco nunca foi preparado."""
+    with engine.connect() as conexao:
+        if not inspect(conexao).has_table(versao_esquema.name):
+            return None
+        return conexao.execute(select(versao_esquema.c.versao)).scalar()
+
+def verificar_esquema(engine: Engine):
+    """Confere o carimbo sem tocar nas tabelas. Lança RuntimeError se o banco não está na versão deste código."""
+    esperada, gravada = versao_do_esquema(), versao_gravada(engine)
+    if gravada != esperada:
+        raise RuntimeError(
+            f"Esquema do banco na versão {gravada or '(nenhuma)'}, o código espera {esperada}. "
+            "Rode `python -m migracoes` antes de iniciar a API."
+        )
+
+# =================================================================
+# Preparação completa
+# =================================================================
+
+def preparar_esquema(engine: Engine) -> list:
+    """
+    Cria as tabelas que faltam, aplica as migrações pendentes, garante os
+    índices declarados em models.py e carimba a versão. Retorna os nomes das
+    migrações aplicadas.
+    """
+    models.Base.metadata.create_all(bind=engine)
+    aplicadas = migrar(engine)
+    # O create_all não adiciona índices novos em tabelas que já existem,
+    # então garantimos que todos os índices declarados em models.py existam.
+    for tabela in models.Base.metadata.sorted_tables:
+        for indice in tabela.indexes:
+            indice.create(bind=engine, checkfirst=True)
+
+    _METADADOS_VERSAO.create_all(bind=engine)
+    with engine.begin() as conexao:
+        conexao.execute(delete(versao_esquema))
+        conexao.execute(insert(versao_esquema).values(versao=versao_do_esquema(), aplicada_em=datetime.now()))
+    return aplicadas
+
+def preparar_dados(sessao) -> list:
+    """
+    Preenchimentos únicos que dependem das tabelas novas: resumos do Dashboard
+    e saldo inicial do livro de estoque. Retorna mensagens do que foi feito.
+    """
+    from crud import crud_resumos, crud_estoque
+
+    feito = []
+    if crud_resumos.garantir_resumos(sessao):
+        feito.append("TABELAS DE RESUMO RECONSTRUÍDAS")
+    # Produtos cadastrados antes do livro de estoque ganham um saldo inicial
+    if crud_estoque.garantir_livro_estoque(sessao):
+        feito.append("SALDO INICIAL REGISTRADO NO LIVRO DE ESTOQUE")
+    return feito
+
+if __name__ == "__main__":
+    # Passo de implantação: python -m migracoes
+    from database import engine, SessionLocal
+
+    for migracao in preparar_esquema(engine):
+        print(f"--- MIGRAÇÃO APLICADA: {migracao} ---")
+    with SessionLocal() as db:
+        for mensagem in preparar_dados(db):
+            print(f"--- {mensagem} ---")
+    print(f"--- ESQUEMA NA VERSÃO {versao_do_esquema()} ---")
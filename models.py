@@ -1,9 +1,10 @@
 # models.py (Versão Final com Ordem Corrigida)
 
 from sqlalchemy import (
-    Column, Integer, String, Float, ForeignKey, Boolean, Date, Text, Time, Enum
+    Column, Integer, String, Float, ForeignKey, Boolean, Date, DateTime, Text, Time, Enum, Index, JSON
 )
 from sqlalchemy.orm import relationship
+from datetime import datetime
 from database import Base
 
 # --- Modelos Base (sem dependências complexas) ---
@@ -60,14 +61,23 @@ class Dispositivo(Base):
     status = Column(String, default="Ativo")
     area_id = Column(Integer, ForeignKey("areas.id"), nullable=False)
     
+    # A grade de contagem de pragas só tem armadilhas luminosas (AL): outros
+    # tipos podem repetir o número de uma AL na mesma área
+    TIPO_CONTAGEM = "AL"
+
     area = relationship("Area", back_populates="dispositivos")
     servicos_onde_foi_verificado = relationship("ServicoDispositivoStatus", back_populates="dispositivo")
 
+    # Busca do dispositivo pelo número dentro da área (contagens de pragas)
+    __table_args__ = (
+        Index("ix_dispositivos_area_id_numero", "area_id", "numero"),
+    )
+
 class Servico(Base):
     __tablename__ = "servicos"
     id = Column(Integer, primary_key=True, index=True)
     descricao = Column(String, nullable=False)
-    data = Column(Date)
+    data = Column(Date, index=True)
     horario_inicio = Column(String, nullable=True)
     horario_termino = Column(String, nullable=True)
     status = Column(String, default="Pendente")
@@ -80,6 +90,11 @@ class Servico(Base):
     contagens_praga = relationship("ContagemPraga", back_populates="servico", cascade="all, delete-orphan")
     dispositivos_verificados = relationship("ServicoDispositivoStatus", back_populates="servico", cascade="all, delete-orphan")
 
+    # Índice composto para os filtros "serviços da área X no período Y"
+    __table_args__ = (
+        Index("ix_servicos_area_id_data", "area_id", "data"),
+    )
+
 # --- Tabelas de Associação e Modelos que dependem de 'Servico' e 'Dispositivo' ---
 class ServicoProdutoAssociado(Base):
     __tablename__ = 'servico_produto'
@@ -99,30 +114,51 @@ class ServicoDispositivoStatus(Base):
     servico = relationship("Servico", back_populates="dispositivos_verificados")
     dispositivo = relationship("Dispositivo", back_populates="servicos_onde_foi_verificado")
 
+    # Usados pelo schema RelatorioDispositivoStatus (relatório completo do serviço)
+    @property
+    def numero(self):
+        return self.dispositivo.numero
+
+    @property
+    def tipo(self):
+        return self.dispositivo.tipo
+
 class MIPRegistro(Base):
     __tablename__ = "mip_registros"
     id = Column(Integer, primary_key=True, index=True)
     data_observacao = Column(Date, nullable=False)
     observacao_texto = Column(Text, nullable=True)
     pragas_observadas = Column(String, nullable=True)
-    servico_id = Column(Integer, ForeignKey("servicos.id"), nullable=False)
+    servico_id = Column(Integer, ForeignKey("servicos.id"), nullable=False, index=True)
     
     servico = relationship("Servico", back_populates="registros_mip")
 
 class ContagemPraga(Base):
     __tablename__ = "contagens_pragas"
     id = Column(Integer, primary_key=True, index=True)
+    # Dispositivo e praga contados. Ficam nulos se o dispositivo ou a praga
+    # forem excluídos; aí valem os textos abaixo.
+    dispositivo_id = Column(Integer, ForeignKey("dispositivos.id", ondelete="SET NULL"), nullable=True)
+    praga_id = Column(Integer, ForeignKey("pragas.id", ondelete="SET NULL"), nullable=True)
+    # Número e nome como estavam no momento da contagem
     dispositivo_numero = Column(String, nullable=False)
     praga_nome = Column(String, nullable=False)
     quantidade = Column(Integer, nullable=False)
     servico_id = Column(Integer, ForeignKey("servicos.id"), nullable=False)
     
     servico = relationship("Servico", back_populates="contagens_praga")
+    dispositivo = relationship("Dispositivo")
+    praga = relationship("Praga")
+
+    # Cobre "contagens do serviço" (prefixo servico_id) e os agrupamentos por dispositivo e praga
+    __table_args__ = (
+        Index("ix_contagens_pragas_servico_dispositivo_praga", "servico_id", "dispositivo_id", "praga_id"),
+    )
 
 class Agendamento(Base):
     __tablename__ = "agendamentos"
     id = Column(Integer, primary_key=True, index=True)
-    data_agendamento = Column(Date, nullable=False)
+    data_agendamento = Column(Date, nullable=False, index=True)
     horario = Column(Time, nullable=True)
     area_id = Column(Integer, ForeignKey("areas.id"), nullable=False)
     area = relationship("Area", back_populates="agendamentos")
@@ -137,7 +173,7 @@ class Agendamento(Base):
 class Ocorrencia(Base):
     __tablename__ = "ocorrencias"
     id = Column(Integer, primary_key=True, index=True)
-    data_ocorrencia = Column(Date, nullable=False)
+    data_ocorrencia = Column(Date, nullable=False, index=True)
     descricao = Column(Text, nullable=False)
     nivel_urgencia = Column(Enum("Baixa", "Média", "Alta", name="nivel_urgencia_enum"), nullable=False, default="Baixa")
     status = Column(String, default="Aberta", nullable=False)
@@ -146,4 +182,95 @@ class Ocorrencia(Base):
     area = relationship("Area", back_populates="ocorrencias")
     
     registrado_por_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    registrado_por = relationship("User", back_populates="ocorrencias_registradas")
\ No newline at end of file
+    registrado_por = relationship("User", back_populates="ocorrencias_registradas")
+
+# --- Tabelas de resumo (pré-agregadas para o Dashboard) ---
+# Mantidas de forma incremental pelo crud (ver crud/crud_resumos.py).
+# São dados derivados, por isso não têm chave estrangeira: uma linha zerada
+# não deve impedir a exclusão de uma área ou de um produto.
+class ResumoMensalServicos(Base):
+    __tablename__ = "resumo_mensal_servicos"
+    ano = Column(Integer, primary_key=True)
+    mes = Column(Integer, primary_key=True)
+    area_id = Column(Integer, primary_key=True)
+    total = Column(Integer, nullable=False, default=0)
+
+class ResumoMensalProdutos(Base):
+    __tablename__ = "resumo_mensal_produtos"
+    ano = Column(Integer, primary_key=True)
+    mes = Column(Integer, primary_key=True)
+    produto_id = Column(Integer, primary_key=True)
+    total_usado = Column(Float, nullable=False, default=0.0)
+
+class ResumoDispositivos(Base):
+    __tablename__ = "resumo_dispositivos"
+    tipo = Column(String, primary_key=True)
+    status = Column(String, primary_key=True)
+    total = Column(Integer, nullable=False, default=0)
+
+# Séries diárias de contagens de pragas: o total contado nos serviços de cada
+# dia, por área e praga e também por dispositivo. A série por área existe para
+# que a tendência da área não precise somar dezenas de dispositivos por dia.
+# Linhas zeradas são apagadas. Contagens sem dispositivo ou praga (excluídos)
+# ficam de fora.
+class SeriePragaDiaria(Base):
+    __tablename__ = "serie_pragas_diaria"
+    area_id = Column(Integer, primary_key=True)
+    praga_id = Column(Integer, primary_key=True)
+    dia = Column(Date, primary_key=True)
+    total = Column(Integer, nullable=False, default=0)
+
+class SeriePragaDiariaDispositivo(Base):
+    __tablename__ = "serie_pragas_diaria_dispositivo"
+    area_id = Column(Integer, primary_key=True)
+    dispositivo_id = Column(Integer, primary_key=True)
+    dia = Column(Date, primary_key=True)
+    praga_id = Column(Integer, primary_key=True)
+    total = Column(Integer, nullable=False, default=0)
+
+# --- Livro de movimentos de estoque ---
+# Só recebe inserções (ver crud/crud_estoque.py). O estoque em um instante é
+# o último snapshot anterior a ele mais os movimentos que vieram depois.
+# Sem chave estrangeira pelo mesmo motivo das tabelas de resumo: o histórico
+# não deve impedir a exclusão de um produto ou de um serviço.
+class MovimentoEstoque(Base):
+    __tablename__ = "movimentos_estoque"
+    id = Column(Integer, primary_key=True, index=True)
+    produto_id = Column(Integer, nullable=False)
+    momento = Column(DateTime, nullable=False, default=datetime.now)
+    quantidade = Column(Float, nullable=False)  # positiva na entrada, negativa na saída
+    origem = Column(String, nullable=False)  # saldo_inicial, cadastro, entrada, servico
+    servico_id = Column(Integer, nullable=True)
+
+    __table_args__ = (
+        Index("ix_movimentos_estoque_produto_id_momento", "produto_id", "momento"),
+    )
+
+class SnapshotEstoque(Base):
+    __tablename__ = "snapshots_estoque"
+    id = Column(Integer, primary_key=True, index=True)
+    produto_id = Column(Integer, nullable=False)
+    momento = Column(DateTime, nullable=False)
+    movimento_id = Column(Integer, nullable=False)  # último movimento incluído no saldo
+    estoque = Column(Float, nullable=False)
+
+    __table_args__ = (
+        Index("ix_snapshots_estoque_produto_id_momento", "produto_id", "momento"),
+    )
+
+# --- Fila de tarefas de relatório ---
+# Relatórios pesados são gerados em segundo plano (ver tarefas.py).
+class TarefaRelatorio(Base):
+    __tablename__ = "tarefas_relatorio"
+    id = Column(Integer, primary_key=True, index=True)
+    tipo = Column(String, nullable=False)
+    parametros = Column(JSON, nullable=False)
+    # Hash de (tipo, parâmetros, versão dos dados): tarefas com a mesma chave dão o mesmo resultado
+    chave = Column(String, nullable=False, index=True)
+    status = Column(String, nullable=False, default="pendente", index=True)  # pendente, executando, concluida, erro, cancelada
+    usuario_id = Column(Integer, nullable=True)
+    criado_em = Column(DateTime, nullable=False, default=datetime.now)
+    iniciado_em = Column(DateTime, nullable=True)
+    concluido_em = Column(DateTime, nullable=True)
+    resultado = Column(JSON, nullable=True)
+    mensagem_erro = Column(Text, nullable=True)
@@ -1,11 +1,11 @@
 # Arquivo: routers/areas.py
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 
-import models, schemas
-from database import get_db
+import models, schemas, cache
+from database import get_async_db, executar_crud
 from crud import crud_area
 
 # ✅ Importando a dependência de autenticação do nosso outro router
@@ -25,27 +25,30 @@ router = APIRouter(
 # =================================================================
 
 @router.get("/", response_model=List[schemas.AreaComStatus])
-def api_get_areas(db: Session = Depends(get_db), current_user: models.User = Depends(get_current_active_user)):
-    return crud_area.get_areas(db=db)
+async def api_get_areas(request: Request, db: AsyncSession = Depends(get_async_db), current_user: schemas.User = Depends(get_current_active_user)):
+    return await cache.responder_com_cache(
+        request, "areas",
+        lambda: executar_crud(db, crud_area.get_areas, esquema=List[schemas.AreaComStatus])
+    )
 
 
 @router.post("/", response_model=schemas.Area, status_code=status.HTTP_201_CREATED)
-def api_create_area(area: schemas.AreaCreate, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_active_user)):
-    if crud_area.get_area_by_name(db, nome=area.nome):
+async def api_create_area(area: schemas.AreaCreate, db: AsyncSession = Depends(get_async_db), current_user: schemas.User = Depends(get_current_active_user)):
+    if await executar_crud(db, crud_area.get_area_by_name, nome=area.nome):
         raise HTTPException(status_code=400, detail="Uma área com este nome já existe.")
-    return crud_area.create_area(db=db, area=area)
+    return await executar_crud(db, crud_area.create_area, area=area, esquema=schemas.Area, escrita=True)
 
 @router.put("/{area_id}", response_model=schemas.Area)
-def api_update_area(area_id: int, area: schemas.AreaCreate, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_active_user)):
-    db_area = crud_area.update_area(db, area_id=area_id, area_data=area)
+async def api_update_area(area_id: int, area: schemas.AreaCreate, db: AsyncSession = Depends(get_async_db), current_user: schemas.User = Depends(get_current_active_user)):
+    db_area = await executar_crud(db, crud_area.update_area, area_id=area_id, area_data=area, esquema=schemas.Area, escrita=True)
     if db_area is None:
         raise HTTPException(status_code=404, detail="Área não encontrada")
     return db_area
 
 @router.delete("/{area_id}", status_code=status.HTTP_204_NO_CONTENT)
-def api_delete_area(area_id: int, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_active_user)):
+async def api_delete_area(area_id: int, db: AsyncSession = Depends(get_async_db), current_user: schemas.User = Depends(get_current_active_user)):
     try:
-        resultado = crud_area.delete_area(db, area_id=area_id)
+        resultado = await executar_crud(db, crud_area.delete_area, area_id=area_id, escrita=True)
         if not resultado:
              raise HTTPException(status_code=404, detail="Área não encontrada")
     except ValueError as e:
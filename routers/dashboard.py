@@ -1,9 +1,9 @@
 # Arquivo: routers/dashboard.py
 
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-import schemas, models
-from database import get_db
+from fastapi import APIRouter, Depends, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+import schemas, models, cache
+from database import get_async_db, executar_crud
 from crud import crud_dashboard
 from .usuarios import get_current_active_user
 
@@ -13,8 +13,12 @@ router = APIRouter(
 )
 
 @router.get("/summary", response_model=schemas.DashboardSummary)
-def get_summary(
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_active_user)
+async def get_summary(
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.User = Depends(get_current_active_user)
 ):
-    return crud_dashboard.get_dashboard_summary(db=db)
\ No newline at end of file
+    return await cache.responder_com_cache(
+        request, "dashboard",
+        lambda: executar_crud(db, crud_dashboard.get_dashboard_summary, esquema=schemas.DashboardSummary)
+    )
\ No newline at end of file
@@ -1,13 +1,14 @@
 # Arquivo: routers/dispositivos.py (Versão Corrigida)
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 
-import models, schemas
-from database import get_db
-from crud import crud_dispositivo
+import models, schemas, cache
+from database import get_async_db, executar_crud
+from crud import crud_dispositivo, paginacao
 from .usuarios import get_current_active_user
+from .paginacao import pediu_paginacao, responder_pagina
 
 router = APIRouter(
     prefix="/api/dispositivos",
@@ -15,64 +16,88 @@ router = APIRouter(
 )
 
 @router.get("/", response_model=List[schemas.Dispositivo])
-def api_get_dispositivos(
+async def api_get_dispositivos(
+    request: Request,
     area_id: Optional[int] = None, 
     tipo: Optional[str] = None, 
-    db: Session = Depends(get_db), 
-    current_user: models.User = Depends(get_current_active_user)
+    limite: Optional[int] = Query(None, ge=1, le=paginacao.LIMITE_MAXIMO),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db), 
+    current_user: schemas.User = Depends(get_current_active_user)
 ):
-    return crud_dispositivo.get_dispositivos(db=db, area_id=area_id, tipo=tipo)
+    """
+    Lista os dispositivos. Com `limite`/`cursor` a lista vem em páginas, na
+    ordem (area_id, numero, id), e com `fields` (ex: "id,numero,status") só
+    essas colunas são lidas e devolvidas. As páginas não passam pelo cache.
+    """
+    if pediu_paginacao(limite, cursor, fields):
+        return await responder_pagina(
+            request, db, crud_dispositivo.query_dispositivos(area_id, tipo), models.Dispositivo,
+            crud_dispositivo.CHAVES_DISPOSITIVOS, schemas.Dispositivo, limite, cursor, fields,
+            opcoes=crud_dispositivo.OPCOES_DISPOSITIVO
+        )
+    return await cache.responder_com_cache(
+        request, "dispositivos",
+        lambda: executar_crud(db, crud_dispositivo.get_dispositivos, area_id=area_id, tipo=tipo, esquema=List[schemas.Dispositivo])
+    )
 
 # ✅ NOVO ENDPOINT ADICIONADO
 @router.post("/", response_model=schemas.Dispositivo, status_code=status.HTTP_201_CREATED)
-def api_create_dispositivo(
+async def api_create_dispositivo(
     dispositivo: schemas.DispositivoCreate, 
-    db: Session = Depends(get_db), 
-    current_user: models.User = Depends(get_current_active_user)
+    db: AsyncSession = Depends(get_async_db), 
+    current_user: schemas.User = Depends(get_current_active_user)
 ):
     """Cria um novo dispositivo individualmente."""
-    return crud_dispositivo.create_dispositivo(db=db, dispositivo=dispositivo)
+    return await executar_crud(db, crud_dispositivo.create_dispositivo, dispositivo=dispositivo, esquema=schemas.Dispositivo, escrita=True)
 
 @router.post("/lote", response_model=List[schemas.Dispositivo])
-def api_create_dispositivos_em_lote(
+async def api_create_dispositivos_em_lote(
     lote_info: schemas.DispositivoLoteCreate, 
-    db: Session = Depends(get_db), 
-    current_user: models.User = Depends(get_current_active_user)
+    db: AsyncSession = Depends(get_async_db), 
+    current_user: schemas.User = Depends(get_current_active_user)
 ):
     try:
-        return crud_dispositivo.create_dispositivos_em_lote(db=db, lote_info=lote_info)
+        return await executar_crud(
+            db, crud_dispositivo.create_dispositivos_em_lote, lote_info=lote_info,
+            esquema=List[schemas.Dispositivo], escrita=True
+        )
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     
 @router.get("/{dispositivo_id}", response_model=schemas.Dispositivo)
-def api_get_dispositivo(
+async def api_get_dispositivo(
     dispositivo_id: int,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_active_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.User = Depends(get_current_active_user)
 ):
-    db_dispositivo = crud_dispositivo.get_dispositivo(db, dispositivo_id=dispositivo_id)
+    db_dispositivo = await executar_crud(db, crud_dispositivo.get_dispositivo, dispositivo_id=dispositivo_id, esquema=schemas.Dispositivo)
     if db_dispositivo is None:
         raise HTTPException(status_code=404, detail="Dispositivo não encontrado")
     return db_dispositivo
     
 @router.put("/{dispositivo_id}", response_model=schemas.Dispositivo)
-def api_update_dispositivo(
+async def api_update_dispositivo(
     dispositivo_id: int, 
     dispositivo: schemas.DispositivoCreate, 
-    db: Session = Depends(get_db), 
-    current_user: models.User = Depends(get_current_active_user)
+    db: AsyncSession = Depends(get_async_db), 
+    current_user: schemas.User = Depends(get_current_active_user)
 ):
-    db_dispositivo = crud_dispositivo.update_dispositivo(db, dispositivo_id=dispositivo_id, dispositivo_data=dispositivo)
+    db_dispositivo = await executar_crud(
+        db, crud_dispositivo.update_dispositivo, dispositivo_id=dispositivo_id, dispositivo_data=dispositivo,
+        esquema=schemas.Dispositivo, escrita=True
+    )
     if db_dispositivo is None:
         raise HTTPException(status_code=404, detail="Dispositivo não encontrado")
     return db_dispositivo
 
 @router.delete("/{dispositivo_id}", status_code=status.HTTP_204_NO_CONTENT)
-def api_delete_dispositivo(
+async def api_delete_dispositivo(
     dispositivo_id: int, 
-    db: Session = Depends(get_db), 
-    current_user: models.User = Depends(get_current_active_user)
+    db: AsyncSession = Depends(get_async_db), 
+    current_user: schemas.User = Depends(get_current_active_user)
 ):
-    if not crud_dispositivo.delete_dispositivo(db, dispositivo_id=dispositivo_id):
+    if not await executar_crud(db, crud_dispositivo.delete_dispositivo, dispositivo_id=dispositivo_id, escrita=True):
         raise HTTPException(status_code=404, detail="Dispositivo não encontrado")
     return {"ok": True}
\ No newline at end of file
@@ -1,27 +1,27 @@
 # Arquivo: routers/mapas.py
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 import models, schemas
-from database import get_db
+from database import get_async_db, executar_crud
 from crud import crud_mapas
 from .usuarios import get_current_active_user
 import shutil
 from pathlib import Path
+from starlette.concurrency import run_in_threadpool
 
 router = APIRouter(
     tags=["Mapas"] # Agrupa na documentação da API
 )
 
-# Cria o diretório para salvar os mapas, se não existir
+# Diretório dos mapas (criado no primeiro upload, não no import)
 MAPS_DIR = Path("static/mapas")
-MAPS_DIR.mkdir(parents=True, exist_ok=True)
 
 @router.post("/api/areas/{area_id}/mapa", response_model=schemas.Area)
-def upload_mapa_para_area(
+async def upload_mapa_para_area(
     area_id: int,
     file: UploadFile = File(...),
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_active_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.User = Depends(get_current_active_user)
 ):
     """
     Faz o upload de uma imagem de mapa e a associa a uma área específica.
@@ -29,15 +29,21 @@ def upload_mapa_para_area(
     # Define o caminho onde o arquivo será salvo
     file_path = MAPS_DIR / f"area_{area_id}_{file.filename}"
 
-    # Salva o arquivo no servidor
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+    # Salva o arquivo no servidor (fora do event loop, pois a escrita em disco bloqueia)
+    def salvar_arquivo():
+        MAPS_DIR.mkdir(parents=True, exist_ok=True)
+        with open(file_path, "wb") as buffer:
+            shutil.copyfileobj(file.file, buffer)
+    await run_in_threadpool(salvar_arquivo)
 
     # Gera a URL relativa que será salva no banco
     mapa_url_relativa = str(file_path).replace('\\', '/')
 
     # Atualiza o banco de dados
-    db_area = crud_mapas.associar_mapa_a_area(db, area_id=area_id, mapa_url=mapa_url_relativa)
+    db_area = await executar_crud(
+        db, crud_mapas.associar_mapa_a_area, area_id=area_id, mapa_url=mapa_url_relativa,
+        esquema=schemas.Area, escrita=True
+    )
 
     if db_area is None:
         raise HTTPException(status_code=404, detail="Área não encontrada")
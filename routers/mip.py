@@ -1,11 +1,11 @@
 # Arquivo: routers/mip.py
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 
-import models, schemas
-from database import get_db
+import models, schemas, cache
+from database import get_async_db, executar_crud
 from crud import crud_mip
 from .usuarios import get_current_active_user
 
@@ -23,33 +23,38 @@ router = APIRouter(
 # =================================================================
 
 @router.get("/servicos/{servico_id}/mip", response_model=schemas.MIPData)
-def api_get_mip_data(
+async def api_get_mip_data(
     servico_id: int, 
-    db: Session = Depends(get_db), 
-    current_user: models.User = Depends(get_current_active_user)
+    db: AsyncSession = Depends(get_async_db), 
+    current_user: schemas.User = Depends(get_current_active_user)
 ):
-    return crud_mip.get_mip_data_for_servico(db, servico_id=servico_id)
+    return await executar_crud(db, crud_mip.get_mip_data_for_servico, servico_id=servico_id, esquema=schemas.MIPData)
 
 @router.post("/servicos/{servico_id}/mip", response_model=schemas.MIPData)
-def api_save_mip_data(
+async def api_save_mip_data(
     servico_id: int, 
     mip_data: schemas.MIPDataCreate, 
-    db: Session = Depends(get_db), 
-    current_user: models.User = Depends(get_current_active_user)
+    db: AsyncSession = Depends(get_async_db), 
+    current_user: schemas.User = Depends(get_current_active_user)
 ):
     try:
-        return crud_mip.save_mip_data_for_servico(db, servico_id=servico_id, mip_data=mip_data)
+        return await executar_crud(
+            db, crud_mip.save_mip_data_for_servico, servico_id=servico_id, mip_data=mip_data,
+            esquema=schemas.MIPData, escrita=True
+        )
+    except crud_mip.ContagemInvalida as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
 
 @router.post("/mip-registros/", response_model=schemas.MIPRegistro)
-def api_create_mip_registro(
+async def api_create_mip_registro(
     registro: schemas.MIPRegistroCreate, 
-    db: Session = Depends(get_db), 
-    current_user: models.User = Depends(get_current_active_user)
+    db: AsyncSession = Depends(get_async_db), 
+    current_user: schemas.User = Depends(get_current_active_user)
 ):
     try:
-        return crud_mip.create_mip_registro(db=db, registro=registro)
+        return await executar_crud(db, crud_mip.create_mip_registro, registro=registro, esquema=schemas.MIPRegistro, escrita=True)
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
 
@@ -58,33 +63,37 @@ def api_create_mip_registro(
 # =================================================================
 
 @router.get("/pragas/", response_model=List[schemas.Praga])
-def api_get_pragas(
-    db: Session = Depends(get_db), 
-    current_user: models.User = Depends(get_current_active_user)
+async def api_get_pragas(
+    request: Request,
+    db: AsyncSession = Depends(get_async_db), 
+    current_user: schemas.User = Depends(get_current_active_user)
 ):
-    return crud_mip.get_pragas(db=db)
+    return await cache.responder_com_cache(
+        request, "pragas",
+        lambda: executar_crud(db, crud_mip.get_pragas, esquema=List[schemas.Praga])
+    )
 
 @router.post("/pragas/", response_model=schemas.Praga)
-def api_create_praga(
+async def api_create_praga(
     praga: schemas.PragaCreate, 
-    db: Session = Depends(get_db), 
-    current_user: models.User = Depends(get_current_active_user)
+    db: AsyncSession = Depends(get_async_db), 
+    current_user: schemas.User = Depends(get_current_active_user)
 ):
     if "configuracoes" not in current_user.permissions:
         raise HTTPException(status_code=403, detail="Acesso negado.")
-    db_praga = crud_mip.get_praga_by_name(db, nome=praga.nome)
+    db_praga = await executar_crud(db, crud_mip.get_praga_by_name, nome=praga.nome)
     if db_praga:
         raise HTTPException(status_code=400, detail="Esta praga já está cadastrada.")
-    return crud_mip.create_praga(db=db, praga=praga)
+    return await executar_crud(db, crud_mip.create_praga, praga=praga, esquema=schemas.Praga, escrita=True)
 
 @router.delete("/pragas/{praga_id}", status_code=status.HTTP_204_NO_CONTENT)
-def api_delete_praga(
+async def api_delete_praga(
     praga_id: int, 
-    db: Session = Depends(get_db), 
-    current_user: models.User = Depends(get_current_active_user)
+    db: AsyncSession = Depends(get_async_db), 
+    current_user: schemas.User = Depends(get_current_active_user)
 ):
     if "configuracoes" not in current_user.permissions:
         raise HTTPException(status_code=403, detail="Acesso negado.")
-    if not crud_mip.delete_praga(db, praga_id=praga_id):
+    if not await executar_crud(db, crud_mip.delete_praga, praga_id=praga_id, escrita=True):
         raise HTTPException(status_code=404, detail="Praga não encontrada.")
     return {"ok": True}
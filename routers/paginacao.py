@@ -0,0 +1,40 @@
+# Arquivo: routers/paginacao.py
+
+from fastapi import HTTPException, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Any, Dict, Optional, Sequence
+
+import schemas
+from database import executar_crud
+from crud import paginacao
+
+# =================================================================
+# Resposta das listagens paginadas
+# =================================================================
+# As rotas de listagem aceitam `limite`, `cursor` e `fields`. Sem nenhum deles
+# a resposta é a lista completa de sempre; com algum, ela passa por aqui.
+# O corpo continua sendo uma lista e o cursor da próxima página vai nos
+# cabeçalhos X-Next-Cursor e Link.
+
+def pediu_paginacao(limite: Optional[int], cursor: Optional[str], fields: Optional[str]) -> bool:
+    return limite is not None or cursor is not None or fields is not None
+
+async def responder_pagina(
+    request: Request, db: AsyncSession, consulta, modelo, chaves, esquema,
+    limite: Optional[int], cursor: Optional[str], fields: Optional[str], opcoes: Sequence = ()
+) -> JSONResponse:
+    """Executa `crud.paginacao.paginar` e monta a resposta. Parâmetros inválidos viram 400."""
+    try:
+        campos = paginacao.campos_selecionados(fields, modelo, esquema)
+        pagina = await executar_crud(
+            db, paginacao.paginar, consulta, modelo, chaves, limite=limite, cursor=cursor, campos=campos, opcoes=opcoes,
+            esquema=schemas.Pagina[Dict[str, Any]] if campos else schemas.Pagina[esquema]
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return JSONResponse(
+        content=jsonable_encoder(pagina.itens),
+        headers=paginacao.cabecalhos_da_pagina(request.url, pagina.proximo_cursor)
+    )
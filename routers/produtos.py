@@ -1,13 +1,15 @@
 # Arquivo: routers/produtos.py
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from datetime import date, datetime
 
-import models, schemas
-from database import get_db
-from crud import crud_produto
+import models, schemas, cache
+from database import get_async_db, executar_crud
+from crud import crud_produto, crud_estoque, paginacao
 from .usuarios import get_current_active_user
+from .paginacao import pediu_paginacao, responder_pagina
 
 # =================================================================
 # 1. CONFIGURAÇÃO DO ROUTER
@@ -22,27 +24,71 @@ router = APIRouter(
 # =================================================================
 
 @router.post("/", response_model=schemas.Produto)
-def criar_produto(
+async def criar_produto(
     produto: schemas.ProdutoCreate, 
-    db: Session = Depends(get_db), 
-    current_user: models.User = Depends(get_current_active_user)
+    db: AsyncSession = Depends(get_async_db), 
+    current_user: schemas.User = Depends(get_current_active_user)
 ):
-    return crud_produto.create_produto(db=db, produto=produto)
+    return await executar_crud(db, crud_produto.create_produto, produto=produto, esquema=schemas.Produto, escrita=True)
 
 @router.get("/", response_model=List[schemas.Produto])
-def listar_produtos(
-    db: Session = Depends(get_db), 
-    current_user: models.User = Depends(get_current_active_user)
+async def listar_produtos(
+    request: Request,
+    limite: Optional[int] = Query(None, ge=1, le=paginacao.LIMITE_MAXIMO),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db), 
+    current_user: schemas.User = Depends(get_current_active_user)
 ):
-    return crud_produto.get_produtos(db=db)
+    """Lista os produtos por nome. Aceita `limite`/`cursor` (páginas) e `fields`, que não passam pelo cache."""
+    if pediu_paginacao(limite, cursor, fields):
+        return await responder_pagina(
+            request, db, crud_produto.query_produtos(), models.Produto, crud_produto.CHAVES_PRODUTOS,
+            schemas.Produto, limite, cursor, fields
+        )
+    return await cache.responder_com_cache(
+        request, "produtos",
+        lambda: executar_crud(db, crud_produto.get_produtos, esquema=List[schemas.Produto])
+    )
 
 @router.get("/{produto_id}", response_model=schemas.Produto)
-def api_get_produto(
+async def api_get_produto(
     produto_id: int,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_active_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.User = Depends(get_current_active_user)
 ):
-    db_produto = crud_produto.get_produto(db, produto_id=produto_id)
+    db_produto = await executar_crud(db, crud_produto.get_produto, produto_id=produto_id, esquema=schemas.Produto)
     if db_produto is None:
         raise HTTPException(status_code=404, detail="Produto não encontrado")
-    return db_produto
\ No newline at end of file
+    return db_produto
+
+# =================================================================
+# 3. HISTÓRICO DE ESTOQUE
+# =================================================================
+
+@router.get("/{produto_id}/estoque-historico", response_model=schemas.EstoqueNoMomento)
+async def api_get_estoque_em(
+    produto_id: int,
+    momento: Optional[datetime] = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.User = Depends(get_current_active_user)
+):
+    """Estoque do produto no instante informado (padrão: agora), calculado pelo livro de movimentos."""
+    if await executar_crud(db, crud_produto.get_produto, produto_id=produto_id) is None:
+        raise HTTPException(status_code=404, detail="Produto não encontrado")
+    momento = momento or datetime.now()
+    estoque = await executar_crud(db, crud_estoque.get_estoque_em, produto_id=produto_id, momento=momento)
+    return schemas.EstoqueNoMomento(produto_id=produto_id, momento=momento, estoque=estoque)
+
+@router.get("/{produto_id}/movimentos", response_model=List[schemas.MovimentoEstoque])
+async def api_get_movimentos(
+    produto_id: int,
+    data_inicio: date,
+    data_fim: date,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.User = Depends(get_current_active_user)
+):
+    return await executar_crud(
+        db, crud_estoque.get_movimentos, produto_id=produto_id, data_inicio=data_inicio, data_fim=data_fim,
+        esquema=List[schemas.MovimentoEstoque]
+    )
\ No newline at end of file
@@ -1,12 +1,13 @@
 # Arquivo: routers/relatorios.py (versão final corrigida)
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Request, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Literal, Optional
 from datetime import date
 
-import models, schemas
-from database import get_db
+import models, schemas, cache, exportacao, tarefas
+from database import get_async_db, executar_crud, AsyncSessionLocal
 from crud import crud_produto, crud_servico, crud_relatorio, crud_area
 from .usuarios import get_current_active_user
 
@@ -23,36 +24,94 @@ router = APIRouter(
 # =================================================================
 
 @router.get("/relatorios/produtos", response_model=List[schemas.Produto])
-def api_get_relatorio_produtos(
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_active_user)
+async def api_get_relatorio_produtos(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.User = Depends(get_current_active_user)
 ):
-    return crud_produto.get_produtos(db=db)
+    return await executar_crud(db, crud_produto.get_produtos, esquema=List[schemas.Produto])
 
 @router.get("/relatorios/servicos", response_model=List[schemas.Servico])
-def api_get_relatorio_servicos(
+async def api_get_relatorio_servicos(
     data_inicio: date,
     data_fim: date,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_active_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.User = Depends(get_current_active_user)
 ):
-    return crud_servico.get_servicos_por_periodo(db=db, data_inicio=data_inicio, data_fim=data_fim)
+    return await executar_crud(
+        db, crud_servico.get_servicos_por_periodo, data_inicio=data_inicio, data_fim=data_fim,
+        esquema=List[schemas.Servico]
+    )
+
+@router.get("/relatorios/servicos/exportar")
+async def api_exportar_relatorio_servicos(
+    data_inicio: date,
+    data_fim: date,
+    formato: Literal["csv", "xlsx"] = "csv",
+    current_user: schemas.User = Depends(get_current_active_user)
+):
+    """
+    Exporta os serviços do período em CSV ou XLSX, enviando as linhas conforme
+    são lidas do banco: a memória usada não depende do tamanho do período.
+    """
+    consulta = crud_servico.query_exportacao_servicos(data_inicio, data_fim).execution_options(
+        yield_per=exportacao.TAMANHO_PARTE
+    )
+
+    async def partes():
+        # A sessão é aberta aqui, e não via Depends, porque precisa viver
+        # enquanto a resposta é enviada
+        async with AsyncSessionLocal() as sessao:
+            resultado = await sessao.stream(consulta)
+            async for parte in resultado.partitions():
+                yield parte
+
+    if formato == "xlsx":
+        conteudo = exportacao.gerar_xlsx(crud_servico.CABECALHO_EXPORTACAO_SERVICOS, partes(), "Serviços")
+    else:
+        conteudo = exportacao.gerar_csv(crud_servico.CABECALHO_EXPORTACAO_SERVICOS, partes())
+    nome_arquivo = f"relatorio_servicos_{data_inicio.isoformat()}_{data_fim.isoformat()}.{formato}"
+    return StreamingResponse(
+        conteudo,
+        media_type=exportacao.MEDIA_TYPES[formato],
+        headers={"Content-Disposition": f'attachment; filename="{nome_arquivo}"'}
+    )
+
+@router.get("/relatorios/contagem-pragas", response_model=List[schemas.RelatorioContagemPraga])
+async def api_get_relatorio_contagem_pragas(
+    data_inicio: date,
+    data_fim: date,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.User = Depends(get_current_active_user)
+):
+    """Total contado de cada praga no período, da maior para a menor contagem."""
+    if data_fim < data_inicio:
+        raise HTTPException(status_code=400, detail="A data final deve ser posterior à data inicial.")
+    return await executar_crud(
+        db, crud_relatorio.get_relatorio_contagem_pragas, data_inicio, data_fim,
+        esquema=List[schemas.RelatorioContagemPraga]
+    )
 
 @router.get("/relatorios/area-compilado", response_model=schemas.RelatorioAreaCompilado)
-def api_get_relatorio_area_compilado(
+async def api_get_relatorio_area_compilado(
     area_id: int,
     data_inicio: date,
     data_fim: date,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_active_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.User = Depends(get_current_active_user)
 ):
-    area = crud_area.get_area(db, area_id=area_id)
+    try:
+        return await _montar_relatorio_area_compilado(db, area_id, data_inicio, data_fim)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+async def _montar_relatorio_area_compilado(db: AsyncSession, area_id: int, data_inicio: date, data_fim: date) -> schemas.RelatorioAreaCompilado:
+    area = await executar_crud(db, crud_area.get_area, area_id=area_id, esquema=schemas.Area)
     if not area:
-        raise HTTPException(status_code=404, detail="Área não encontrada.")
+        raise ValueError("Área não encontrada.")
 
-    dados_compilados = crud_relatorio.get_relatorio_compilado_area(db, area_id, data_inicio, data_fim)
+    dados_compilados = await executar_crud(db, crud_relatorio.get_relatorio_compilado_area, area_id, data_inicio, data_fim)
     if not dados_compilados:
-        raise HTTPException(status_code=404, detail="Nenhum serviço encontrado para esta área no período selecionado.")
+        raise ValueError("Nenhum serviço encontrado para esta área no período selecionado.")
 
     # Converte os dados dos produtos para o formato Pydantic
     produtos_formatados = [
@@ -71,15 +130,61 @@ def api_get_relatorio_area_compilado(
         **dados_compilados
     )
 
+@router.get("/relatorios/tendencia-pragas", response_model=schemas.RelatorioTendenciaPragas)
+async def api_get_tendencia_pragas(
+    area_id: int,
+    data_inicio: date,
+    data_fim: date,
+    periodo: Literal["semana", "mes"] = "semana",
+    praga_nome: Optional[str] = None,
+    dispositivo_numero: Optional[str] = None,
+    janela: int = Query(4, ge=1, le=52),
+    limite_alerta: Optional[int] = Query(None, ge=1),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.User = Depends(get_current_active_user)
+):
+    """
+    Contagens de pragas da área por semana ou mês, com média móvel de `janela`
+    períodos e alerta nos períodos em que o total chega a `limite_alerta`.
+    """
+    if data_fim < data_inicio:
+        raise HTTPException(status_code=400, detail="A data final deve ser posterior à data inicial.")
+    tendencia = await executar_crud(
+        db, crud_relatorio.get_tendencia_pragas, area_id, data_inicio, data_fim, periodo,
+        praga_nome=praga_nome, dispositivo_numero=dispositivo_numero, janela=janela, limite_alerta=limite_alerta
+    )
+    return schemas.RelatorioTendenciaPragas(
+        area_id=area_id, data_inicio=data_inicio, data_fim=data_fim, periodo=periodo,
+        janela=janela, limite_alerta=limite_alerta, **tendencia
+    )
+
+# =================================================================
+# RELATÓRIOS GERADOS EM SEGUNDO PLANO (ver tarefas.py e routers/tarefas.py)
+# =================================================================
+
+@tarefas.tipo_de_relatorio("area_compilado", schemas.ParametrosAreaCompilado)
+async def _tarefa_area_compilado(db: AsyncSession, parametros: schemas.ParametrosAreaCompilado):
+    return await _montar_relatorio_area_compilado(db, parametros.area_id, parametros.data_inicio, parametros.data_fim)
+
+@tarefas.tipo_de_relatorio("servicos_periodo", schemas.ParametrosPeriodo)
+async def _tarefa_servicos_periodo(db: AsyncSession, parametros: schemas.ParametrosPeriodo):
+    return await executar_crud(
+        db, crud_servico.get_servicos_por_periodo, data_inicio=parametros.data_inicio, data_fim=parametros.data_fim,
+        esquema=List[schemas.Servico]
+    )
+
 # =================================================================
 # ENDPOINT DE DASHBOARD
 # =================================================================
 
 @router.get("/dashboard/summary", response_model=schemas.DashboardSummary)
-def get_dashboard_summary(db: Session = Depends(get_db), current_user: models.User = Depends(get_current_active_user)):
-    servicos_mes = crud_relatorio.count_servicos_mes_atual(db)
-    produtos_usados_raw = crud_produto.get_produtos_usados_detalhado_mes_atual(db)
-    dispositivos_summary_raw = crud_relatorio.count_dispositivos_por_tipo_e_status(db)
+async def get_dashboard_summary(request: Request, db: AsyncSession = Depends(get_async_db), current_user: schemas.User = Depends(get_current_active_user)):
+    return await cache.responder_com_cache(request, "dashboard", lambda: _montar_dashboard_summary(db))
+
+async def _montar_dashboard_summary(db: AsyncSession) -> schemas.DashboardSummary:
+    servicos_mes = await executar_crud(db, crud_relatorio.count_servicos_mes_atual)
+    produtos_usados_raw = await executar_crud(db, crud_produto.get_produtos_usados_detalhado_mes_atual)
+    dispositivos_summary_raw = await executar_crud(db, crud_relatorio.count_dispositivos_por_tipo_e_status)
 
     produtos_formatados = [
         schemas.ProdutoUsadoSummary(
@@ -1,14 +1,15 @@
 # Arquivo: routers/servicos.py
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 from datetime import date
 
-import models, schemas
-from database import get_db
-from crud import crud_servico, crud_dispositivo
+import models, schemas, tarefas
+from database import get_async_db, executar_crud
+from crud import crud_servico, crud_dispositivo, paginacao
 from .usuarios import get_current_active_user
+from .paginacao import pediu_paginacao, responder_pagina
 
 # =================================================================
 # 1. CONFIGURAÇÃO DO ROUTER
@@ -23,57 +24,81 @@ router = APIRouter(
 # =================================================================
 
 @router.get("/", response_model=List[schemas.Servico])
-def api_listar_servicos(
+async def api_listar_servicos(
+    request: Request,
     area_id: Optional[int] = None, 
     data: Optional[date] = None, 
-    db: Session = Depends(get_db), 
-    current_user: models.User = Depends(get_current_active_user)
+    limite: Optional[int] = Query(None, ge=1, le=paginacao.LIMITE_MAXIMO),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db), 
+    current_user: schemas.User = Depends(get_current_active_user)
 ):
-    return crud_servico.get_servicos(db=db, area_id=area_id, data=data)
+    """
+    Lista os serviços (mais recentes primeiro). Com `limite`/`cursor` a lista
+    vem em páginas (próxima página no cabeçalho X-Next-Cursor) e com `fields`
+    (ex: "id,data,status") só essas colunas são lidas e devolvidas.
+    """
+    if pediu_paginacao(limite, cursor, fields):
+        return await responder_pagina(
+            request, db, crud_servico.query_servicos(area_id, data), models.Servico, crud_servico.CHAVES_SERVICOS,
+            schemas.Servico, limite, cursor, fields, opcoes=crud_servico.OPCOES_SERVICO
+        )
+    return await executar_crud(db, crud_servico.get_servicos, area_id=area_id, data=data, esquema=List[schemas.Servico])
 
 @router.post("/", response_model=schemas.Servico)
-def api_criar_servico(
+async def api_criar_servico(
     servico: schemas.ServicoCreate, 
-    db: Session = Depends(get_db), 
-    current_user: models.User = Depends(get_current_active_user)
+    db: AsyncSession = Depends(get_async_db), 
+    current_user: schemas.User = Depends(get_current_active_user)
 ):
     try:
-        return crud_servico.create_servico(db=db, servico=servico)
+        return await executar_crud(db, crud_servico.create_servico, servico=servico, esquema=schemas.Servico, escrita=True)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/{service_id}", response_model=schemas.Servico)
-def read_service(
+async def read_service(
     service_id: int, 
-    db: Session = Depends(get_db), 
-    current_user: models.User = Depends(get_current_active_user)
+    db: AsyncSession = Depends(get_async_db), 
+    current_user: schemas.User = Depends(get_current_active_user)
 ):
-    db_service = crud_servico.get_service(db, service_id=service_id)
+    db_service = await executar_crud(db, crud_servico.get_service, service_id=service_id, esquema=schemas.Servico)
     if db_service is None:
         raise HTTPException(status_code=404, detail="Serviço não encontrado")
     return db_service
 
 @router.get("/{servico_id}/relatorio-completo", response_model=schemas.ServicoCompleto)
-def api_get_relatorio_completo(
+async def api_get_relatorio_completo(
     servico_id: int, 
-    db: Session = Depends(get_db), 
-    current_user: models.User = Depends(get_current_active_user)
+    db: AsyncSession = Depends(get_async_db), 
+    current_user: schemas.User = Depends(get_current_active_user)
 ):
     """ Retorna todos os dados de um serviço para a geração de um relatório detalhado. """
-    servico_completo = crud_servico.get_servico_completo(db, servico_id=servico_id)
+    servico_completo = await executar_crud(db, crud_servico.get_servico_completo, servico_id=servico_id, esquema=schemas.ServicoCompleto)
     if servico_completo is None:
         raise HTTPException(status_code=404, detail="Serviço não encontrado")
     return servico_completo
 
+@tarefas.tipo_de_relatorio("servico_completo", schemas.ParametrosServico)
+async def _tarefa_servico_completo(db: AsyncSession, parametros: schemas.ParametrosServico):
+    servico_completo = await executar_crud(db, crud_servico.get_servico_completo, servico_id=parametros.servico_id, esquema=schemas.ServicoCompleto)
+    if servico_completo is None:
+        raise ValueError("Serviço não encontrado")
+    return servico_completo
+
 @router.put("/{servico_id}", response_model=schemas.Servico)
-def api_update_servico(
+async def api_update_servico(
     servico_id: int, 
     servico_update: schemas.ServicoCreate, 
-    db: Session = Depends(get_db), 
-    current_user: models.User = Depends(get_current_active_user)
+    db: AsyncSession = Depends(get_async_db), 
+    current_user: schemas.User = Depends(get_current_active_user)
 ):
     try:
-        updated_servico = crud_servico.update_servico(db, servico_id=servico_id, servico_update=servico_update)
+        updated_servico = await executar_crud(
+            db, crud_servico.update_servico, servico_id=servico_id, servico_update=servico_update,
+            esquema=schemas.Servico, escrita=True
+        )
         if updated_servico is None:
             raise HTTPException(status_code=404, detail="Serviço não encontrado")
         return updated_servico
@@ -81,36 +106,59 @@ def api_update_servico(
         raise HTTPException(status_code=400, detail=str(e))
         
 @router.delete("/{servico_id}", status_code=status.HTTP_204_NO_CONTENT)
-def api_delete_servico(
+async def api_delete_servico(
     servico_id: int, 
-    db: Session = Depends(get_db), 
-    current_user: models.User = Depends(get_current_active_user)
+    db: AsyncSession = Depends(get_async_db), 
+    current_user: schemas.User = Depends(get_current_active_user)
 ):
     try:
-        crud_servico.delete_servico(db, servico_id=servico_id)
+        await executar_crud(db, crud_servico.delete_servico, servico_id=servico_id, escrita=True)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     return {"ok": True}
 
 @router.post("/{servico_id}/concluir", response_model=schemas.Servico)
-def endpoint_marcar_servico_concluido(
+async def endpoint_marcar_servico_concluido(
     servico_id: int, 
-    db: Session = Depends(get_db), 
-    current_user: models.User = Depends(get_current_active_user)
+    db: AsyncSession = Depends(get_async_db), 
+    current_user: schemas.User = Depends(get_current_active_user)
 ):
     try:
-        servico_concluido = crud_servico.concluir_servico(db=db, servico_id=servico_id)
+        servico_concluido = await executar_crud(db, crud_servico.concluir_servico, servico_id=servico_id, esquema=schemas.Servico, escrita=True)
         return servico_concluido
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
 
-@router.put("/{servico_id}/dispositivos-status")
-def api_atualizar_status_dispositivos(
+@router.put("/{servico_id}/dispositivos-status", response_model=schemas.DispositivoStatusResultado)
+async def api_atualizar_status_dispositivos(
     servico_id: int,
     status_updates: List[schemas.DispositivoStatusUpdate],
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_active_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.User = Depends(get_current_active_user)
 ):
     # Note que esta rota estava na seção de Dispositivos no seu main_api.py original,
     # mas ela faz mais sentido aqui, pois está relacionada a um serviço.
-    return crud_dispositivo.atualizar_status_dispositivos(db, servico_id=servico_id, status_updates=status_updates)
\ No newline at end of file
+    # PUT: a lista enviada substitui a lista completa do serviço.
+    try:
+        return await executar_crud(
+            db, crud_dispositivo.atualizar_status_dispositivos, servico_id=servico_id, status_updates=status_updates,
+            esquema=schemas.DispositivoStatusResultado, escrita=True
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+@router.patch("/{servico_id}/dispositivos-status", response_model=schemas.DispositivoStatusResultado)
+async def api_atualizar_status_dispositivos_parcial(
+    servico_id: int,
+    status_updates: List[schemas.DispositivoStatusUpdate],
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.User = Depends(get_current_active_user)
+):
+    # PATCH: só os dispositivos enviados são alterados; os demais ficam como estão.
+    try:
+        return await executar_crud(
+            db, crud_dispositivo.atualizar_status_dispositivos, servico_id=servico_id, status_updates=status_updates,
+            parcial=True, esquema=schemas.DispositivoStatusResultado, escrita=True
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
\ No newline at end of file
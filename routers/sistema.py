@@ -0,0 +1,48 @@
+# Arquivo: routers/sistema.py
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+
+import schemas, consultas_lentas
+from database import get_pool_stats
+from .usuarios import get_current_active_user
+
+# =================================================================
+# 1. CONFIGURAÇÃO DO ROUTER
+# =================================================================
+# Rotas de diagnóstico do servidor, restritas a quem tem "seguranca"
+router = APIRouter(
+    prefix="/api/sistema",
+    tags=["Sistema"]
+)
+
+# =================================================================
+# 2. ENDPOINTS
+# =================================================================
+
+@router.get("/pool")
+async def api_get_pool_stats(current_user: schemas.User = Depends(get_current_active_user)):
+    """Retorna as estatísticas do pool de conexões com o banco."""
+    if "seguranca" not in current_user.permissions:
+        raise HTTPException(status_code=403, detail="Acesso negado")
+    return get_pool_stats()
+
+@router.get("/consultas-lentas")
+async def api_get_consultas_lentas(
+    limite: int = Query(50, ge=1, le=500),
+    current_user: schemas.User = Depends(get_current_active_user)
+):
+    """
+    Retorna as consultas que passaram de SLOW_QUERY_MS (mais lentas primeiro),
+    com o plano de execução e as rotas que as fizeram, e as ocorrências
+    mais recentes com os parâmetros usados.
+    """
+    if "seguranca" not in current_user.permissions:
+        raise HTTPException(status_code=403, detail="Acesso negado")
+    return consultas_lentas.resumo(limite)
+
+@router.delete("/consultas-lentas", status_code=status.HTTP_204_NO_CONTENT)
+async def api_limpar_consultas_lentas(current_user: schemas.User = Depends(get_current_active_user)):
+    """Esquece as consultas registradas (útil depois de criar um índice)."""
+    if "seguranca" not in current_user.permissions:
+        raise HTTPException(status_code=403, detail="Acesso negado")
+    consultas_lentas.limpar()
@@ -0,0 +1,84 @@
+# Arquivo: routers/tarefas.py
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import JSONResponse
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List
+
+import schemas, tarefas
+from database import get_async_db, executar_crud
+from crud import crud_tarefas
+from .usuarios import get_current_active_user
+
+# =================================================================
+# 1. CONFIGURAÇÃO DO ROUTER
+# =================================================================
+router = APIRouter(
+    prefix="/api/tarefas",
+    tags=["Tarefas de Relatório"]
+)
+
+# =================================================================
+# 2. ENDPOINTS DA FILA DE RELATÓRIOS
+# =================================================================
+# Fluxo: POST para enfileirar, GET /{id} até o status ser "concluida"
+# e GET /{id}/resultado para baixar o relatório.
+
+@router.get("/tipos", response_model=List[str])
+async def api_listar_tipos(current_user: schemas.User = Depends(get_current_active_user)):
+    return tarefas.tipos_disponiveis()
+
+@router.post("/", response_model=schemas.TarefaRelatorio, status_code=status.HTTP_202_ACCEPTED)
+async def api_enviar_tarefa(
+    tarefa: schemas.TarefaRelatorioCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.User = Depends(get_current_active_user)
+):
+    try:
+        return await tarefas.enviar(db, tarefa.tipo, tarefa.parametros, current_user.id)
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors(include_url=False, include_context=False))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/{tarefa_id}", response_model=schemas.TarefaRelatorio)
+async def api_get_tarefa(
+    tarefa_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.User = Depends(get_current_active_user)
+):
+    tarefa = await executar_crud(db, crud_tarefas.get_tarefa, tarefa_id, esquema=schemas.TarefaRelatorio)
+    if tarefa is None:
+        raise HTTPException(status_code=404, detail="Tarefa não encontrada.")
+    return tarefa
+
+@router.get("/{tarefa_id}/resultado")
+async def api_get_resultado_tarefa(
+    tarefa_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.User = Depends(get_current_active_user)
+):
+    tarefa = await executar_crud(db, crud_tarefas.get_tarefa, tarefa_id)
+    if tarefa is None:
+        raise HTTPException(status_code=404, detail="Tarefa não encontrada.")
+    if tarefa.status != "concluida":
+        raise HTTPException(status_code=409, detail=f"O relatório ainda não está disponível (status: {tarefa.status}).")
+    return JSONResponse(content=tarefa.resultado)
+
+@router.delete("/{tarefa_id}", response_model=schemas.TarefaRelatorio)
+async def api_cancelar_tarefa(
+    tarefa_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.User = Depends(get_current_active_user)
+):
+    tarefa = await executar_crud(db, crud_tarefas.get_tarefa, tarefa_id, esquema=schemas.TarefaRelatorio)
+    if tarefa is None:
+        raise HTTPException(status_code=404, detail="Tarefa não encontrada.")
+    # Só quem pediu (ou quem tem a permissão de segurança) pode cancelar
+    if tarefa.usuario_id != current_user.id and "seguranca" not in (current_user.permissions or ""):
+        raise HTTPException(status_code=403, detail="Sem permissão para cancelar esta tarefa.")
+    try:
+        return await tarefas.cancelar(db, tarefa_id)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
@@ -1,15 +1,16 @@
 # Arquivo: routers/usuarios.py
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
-from typing import List
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
 from datetime import timedelta
 
 # Importando os módulos necessários
 import models, schemas, security
-from database import get_db # Assumindo que get_db está em database.py
-from crud import crud_usuario
+from database import get_async_db, executar_crud
+from crud import crud_usuario, paginacao
+from .paginacao import pediu_paginacao, responder_pagina
 
 # =================================================================
 # 1. CONFIGURAÇÃO DO ROUTER
@@ -27,23 +28,30 @@ router = APIRouter(
 # Movendo as dependências que são específicas deste router para cá
 oauth2_scheme = security.OAuth2PasswordBearer(tokenUrl="/api/token")
 
-def get_current_active_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> models.User:
+async def get_current_active_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)) -> schemas.User:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Não foi possível validar as credenciais",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = security.jwt.decode(token, security.SECRET_KEY, algorithms=[security.ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            raise credentials_exception
-    except Exception:
-        raise credentials_exception
-        
-    user = crud_usuario.get_user_by_username(db, username=username)
+    # Caminho rápido: token já validado recentemente, nenhuma consulta ao banco
+    user = security.get_usuario_em_cache(token)
     if user is None:
-        raise credentials_exception
+        try:
+            payload = security.jwt.decode(token, security.SECRET_KEY, algorithms=[security.ALGORITHM])
+            username: str = payload.get("sub")
+            if username is None:
+                raise credentials_exception
+        except Exception:
+            raise credentials_exception
+
+        # Guardamos apenas os dados do usuário (id, permissões, is_active),
+        # desligados da sessão do banco
+        user = await executar_crud(db, crud_usuario.get_user_by_username, username=username, esquema=schemas.User)
+        if user is None:
+            raise credentials_exception
+        security.guardar_usuario_em_cache(token, user, payload.get("exp"))
+
     if not user.is_active:
         raise HTTPException(status_code=400, detail="Usuário inativo")
     return user
@@ -53,10 +61,10 @@ def get_current_active_user(token: str = Depends(oauth2_scheme), db: Session = D
 # =================================================================
 
 @router.post("/token", response_model=schemas.Token)
-def login_for_access_token(db: Session = Depends(get_db), form_data: OAuth2PasswordRequestForm = Depends()):
-    # A linha abaixo estava chamando 'security.authenticate_user'
-    #  CORREÇÃO: Chamar a função a partir do seu novo local em 'crud_usuario'
-    user = crud_usuario.authenticate_user(db, username=form_data.username, password=form_data.password)
+async def login_for_access_token(db: AsyncSession = Depends(get_async_db), form_data: OAuth2PasswordRequestForm = Depends()):
+    # O bcrypt roda em um executor próprio e limitado (ver security.py),
+    # para que uma onda de logins não trave as demais rotas.
+    user = await crud_usuario.authenticate_user_async(db, username=form_data.username, password=form_data.password)
     
     if not user:
         raise HTTPException(
@@ -70,39 +78,54 @@ def login_for_access_token(db: Session = Depends(get_db), form_data: OAuth2Passw
     return {"access_token": access_token, "token_type": "bearer"}
 
 @router.get("/users/me", response_model=schemas.User)
-def read_users_me(current_user: models.User = Depends(get_current_active_user)):
+async def read_users_me(current_user: schemas.User = Depends(get_current_active_user)):
     return current_user
 
 @router.get("/users/", response_model=List[schemas.User])
-def read_users(db: Session = Depends(get_db), current_user: models.User = Depends(get_current_active_user)):
+async def read_users(
+    request: Request,
+    limite: Optional[int] = Query(None, ge=1, le=paginacao.LIMITE_MAXIMO),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.User = Depends(get_current_active_user)
+):
     if "seguranca" not in current_user.permissions:
         raise HTTPException(status_code=403, detail="Acesso negado")
-    return crud_usuario.get_users(db=db)
+    if pediu_paginacao(limite, cursor, fields):
+        return await responder_pagina(
+            request, db, crud_usuario.query_users(), models.User, crud_usuario.CHAVES_USUARIOS,
+            schemas.User, limite, cursor, fields
+        )
+    return await executar_crud(db, crud_usuario.get_users, esquema=List[schemas.User])
 
 @router.put("/users/{user_id}/permissions", response_model=schemas.User)
-def update_permissions(user_id: int, new_permissions: schemas.UserUpdatePermissions, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_active_user)):
+async def update_permissions(user_id: int, new_permissions: schemas.UserUpdatePermissions, db: AsyncSession = Depends(get_async_db), current_user: schemas.User = Depends(get_current_active_user)):
     if "seguranca" not in current_user.permissions:
         raise HTTPException(status_code=403, detail="Acesso negado")
-    updated_user = crud_usuario.update_user_permissions(db, user_id=user_id, permissions=new_permissions.permissions)
+    updated_user = await executar_crud(
+        db, crud_usuario.update_user_permissions, user_id=user_id, permissions=new_permissions.permissions,
+        esquema=schemas.User, escrita=True
+    )
     if not updated_user:
         raise HTTPException(status_code=404, detail="Usuário não encontrado")
     return updated_user
 
 @router.post("/users/", response_model=schemas.User)
-def api_create_user(user: schemas.UserCreate, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_active_user)):
+async def api_create_user(user: schemas.UserCreate, db: AsyncSession = Depends(get_async_db), current_user: schemas.User = Depends(get_current_active_user)):
     if "seguranca" not in current_user.permissions:
         raise HTTPException(status_code=403, detail="Acesso negado")
-    db_user = crud_usuario.get_user_by_username(db, username=user.username)
+    db_user = await executar_crud(db, crud_usuario.get_user_by_username, username=user.username)
     if db_user:
         raise HTTPException(status_code=400, detail="Nome de usuário já registrado")
-    return crud_usuario.create_user(db=db, user=user)
+    return await executar_crud(db, crud_usuario.create_user, user=user, esquema=schemas.User, escrita=True)
 
 @router.delete("/users/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
-def api_delete_user(user_id: int, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_active_user)):
+async def api_delete_user(user_id: int, db: AsyncSession = Depends(get_async_db), current_user: schemas.User = Depends(get_current_active_user)):
     if "seguranca" not in current_user.permissions:
         raise HTTPException(status_code=403, detail="Acesso negado")
     if current_user.id == user_id:
         raise HTTPException(status_code=400, detail="Não é possível apagar o próprio usuário.")
-    if not crud_usuario.delete_user(db, user_id=user_id):
+    if not await executar_crud(db, crud_usuario.delete_user, user_id=user_id, escrita=True):
         raise HTTPException(status_code=404, detail="Usuário não encontrado")
     return {"ok": True}
\ No newline at end of file
@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field
-from typing import Optional, List, Dict
-from datetime import date, time
+from typing import Optional, List, Dict, Any, Generic, TypeVar
+from datetime import date, time, datetime
 from enum import Enum
 
 # =================================================================
@@ -100,6 +100,21 @@ class Produto(ProdutoBase):
     class Config:
         from_attributes = True
 
+class MovimentoEstoque(BaseModel):
+    id: int
+    produto_id: int
+    momento: datetime
+    quantidade: float
+    origem: str
+    servico_id: Optional[int] = None
+    class Config:
+        from_attributes = True
+
+class EstoqueNoMomento(BaseModel):
+    produto_id: int
+    momento: datetime
+    estoque: float
+
 # =================================================================
 # 3. Schemas Dependentes Nível 1
 # =================================================================
@@ -134,6 +149,12 @@ class DispositivoStatusUpdate(BaseModel):
     dispositivo_id: int
     status: str
 
+class DispositivoStatusResultado(BaseModel):
+    inseridos: int = 0
+    atualizados: int = 0
+    removidos: int = 0
+    inalterados: int = 0
+
 # --- Agenda ---
 class AgendamentoBase(BaseModel):
     data_agendamento: date
@@ -228,6 +249,8 @@ class ContagemPragaCreate(ContagemPragaBase):
 class ContagemPraga(ContagemPragaBase):
     id: int
     servico_id: int
+    dispositivo_id: Optional[int] = None
+    praga_id: Optional[int] = None
     class Config:
         from_attributes = True
 
@@ -279,6 +302,39 @@ class RelatorioContagemPraga(BaseModel):
     class Config:
         from_attributes = True
 
+class PontoTendenciaPraga(BaseModel):
+    inicio: date
+    total: int
+    media_movel: float
+    alerta: bool
+
+class SerieTendenciaPraga(BaseModel):
+    praga_nome: str
+    total: int
+    pontos: List[PontoTendenciaPraga]
+
+class AlertaPraga(BaseModel):
+    praga_nome: str
+    inicio: date
+    total: int
+
+class RelatorioTendenciaPragas(BaseModel):
+    area_id: int
+    data_inicio: date
+    data_fim: date
+    periodo: str
+    janela: int
+    limite_alerta: Optional[int] = None
+    series: List[SerieTendenciaPraga]
+    alertas: List[AlertaPraga]
+
+class RelatorioContagemDispositivo(BaseModel):
+    dispositivo_numero: str
+    praga_nome: str
+    quantidade: int
+    class Config:
+        from_attributes = True
+
 class ObservacaoServico(BaseModel):
     servico_id: int
     observacoes: str
@@ -290,7 +346,7 @@ class RelatorioAreaCompilado(BaseModel):
     data_inicio: date
     data_fim: date
     produtos_utilizados: List[ProdutoUsadoSummary]
-    contagens_pragas: List[ContagemPraga]
+    contagens_pragas: List[RelatorioContagemDispositivo]
     dispositivos_status: List[RelatorioDispositivoStatus]
     ocorrencias_mip: List[MIPRegistro]
     observacoes_gerais: List[ObservacaoServico]
@@ -316,4 +372,43 @@ class AgendaItem(BaseModel):
     status: str
     tipo: str = "servico"
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+# =================================================================
+# 7. Tarefas de Relatório (geração em segundo plano)
+# =================================================================
+class ParametrosPeriodo(BaseModel):
+    data_inicio: date
+    data_fim: date
+
+class ParametrosAreaCompilado(ParametrosPeriodo):
+    area_id: int
+
+class ParametrosServico(BaseModel):
+    servico_id: int
+
+class TarefaRelatorioCreate(BaseModel):
+    tipo: str
+    parametros: Dict[str, Any] = {}
+
+class TarefaRelatorio(BaseModel):
+    id: int
+    tipo: str
+    parametros: Dict[str, Any]
+    status: str
+    usuario_id: Optional[int] = None
+    criado_em: datetime
+    iniciado_em: Optional[datetime] = None
+    concluido_em: Optional[datetime] = None
+    mensagem_erro: Optional[str] = None
+    class Config:
+        from_attributes = True
+
+# =================================================================
+# 8. Listagens paginadas (ver crud/paginacao.py)
+# =================================================================
+T = TypeVar("T")
+
+class Pagina(BaseModel, Generic[T]):
+    itens: List[T]
+    proximo_cursor: Optional[str] = None
@@ -1,9 +1,14 @@
 # Arquivo: security.py (versão limpa)
 
+import os
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from fastapi.security import OAuth2PasswordBearer
 from passlib.context import CryptContext
 from datetime import datetime, timedelta, timezone
-from typing import Optional
+from typing import Optional, Dict, Tuple, Any
 from jose import JWTError, jwt
 
 # Configurações de Segurança
@@ -11,8 +16,28 @@ SECRET_KEY = "SUA_CHAVE_SECRETA_MUITO_SEGURA" # TROQUE ISSO EM PRODUÇÃO
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60
 
+# Tempo (em segundos) que um token já validado fica em cache na memória.
+# Limita por quanto tempo uma instância pode usar dados de usuário
+# desatualizados caso a alteração tenha sido feita em outra instância.
+AUTH_CACHE_TTL_SECONDS = int(os.environ.get("AUTH_CACHE_TTL_SECONDS", "60"))
+AUTH_CACHE_MAX_ITENS = int(os.environ.get("AUTH_CACHE_MAX_ITENS", "10000"))
+
+# Custo (rounds) do bcrypt. Hashes com custo menor são atualizados no login.
+BCRYPT_ROUNDS = int(os.environ.get("BCRYPT_ROUNDS", "12"))
+# Quantos hashes bcrypt podem ser calculados ao mesmo tempo no login.
+LOGIN_HASH_WORKERS = int(os.environ.get("LOGIN_HASH_WORKERS", "2"))
+
 # Contexto para criptografia de senhas
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+)
+
+# Executor exclusivo para o bcrypt: limita quantos hashes rodam em paralelo
+# e evita que uma onda de logins ocupe o threadpool usado pelas outras rotas.
+_hash_executor = ThreadPoolExecutor(max_workers=LOGIN_HASH_WORKERS, thread_name_prefix="bcrypt")
 
 # Esquema do OAuth2
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/token")
@@ -26,6 +51,18 @@ def get_password_hash(password: str) -> str:
     """Gera o hash de uma senha."""
     return pwd_context.hash(password)
 
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verifica a senha e, se o hash estiver com custo abaixo do configurado,
+    retorna também um novo hash para ser salvo no lugar do antigo.
+    """
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+async def verify_and_update_password_async(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Versão de `verify_and_update_password` que roda no executor dedicado ao bcrypt."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_hash_executor, verify_and_update_password, plain_password, hashed_password)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Cria um token de acesso JWT."""
     to_encode = data.copy()
@@ -35,4 +72,50 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
         expire = datetime.now(timezone.utc) + timedelta(minutes=15)
     to_encode.update({"exp": expire})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
-    return encoded_jwt
\ No newline at end of file
+    return encoded_jwt
+
+# =================================================================
+# Cache de tokens já validados
+# =================================================================
+# token -> (instante de expiração, usuário autenticado)
+_cache_tokens: Dict[str, Tuple[float, Any]] = {}
+_cache_lock = threading.Lock()
+
+def get_usuario_em_cache(token: str):
+    """Retorna o usuário associado ao token, se ele ainda estiver válido no cache."""
+    with _cache_lock:
+        item = _cache_tokens.get(token)
+        if item is None:
+            return None
+        expira_em, usuario = item
+        if expira_em <= time.monotonic():
+            del _cache_tokens[token]
+            return None
+        return usuario
+
+def guardar_usuario_em_cache(token: str, usuario: Any, token_exp: Optional[float] = None):
+    """
+    Guarda o usuário de um token já validado. O item expira no que vier
+    primeiro: o TTL do cache ou a expiração do próprio token (`exp`).
+    """
+    if AUTH_CACHE_TTL_SECONDS <= 0:
+        return
+    validade = AUTH_CACHE_TTL_SECONDS
+    if token_exp is not None:
+        validade = min(validade, token_exp - time.time())
+    if validade <= 0:
+        return
+    with _cache_lock:
+        if len(_cache_tokens) >= AUTH_CACHE_MAX_ITENS:
+            agora = time.monotonic()
+            for chave in [k for k, (exp, _) in _cache_tokens.items() if exp <= agora]:
+                del _cache_tokens[chave]
+            if len(_cache_tokens) >= AUTH_CACHE_MAX_ITENS:
+                _cache_tokens.clear()
+        _cache_tokens[token] = (time.monotonic() + validade, usuario)
+
+def invalidar_usuario_em_cache(user_id: int):
+    """Remove do cache todos os tokens de um usuário (ex: permissões alteradas)."""
+    with _cache_lock:
+        for chave in [k for k, (_, u) in _cache_tokens.items() if u.id == user_id]:
+            del _cache_tokens[chave]
@@ -0,0 +1,195 @@
+# Arquivo: tarefas.py (geração de relatórios em segundo plano)
+
+import os
+import json
+import asyncio
+import hashlib
+from datetime import datetime, timedelta
+from typing import Optional
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel
+
+import cache
+import schemas
+from database import AsyncSessionLocal, executar_crud
+from crud import crud_tarefas
+
+# =================================================================
+# Configuração
+# =================================================================
+# A fila fica na própria tabela tarefas_relatorio: não há broker externo.
+# Cada instância da API roda RELATORIOS_WORKERS trabalhadores, que disputam
+# as tarefas pendentes pelo banco.
+RELATORIOS_WORKERS = int(os.environ.get("RELATORIOS_WORKERS", "2"))
+# Intervalo de consulta à fila quando não há aviso local (tarefas enviadas por outra instância)
+RELATORIOS_POLL_SECONDS = float(os.environ.get("RELATORIOS_POLL_SECONDS", "2"))
+# Tarefas "executando" há mais tempo que isso voltam para a fila ao iniciar
+RELATORIOS_TIMEOUT_MINUTES = int(os.environ.get("RELATORIOS_TIMEOUT_MINUTES", "30"))
+# Por quanto tempo tarefas terminadas (e seus resultados) são mantidas
+RELATORIOS_RETENCAO_HORAS = int(os.environ.get("RELATORIOS_RETENCAO_HORAS", "24"))
+
+# =================================================================
+# Tipos de relatório
+# =================================================================
+# Cada router registra os relatórios que podem ir para a fila:
+#
+#     @tarefas.tipo_de_relatorio("area_compilado", schemas.ParametrosAreaCompilado)
+#     async def _gerar(db: AsyncSession, parametros: schemas.ParametrosAreaCompilado):
+#         ...
+#
+# A função recebe uma sessão própria e os parâmetros já validados. Um
+# ValueError vira o status "erro" com a mensagem para o usuário.
+
+_TIPOS = {}
+
+def tipo_de_relatorio(nome: str, parametros: type[BaseModel]):
+    def registrar(funcao):
+        _TIPOS[nome] = (parametros, funcao)
+        return funcao
+    return registrar
+
+def tipos_disponiveis() -> list:
+    return sorted(_TIPOS)
+
+# =================================================================
+# Envio
+# =================================================================
+
+# Avisa os trabalhadores deste processo que há tarefa nova (criado ao iniciá-los)
+_acordar: Optional[asyncio.Event] = None
+
+async def enviar(db, tipo: str, parametros: dict, usuario_id: Optional[int]) -> schemas.TarefaRelatorio:
+    """
+    Valida os parâmetros e enfileira o relatório. Se o mesmo relatório já foi
+    pedido com os mesmos dados (mesma versão), a tarefa existente é devolvida.
+    Lança ValueError para tipo desconhecido e ValidationError para parâmetros inválidos.
+    """
+    if tipo not in _TIPOS:
+        raise ValueError(f"Tipo de relatório desconhecido: '{tipo}'. Disponíveis: {', '.join(tipos_disponiveis())}.")
+    modelo, _ = _TIPOS[tipo]
+    parametros = modelo(**parametros).model_dump(mode="json")
+    chave = hashlib.sha256(json.dumps(
+        [tipo, parametros, cache.versao_dos_dados("relatorios")], sort_keys=True
+    ).encode()).hexdigest()
+
+    tarefa = await executar_crud(
+        db, crud_tarefas.criar_ou_reaproveitar_tarefa, tipo, parametros, chave, usuario_id,
+        esquema=schemas.TarefaRelatorio, escrita=True
+    )
+    if _acordar is not None:
+        _acordar.set()
+    return tarefa
+
+# =================================================================
+# Cancelamento
+# =================================================================
+
+# Tarefas em execução neste processo: {tarefa_id: asyncio.Task}
+_em_execucao = {}
+_canceladas_pelo_usuario = set()
+
+async def cancelar(db, tarefa_id: int) -> schemas.TarefaRelatorio:
+    """Cancela a tarefa no banco e, se ela roda neste processo, interrompe a geração."""
+    tarefa = await executar_crud(
+        db, crud_tarefas.cancelar_tarefa, tarefa_id, esquema=schemas.TarefaRelatorio, escrita=True
+    )
+    execucao = _em_execucao.get(tarefa_id)
+    if execucao is not None:
+        _canceladas_pelo_usuario.add(tarefa_id)
+        execucao.cancel()
+    return tarefa
+
+# =================================================================
+# Trabalhadores
+# =================================================================
+
+async def _com_sessao(funcao, *args, escrita: bool = False):
+    async with AsyncSessionLocal() as db:
+        return await executar_crud(db, funcao, *args, escrita=escrita)
+
+async def _gerar(tipo: str, parametros: dict):
+    modelo, funcao = _TIPOS[tipo]
+    async with AsyncSessionLocal() as db:
+        return jsonable_encoder(await funcao(db, modelo(**parametros)))
+
+async def _executar(tarefa_id: int, tipo: str, parametros: dict):
+    if tipo not in _TIPOS:
+        await _com_sessao(crud_tarefas.falhar_tarefa, tarefa_id, f"Tipo de relatório desconhecido: '{tipo}'.", escrita=True)
+        return
+
+    execucao = asyncio.create_task(_gerar(tipo, parametros))
+    _em_execucao[tarefa_id] = execucao
+    try:
+        resultado = await execucao
+    except asyncio.CancelledError:
+        if tarefa_id not in _canceladas_pelo_usuario:
+            raise  # o próprio trabalhador foi cancelado (desligamento)
+        return  # cancelada pelo usuário: o status já foi gravado
+    except ValueError as e:
+        await _com_sessao(crud_tarefas.falhar_tarefa, tarefa_id, str(e), escrita=True)
+        return
+    except Exception as e:
+        await _com_sessao(crud_tarefas.falhar_tarefa, tarefa_id, f"Erro ao gerar o relatório: {e}", escrita=True)
+        return
+    finally:
+        _em_execucao.pop(tarefa_id, None)
+        _canceladas_pelo_usuario.discard(tarefa_id)
+    await _com_sessao(crud_tarefas.concluir_tarefa, tarefa_id, resultado, escrita=True)
+
+_ultima_limpeza = datetime.min
+
+async def _limpar_se_preciso():
+    global _ultima_limpeza
+    agora = datetime.now()
+    if agora - _ultima_limpeza < timedelta(minutes=10):
+        return
+    _ultima_limpeza = agora
+    await _com_sessao(
+        crud_tarefas.apagar_tarefas_antigas, agora - timedelta(hours=RELATORIOS_RETENCAO_HORAS), escrita=True
+    )
+
+async def _trabalhador():
+    while True:
+        try:
+            tarefa = await _com_sessao(crud_tarefas.reservar_proxima_tarefa, escrita=True)
+            if tarefa is None:
+                await _limpar_se_preciso()
+                _acordar.clear()
+                try:
+                    await asyncio.wait_for(_acordar.wait(), RELATORIOS_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await _executar(tarefa.id, tarefa.tipo, tarefa.parametros)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Falha ao falar com o banco: espera e tenta de novo, sem derrubar o trabalhador
+            print(f"--- ERRO NO TRABALHADOR DE RELATÓRIOS: {e} ---")
+            await asyncio.sleep(RELATORIOS_POLL_SECONDS)
+
+_trabalhadores = []
+
+async def iniciar_trabalhadores(quantidade: int = RELATORIOS_WORKERS) -> int:
+    """Recoloca na fila as tarefas presas e inicia os trabalhadores. Retorna quantos iniciou."""
+    global _acordar
+    if quantidade <= 0:
+        return 0
+    _acordar = asyncio.Event()
+    await _com_sessao(
+        crud_tarefas.recolocar_tarefas_presas,
+        datetime.now() - timedelta(minutes=RELATORIOS_TIMEOUT_MINUTES), escrita=True
+    )
+    _trabalhadores.extend(asyncio.create_task(_trabalhador()) for _ in range(quantidade))
+    return quantidade
+
+async def parar_trabalhadores():
+    """Interrompe os trabalhadores e devolve para a fila as tarefas que estavam em execução."""
+    interrompidas = list(_em_execucao)
+    for trabalhador in _trabalhadores:
+        trabalhador.cancel()
+    await asyncio.gather(*_trabalhadores, return_exceptions=True)
+    _trabalhadores.clear()
+    if interrompidas:
+        await _com_sessao(crud_tarefas.devolver_para_fila, interrompidas, escrita=True)
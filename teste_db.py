@@ -1,10 +1,11 @@
 # Em teste_db.py
 
 # Importações necessárias para acessar o banco e os modelos
-from sqlalchemy import extract, func
+from sqlalchemy import func
 from database import SessionLocal  # Importa o criador de sessão do seu projeto
 import models
 from datetime import date
+from crud.periodos import filtro_mes
 
 def testar_consulta_descricoes():
     """
@@ -29,8 +30,7 @@ def testar_consulta_descricoes():
             models.Servico.descricao,
             func.count(models.Servico.id).label('total')
         ).filter(
-            extract('year', models.Servico.data) == ano_corrente,
-            extract('month', models.Servico.data) == mes_corrente,
+            filtro_mes(models.Servico.data, ano_corrente, mes_corrente),
             models.Servico.descricao.is_not(None)
         ).group_by(
             models.Servico.descricao
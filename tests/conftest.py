@@ -0,0 +1,175 @@
+# Arquivo: tests/conftest.py (banco temporário, cliente da API e contador de consultas)
+
+import os
+import sys
+import shutil
+import tempfile
+from pathlib import Path
+from datetime import date
+from contextlib import contextmanager
+
+# O banco e o cache são escolhidos na importação do database.py e do cache.py:
+# as variáveis precisam existir antes de qualquer import do projeto.
+# Os testes que dependem do dialeto (travas de linha, EXPLAIN) também rodam
+# em um PostgreSQL, se houver um: TESTES_POSTGRES_URL ou uma DATABASE_URL de
+# PostgreSQL já definida. Use um banco descartável (as tabelas são criadas nele).
+_URL_ORIGINAL = os.environ.get("DATABASE_URL", "")
+URL_POSTGRES = os.environ.get("TESTES_POSTGRES_URL") or (
+    _URL_ORIGINAL if _URL_ORIGINAL.startswith("postgresql") else None
+)
+
+_PASTA_TEMPORARIA = tempfile.mkdtemp(prefix="sise-testes-")
+os.environ["DATABASE_URL"] = f"sqlite:///{Path(_PASTA_TEMPORARIA) / 'testes.db'}"
+os.environ.pop("INSTANCE_CONNECTION_NAME", None)
+os.environ.pop("ASYNC_DATABASE_URL", None)
+# Sem cache de respostas: cada requisição tem que chegar ao banco
+os.environ["RESPONSE_CACHE_BACKEND"] = "nenhum"
+os.environ.setdefault("ESQUEMA_NA_INICIALIZACAO", "criar")
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import pytest
+from sqlalchemy import event, create_engine
+from sqlalchemy.orm import sessionmaker
+from fastapi.testclient import TestClient
+
+import main_api
+import models
+import schemas
+import security
+from database import Base, SessionLocal, engine, async_engine
+from crud import crud_usuario
+
+def pytest_sessionfinish(session, exitstatus):
+    """Apaga o banco temporário no fim da sessão de testes."""
+    engine.dispose()
+    shutil.rmtree(_PASTA_TEMPORARIA, ignore_errors=True)
+
+USUARIO_ADMIN = "admin-testes"
+SENHA = "senha-testes"
+
+# Tamanhos usados para comparar o número de consultas (ver test_consultas.py)
+POUCOS, MUITOS = 3, 60
+# Meses com poucos e com muitos serviços, agendamentos e ocorrências
+MES_POUCOS, MES_MUITOS = (2024, 2), (2024, 3)
+
+# =================================================================
+# Aplicação e autenticação
+# =================================================================
+
+@pytest.fixture(scope="session")
+def cliente():
+    """TestClient com o lifespan do app (prepara o banco e inicia a fila de relatórios)."""
+    with TestClient(main_api.app) as cliente:
+        yield cliente
+
+@pytest.fixture(scope="session")
+def cabecalhos(cliente):
+    """Cabeçalho Authorization de um administrador com todas as permissões."""
+    with SessionLocal() as db:
+        if not crud_usuario.get_user_by_username(db, USUARIO_ADMIN):
+            crud_usuario.create_user(
+                db, schemas.UserCreate(username=USUARIO_ADMIN, password=SENHA), permissions="seguranca,configuracoes"
+            )
+    resposta = cliente.post("/api/token", data={"username": USUARIO_ADMIN, "password": SENHA})
+    assert resposta.status_code == 200, resposta.text
+    return {"Authorization": f"Bearer {resposta.json()['access_token']}"}
+
+@pytest.fixture(scope="session")
+def sessao_postgres():
+    """
+    Fábrica de sessões do PostgreSQL de testes, com as tabelas criadas.
+    Sem URL_POSTGRES os testes que a usam são pulados.
+    """
+    if not URL_POSTGRES:
+        pytest.skip("sem PostgreSQL: defina TESTES_POSTGRES_URL (ou uma DATABASE_URL de PostgreSQL)")
+    engine_postgres = create_engine(URL_POSTGRES, pool_size=10, max_overflow=10)
+    Base.metadata.create_all(engine_postgres)
+    yield sessionmaker(bind=engine_postgres, autoflush=False)
+    engine_postgres.dispose()
+
+# =================================================================
+# Contador de consultas SQL
+# =================================================================
+
+class ContadorDeConsultas:
+    """Guarda as instruções SQL enviadas ao banco enquanto está ativo."""
+
+    def __init__(self):
+        self.instrucoes = []
+
+    def __len__(self):
+        return len(self.instrucoes)
+
+    def _registrar(self, conn, cursor, statement, parameters, context, executemany):
+        self.instrucoes.append(statement)
+
+@pytest.fixture
+def contar_consultas():
+    """
+    `with contar_consultas() as consultas:` conta as instruções SQL executadas
+    no bloco, pelas rotas (engine assíncrono) e pelo crud direto (engine síncrono).
+    """
+    engines = (engine, async_engine.sync_engine)
+
+    @contextmanager
+    def contar():
+        contador = ContadorDeConsultas()
+        for alvo in engines:
+            event.listen(alvo, "before_cursor_execute", contador._registrar)
+        try:
+            yield contador
+        finally:
+            for alvo in engines:
+                event.remove(alvo, "before_cursor_execute", contador._registrar)
+
+    return contar
+
+# =================================================================
+# Dados de exemplo
+# =================================================================
+
+def _datas_do_mes(ano: int, mes: int, quantidade: int):
+    return [date(ano, mes, 1 + i % 28) for i in range(quantidade)]
+
+@pytest.fixture(scope="session")
+def dados(cliente):
+    """
+    Duas áreas e dois meses, um com POUCOS e outro com MUITOS registros de
+    cada tipo (serviços com produtos, dispositivos, agendamentos e
+    ocorrências), além de MUITOS produtos e usuários.
+    """
+    with SessionLocal() as db:
+        senha = security.get_password_hash(SENHA)
+        usuarios = [models.User(username=f"tecnico-{i:03d}", hashed_password=senha, permissions="") for i in range(MUITOS)]
+        produtos = [
+            models.Produto(nome=f"Produto {i:03d}", estoque_atual=1000.0, fator_conversao_uso=1.0)
+            for i in range(MUITOS)
+        ]
+        area_poucos, area_muitos = models.Area(nome="Área com poucos"), models.Area(nome="Área com muitos")
+        db.add_all([*usuarios, *produtos, area_poucos, area_muitos])
+        db.flush()
+
+        for area, (ano, mes), quantidade in (
+            (area_poucos, MES_POUCOS, POUCOS), (area_muitos, MES_MUITOS, MUITOS)
+        ):
+            for i, dia in enumerate(_datas_do_mes(ano, mes, quantidade)):
+                servico = models.Servico(descricao=f"Serviço {i}", data=dia, status="Concluído", area_id=area.id)
+                servico.produtos_associados = [
+                    models.ServicoProdutoAssociado(produto_id=produtos[(i + j) % MUITOS].id, quantidade_usada=1.0)
+                    for j in range(2)
+                ]
+                db.add_all([
+                    servico,
+                    models.Dispositivo(numero=str(i + 1), tipo="AL", status="OK", area_id=area.id),
+                    models.Agendamento(
+                        data_agendamento=dia, area_id=area.id, tipo_servico="Visita de Rotina",
+                        responsavel_id=usuarios[i % MUITOS].id
+                    ),
+                    models.Ocorrencia(
+                        data_ocorrencia=dia, descricao=f"Ocorrência {i}", nivel_urgencia="Baixa",
+                        area_id=area.id, registrado_por_id=usuarios[i % MUITOS].id
+                    ),
+                ])
+        db.commit()
+        return {"area_poucos": area_poucos.id, "area_muitos": area_muitos.id}
@@ -0,0 +1,32 @@
+# Arquivo: tests/test_agenda.py (calendário do mês)
+
+from database import SessionLocal
+from crud import crud_agenda
+from conftest import POUCOS, MUITOS, MES_POUCOS, MES_MUITOS
+
+# =================================================================
+# Calendário: uma consulta só, qualquer que seja o número de eventos
+# =================================================================
+
+def test_eventos_do_calendario_em_uma_consulta(dados, contar_consultas):
+    for (ano, mes), quantidade in ((MES_POUCOS, POUCOS), (MES_MUITOS, MUITOS)):
+        with SessionLocal() as db, contar_consultas() as contador:
+            eventos = crud_agenda.get_eventos_calendario(db, ano, mes)
+        # Serviços, ocorrências e agendamentos do mês, com o nome da área
+        assert len(eventos) == 3 * quantidade
+        assert all(evento.area_nome for evento in eventos)
+        assert len(contador) == 1, contador.instrucoes
+
+def test_rota_do_calendario_com_consultas_fixas(cliente, cabecalhos, dados, contar_consultas):
+    ano, mes = MES_POUCOS
+    assert cliente.get(f"/api/agenda/mes/{ano}/{mes}", headers=cabecalhos).status_code == 200
+
+    consultas = []
+    for (ano, mes), quantidade in ((MES_POUCOS, POUCOS), (MES_MUITOS, MUITOS)):
+        with contar_consultas() as contador:
+            resposta = cliente.get(f"/api/agenda/mes/{ano}/{mes}", headers=cabecalhos)
+        assert resposta.status_code == 200, resposta.text
+        assert len(resposta.json()) == 3 * quantidade
+        consultas.append(len(contador))
+
+    assert consultas[0] == consultas[1]
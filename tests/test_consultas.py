@@ -0,0 +1,52 @@
+# Arquivo: tests/test_consultas.py (número de consultas das listagens)
+
+from datetime import timedelta
+
+import pytest
+
+from crud.periodos import intervalo_do_mes
+from conftest import POUCOS, MUITOS, MES_POUCOS, MES_MUITOS
+
+# =================================================================
+# Listagens: o número de consultas não cresce com o resultado
+# =================================================================
+# Cada caso é a mesma rota com um resultado pequeno e um grande. As
+# relações vêm em lote (joined/selectin, ver crud/carregamento.py): com um
+# N+1 o caso grande faria uma consulta a mais por linha.
+
+def _periodo_do_mes(ano: int, mes: int) -> dict:
+    inicio, proximo_mes = intervalo_do_mes(ano, mes)
+    return {"data_inicio": inicio.isoformat(), "data_fim": (proximo_mes - timedelta(days=1)).isoformat()}
+
+def _casos(dados):
+    (ano_p, mes_p), (ano_m, mes_m) = MES_POUCOS, MES_MUITOS
+    poucos, muitos = dados["area_poucos"], dados["area_muitos"]
+    return {
+        "serviços": ("/api/servicos/", {"area_id": poucos}, {"area_id": muitos}),
+        "serviços (páginas)": ("/api/servicos/", {"area_id": poucos, "limite": 100}, {"area_id": muitos, "limite": 100}),
+        "relatório de serviços": ("/api/relatorios/servicos", _periodo_do_mes(ano_p, mes_p), _periodo_do_mes(ano_m, mes_m)),
+        "dispositivos": ("/api/dispositivos/", {"area_id": poucos}, {"area_id": muitos}),
+        "dispositivos (páginas)": ("/api/dispositivos/", {"area_id": poucos, "limite": 100}, {"area_id": muitos, "limite": 100}),
+        "produtos (páginas)": ("/api/produtos/", {"limite": POUCOS}, {"limite": MUITOS}),
+        "usuários (páginas)": ("/api/users/", {"limite": POUCOS}, {"limite": MUITOS}),
+        "agendamentos": ("/api/agenda/agendamentos/", {"year": ano_p, "month": mes_p}, {"year": ano_m, "month": mes_m}),
+        "ocorrências": ("/api/agenda/ocorrencias/", {"year": ano_p, "month": mes_p}, {"year": ano_m, "month": mes_m}),
+    }
+
+@pytest.mark.parametrize("caso", list(_casos({"area_poucos": 0, "area_muitos": 0})))
+def test_consultas_nao_crescem_com_o_resultado(caso, cliente, cabecalhos, dados, contar_consultas):
+    url, params_poucos, params_muitos = _casos(dados)[caso]
+    # A primeira requisição aquece o que é feito uma vez só (ex: usuário da sessão)
+    assert cliente.get(url, params=params_poucos, headers=cabecalhos).status_code == 200
+
+    linhas, consultas = [], []
+    for params in (params_poucos, params_muitos):
+        with contar_consultas() as contador:
+            resposta = cliente.get(url, params=params, headers=cabecalhos)
+        assert resposta.status_code == 200, resposta.text
+        linhas.append(len(resposta.json()))
+        consultas.append(len(contador))
+
+    assert linhas == [POUCOS, MUITOS]
+    assert consultas[0] > 0
+    assert consultas[0] == consultas[1], f"{caso}: {consultas[0]} consultas com {POUCOS} linhas, {consultas[1]} com {MUITOS}"
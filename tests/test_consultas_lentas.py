@@ -0,0 +1,33 @@
+# Arquivo: tests/test_consultas_lentas.py (registro de consultas lentas)
+
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import consultas_lentas
+
+@pytest.fixture
+def registro(monkeypatch):
+    """Registro zerado que aceita qualquer consulta como lenta, sem capturar planos."""
+    monkeypatch.setattr(consultas_lentas, "SLOW_QUERY_MS", 0.0)
+    monkeypatch.setattr(consultas_lentas, "SLOW_QUERY_EXPLAIN", False)
+    monkeypatch.setattr(consultas_lentas, "SLOW_QUERY_MAX_CONSULTAS", 3)
+    consultas_lentas.limpar()
+    yield consultas_lentas
+    consultas_lentas.limpar()
+
+def _registrar(sql: str):
+    conexao = SimpleNamespace(info={"consultas_lentas_inicio": [time.perf_counter()]})
+    consultas_lentas._depois_da_consulta(conexao, None, sql, (), None, False)
+
+def test_textos_literais_caem_na_mesma_impressao_digital():
+    assert consultas_lentas.impressao_digital("SELECT * FROM pragas WHERE nome = 'Rato'") == \
+        consultas_lentas.impressao_digital("SELECT * FROM pragas WHERE nome = 'Barata d''água'")
+
+def test_impressoes_digitais_limitadas_descartam_a_mais_antiga(registro):
+    for tabela in ("areas", "pragas", "produtos", "areas", "servicos"):
+        _registrar(f"SELECT * FROM {tabela}")
+    guardadas = [consulta["sql"] for consulta in registro._consultas.values()]
+    # "areas" foi vista de novo antes de "servicos", então quem sai é "pragas"
+    assert guardadas == ["SELECT * FROM produtos", "SELECT * FROM areas", "SELECT * FROM servicos"]
@@ -0,0 +1,26 @@
+# Arquivo: tests/test_dispositivos.py (criação de dispositivos em lote)
+
+import pytest
+
+import models
+import schemas
+from database import SessionLocal, engine
+from crud import crud_dispositivo
+
+# =================================================================
+# Lotes grandes, com e sem INSERT ... RETURNING
+# =================================================================
+
+@pytest.mark.parametrize("com_returning", [True, False])
+def test_lote_grande_devolve_todos_os_dispositivos(cliente, monkeypatch, com_returning):
+    # Sem RETURNING (SQLite antes da 3.35) as linhas são relidas em partes
+    monkeypatch.setattr(engine.dialect, "insert_executemany_returning", com_returning)
+    nome_area = f"Área do lote {'com' if com_returning else 'sem'} RETURNING"
+    with SessionLocal() as db:
+        db.add(models.Area(nome=nome_area))
+        db.commit()
+        novos = crud_dispositivo.create_dispositivos_em_lote(db, schemas.DispositivoLoteCreate(
+            area=nome_area, prefixo="", numero_inicio=1, numero_fim=2500, tipo="AL", status="OK"
+        ))
+        assert [d.numero for d in novos] == [str(i) for i in range(1, 2501)]
+        assert [d.id for d in novos] == sorted(d.id for d in novos)
@@ -0,0 +1,104 @@
+# Arquivo: tests/test_estoque.py (baixa de estoque com serviços simultâneos)
+
+import threading
+from datetime import date, datetime, timedelta
+
+import pytest
+
+import models
+import schemas
+from database import SessionLocal
+from crud import crud_estoque, crud_produto, crud_servico
+
+THREADS, SERVICOS_POR_THREAD = 8, 5
+# Dá para 30 serviços de 1 unidade: os outros 10 têm que ser recusados
+ESTOQUE_INICIAL, QUANTIDADE = 30.0, 1.0
+DATA_DOS_SERVICOS = date(2024, 6, 15)
+
+@pytest.fixture(params=["sqlite", "postgresql"])
+def banco(request):
+    """
+    (fábrica de sessões, área) em cada banco. No SQLite a fila única de escrita
+    já serializa as baixas; no PostgreSQL quem garante é o UPDATE com a
+    condição do estoque e o FOR UPDATE das linhas dos produtos.
+    """
+    if request.param == "sqlite":
+        return SessionLocal, request.getfixturevalue("dados")["area_poucos"]
+    sessao = request.getfixturevalue("sessao_postgres")
+    with sessao() as db:
+        area = models.Area(nome=f"Área concorrência {datetime.now().isoformat()}")
+        db.add(area)
+        db.commit()
+        return sessao, area.id
+
+def _criar_produto(sessao) -> int:
+    with sessao() as db:
+        produto = crud_produto.create_produto(db, schemas.ProdutoCreate(
+            nome=f"Produto concorrência {datetime.now().isoformat()}", estoque_atual=ESTOQUE_INICIAL
+        ))
+        return produto.id
+
+def _novo_servico(area_id: int, produto_id: int) -> schemas.ServicoCreate:
+    return schemas.ServicoCreate(
+        descricao="Teste de concorrência", data=DATA_DOS_SERVICOS, status="Concluído", area_id=area_id,
+        produtos_associados=[schemas.ProdutoParaServicoBase(produto_id=produto_id, quantidade_usada=QUANTIDADE)]
+    )
+
+def _em_paralelo(trabalho):
+    """Roda `trabalho()` THREADS vezes ao mesmo tempo, SERVICOS_POR_THREAD vezes em cada thread."""
+    resultados, lock = [], threading.Lock()
+    def trabalhar():
+        for _ in range(SERVICOS_POR_THREAD):
+            resultado = trabalho()
+            with lock:
+                resultados.append(resultado)
+    trabalhadores = [threading.Thread(target=trabalhar) for _ in range(THREADS)]
+    for trabalhador in trabalhadores:
+        trabalhador.start()
+    for trabalhador in trabalhadores:
+        trabalhador.join()
+    return resultados
+
+def _conferir_estoque(sessao, produto_id: int, criados: int):
+    """O estoque gravado e o do livro de movimentos batem com os serviços criados."""
+    with sessao() as db:
+        estoque_atual = db.get(models.Produto, produto_id).estoque_atual
+        no_livro = crud_estoque.get_estoque_em(db, produto_id, datetime.now() + timedelta(days=1))
+    assert criados == int(ESTOQUE_INICIAL / QUANTIDADE)
+    assert estoque_atual == pytest.approx(ESTOQUE_INICIAL - criados * QUANTIDADE)
+    assert no_livro == pytest.approx(estoque_atual)
+
+# =================================================================
+# Serviços simultâneos gastando o mesmo produto
+# =================================================================
+
+def test_baixas_simultaneas_pelo_crud(banco):
+    sessao, area_id = banco
+    produto_id = _criar_produto(sessao)
+    servico = _novo_servico(area_id, produto_id)
+
+    def criar():
+        with sessao() as db:
+            try:
+                return crud_servico.create_servico(db, servico).id
+            except ValueError as e:
+                db.rollback()
+                return str(e)
+
+    resultados = _em_paralelo(criar)
+    criados = [r for r in resultados if isinstance(r, int)]
+    recusados = [r for r in resultados if not isinstance(r, int)]
+    assert all(r.startswith("Estoque insuficiente") for r in recusados), recusados[:3]
+    _conferir_estoque(sessao, produto_id, len(criados))
+
+def test_baixas_simultaneas_pela_rota(cliente, cabecalhos, dados):
+    # A API dos testes roda no SQLite (ver conftest.py)
+    produto_id = _criar_produto(SessionLocal)
+    corpo = _novo_servico(dados["area_poucos"], produto_id).model_dump(mode="json")
+    respostas = _em_paralelo(lambda: cliente.post("/api/servicos/", json=corpo, headers=cabecalhos))
+
+    criados = [r for r in respostas if r.status_code == 200]
+    recusados = [r for r in respostas if r.status_code != 200]
+    assert all(r.status_code == 400 and "Estoque insuficiente" in r.json()["detail"] for r in recusados), \
+        [r.text for r in recusados[:3]]
+    _conferir_estoque(SessionLocal, produto_id, len(criados))
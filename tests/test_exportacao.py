@@ -0,0 +1,42 @@
+# Arquivo: tests/test_exportacao.py (exportação de serviços em CSV e XLSX)
+
+import io
+import csv
+from datetime import date, datetime
+
+import pytest
+
+DATA_DO_SERVICO = date(2024, 8, 5)
+PERIODO = {"data_inicio": "2024-08-01", "data_fim": "2024-08-31"}
+
+@pytest.fixture(scope="module")
+def servico_exportado(cliente, cabecalhos, dados):
+    """Um serviço de agosto/2024 com produtos cadastrados fora da ordem alfabética."""
+    produto_ids = []
+    for nome in ("Zeta exportação", "Alfa exportação", "Meio exportação"):
+        resposta = cliente.post("/api/produtos/", headers=cabecalhos, json={"nome": nome, "estoque_atual": 10})
+        assert resposta.status_code == 200, resposta.text
+        produto_ids.append(resposta.json()["id"])
+    resposta = cliente.post("/api/servicos/", headers=cabecalhos, json={
+        "descricao": "Teste da exportação", "data": DATA_DO_SERVICO.isoformat(), "status": "Concluído",
+        "area_id": dados["area_poucos"],
+        "produtos_associados": [{"produto_id": produto_id, "quantidade_usada": 1} for produto_id in produto_ids],
+    })
+    assert resposta.status_code == 200, resposta.text
+    return resposta.json()["id"]
+
+def test_csv_lista_os_produtos_em_ordem_de_nome(cliente, cabecalhos, servico_exportado):
+    resposta = cliente.get("/api/relatorios/servicos/exportar", params=PERIODO, headers=cabecalhos)
+    assert resposta.status_code == 200, resposta.text
+    linhas = list(csv.DictReader(io.StringIO(resposta.content.decode("utf-8-sig")), delimiter=";"))
+    linha = next(linha for linha in linhas if linha["ID"] == str(servico_exportado))
+    nomes = [produto.split(" (")[0] for produto in linha["Produtos Utilizados"].split("; ")]
+    assert nomes == ["Alfa exportação", "Meio exportação", "Zeta exportação"]
+
+def test_xlsx_grava_as_datas_como_datas(cliente, cabecalhos, servico_exportado):
+    openpyxl = pytest.importorskip("openpyxl")
+    resposta = cliente.get("/api/relatorios/servicos/exportar", params={**PERIODO, "formato": "xlsx"}, headers=cabecalhos)
+    assert resposta.status_code == 200, resposta.text
+    planilha = openpyxl.load_workbook(io.BytesIO(resposta.content)).active
+    linha = next(linha for linha in planilha.iter_rows(min_row=2, values_only=True) if linha[0] == servico_exportado)
+    assert linha[1] == datetime(2024, 8, 5)
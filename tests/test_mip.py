@@ -0,0 +1,50 @@
+# Arquivo: tests/test_mip.py (gravação do MIP de um serviço)
+
+from datetime import date
+
+import pytest
+
+# =================================================================
+# Ocorrências: a gravação substitui as do serviço
+# =================================================================
+
+@pytest.fixture
+def servico_id(cliente, cabecalhos, dados):
+    resposta = cliente.post("/api/servicos/", headers=cabecalhos, json={
+        "descricao": "Teste do MIP", "data": date(2024, 7, 10).isoformat(), "status": "Concluído",
+        "area_id": dados["area_poucos"], "produtos_associados": [],
+    })
+    assert resposta.status_code == 200, resposta.text
+    return resposta.json()["id"]
+
+def test_gravacao_remove_ocorrencias_repetidas(cliente, cabecalhos, servico_id):
+    # O POST /api/mip-registros/ aceita a mesma praga mais de uma vez
+    for praga in ("Rato", "Rato", "Barata", "Barata"):
+        resposta = cliente.post("/api/mip-registros/", headers=cabecalhos, json={
+            "servico_id": servico_id, "data_observacao": "2024-07-10", "pragas_observadas": praga,
+        })
+        assert resposta.status_code == 200, resposta.text
+
+    resposta = cliente.post(f"/api/servicos/{servico_id}/mip", headers=cabecalhos,
+                            json={"ocorrencias": ["Rato"], "contagens": []})
+    assert resposta.status_code == 200, resposta.text
+
+    ocorrencias = cliente.get(f"/api/servicos/{servico_id}/mip", headers=cabecalhos).json()["ocorrencias"]
+    assert [o["pragas_observadas"] for o in ocorrencias] == ["Rato"]
+
+# =================================================================
+# Contagens: dados inválidos são 400, serviço inexistente é 404
+# =================================================================
+
+@pytest.mark.parametrize("contagem", [
+    {"dispositivo_numero": "999", "praga_nome": "Rato", "quantidade": 1},
+    {"dispositivo_numero": "1", "praga_nome": "Praga que não existe", "quantidade": 1},
+])
+def test_contagem_nao_cadastrada_responde_400(cliente, cabecalhos, servico_id, contagem):
+    resposta = cliente.post(f"/api/servicos/{servico_id}/mip", headers=cabecalhos,
+                            json={"ocorrencias": [], "contagens": [contagem]})
+    assert resposta.status_code == 400, resposta.text
+
+def test_servico_inexistente_responde_404(cliente, cabecalhos):
+    resposta = cliente.post("/api/servicos/999999/mip", headers=cabecalhos, json={"ocorrencias": [], "contagens": []})
+    assert resposta.status_code == 404, resposta.text
@@ -0,0 +1,32 @@
+# Arquivo: tests/test_paginacao.py (cursor das listagens paginadas)
+
+from datetime import date
+
+import pytest
+
+from crud import crud_dispositivo, crud_servico
+from crud.paginacao import codificar_cursor, decodificar_cursor
+
+# =================================================================
+# Cursores editados à mão são recusados antes de chegar ao banco
+# =================================================================
+
+def test_cursor_gerado_volta_com_os_tipos_das_chaves():
+    chaves = crud_servico.CHAVES_SERVICOS
+    assert decodificar_cursor(codificar_cursor([date(2024, 3, 1), 7]), chaves) == [date(2024, 3, 1), 7]
+
+@pytest.mark.parametrize("valores", [
+    ["x", "y", "z"],
+    [1, 2, 3],
+    [1, "2", 3.5],
+    [True, "2", 3],
+    [None, "2", 3],
+    [1, "2"],
+])
+def test_cursor_com_valor_do_tipo_errado_e_invalido(valores):
+    with pytest.raises(ValueError, match="Cursor inválido"):
+        decodificar_cursor(codificar_cursor(valores), crud_dispositivo.CHAVES_DISPOSITIVOS)
+
+def test_rota_responde_400_para_cursor_invalido(cliente, cabecalhos):
+    resposta = cliente.get("/api/dispositivos/", params={"cursor": codificar_cursor(["x", "y", "z"])}, headers=cabecalhos)
+    assert resposta.status_code == 400, resposta.text
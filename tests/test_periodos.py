@@ -0,0 +1,89 @@
+# Arquivo: tests/test_periodos.py (filtros por mês)
+
+from datetime import date
+
+import pytest
+from sqlalchemy import event
+
+from database import SessionLocal
+from crud import crud_agenda, crud_servico
+from crud.periodos import intervalo_do_mes
+from conftest import MES_MUITOS
+
+# Índice da coluna de data de cada tabela filtrada por mês
+INDICES_DE_DATA = {
+    "servicos": "ix_servicos_data",
+    "agendamentos": "ix_agendamentos_data_agendamento",
+    "ocorrencias": "ix_ocorrencias_data_ocorrencia",
+}
+
+def _planos(sessao, funcao, *args) -> list:
+    """
+    Executa `funcao(db, *args)` e devolve o plano de cada consulta feita:
+    EXPLAIN QUERY PLAN no SQLite, EXPLAIN no PostgreSQL. No PostgreSQL a
+    varredura sequencial é desligada, porque com tabelas pequenas ela sai mais
+    barata e o planejador não mostraria se o índice pode ser usado.
+    """
+    consultas = []
+    def guardar(conn, cursor, statement, parameters, context, executemany):
+        consultas.append((statement, parameters))
+
+    with sessao() as db:
+        conexao = db.connection()
+        event.listen(conexao, "before_cursor_execute", guardar)
+        try:
+            funcao(db, *args)
+        finally:
+            event.remove(conexao, "before_cursor_execute", guardar)
+
+        if conexao.dialect.name == "postgresql":
+            conexao.exec_driver_sql("SET LOCAL enable_seqscan = off")
+            return [
+                "\n".join(linha[0] for linha in conexao.exec_driver_sql("EXPLAIN " + statement, parameters))
+                for statement, parameters in consultas
+            ]
+        return [
+            "\n".join(linha[3] for linha in conexao.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters))
+            for statement, parameters in consultas
+        ]
+
+@pytest.fixture(params=["sqlite", "postgresql"])
+def sessao(request):
+    if request.param == "sqlite":
+        request.getfixturevalue("dados")
+        return SessionLocal
+    return request.getfixturevalue("sessao_postgres")
+
+# =================================================================
+# Os filtros por mês usam os índices das datas
+# =================================================================
+
+@pytest.mark.parametrize("funcao, tabelas", [
+    (crud_servico.get_servicos_para_agenda, ["servicos"]),
+    (crud_agenda.get_agendamentos, ["agendamentos"]),
+    (crud_agenda.get_ocorrencias, ["ocorrencias"]),
+    (crud_agenda.get_eventos_calendario, ["servicos", "agendamentos", "ocorrencias"]),
+])
+def test_filtro_do_mes_usa_o_indice_da_data(sessao, funcao, tabelas):
+    # A primeira consulta de cada função é a que tem o filtro do mês
+    plano = _planos(sessao, funcao, *MES_MUITOS)[0]
+    for tabela in tabelas:
+        if sessao is SessionLocal:
+            assert f"SEARCH {tabela} USING INDEX {INDICES_DE_DATA[tabela]}" in plano, plano
+        else:
+            # "Index Scan using ...", "Index Only Scan using ..." ou "Bitmap Index Scan on ..."
+            assert INDICES_DE_DATA[tabela] in plano, plano
+
+def test_intervalo_de_dezembro_termina_no_ano_seguinte():
+    assert intervalo_do_mes(2024, 12) == (date(2024, 12, 1), date(2025, 1, 1))
+
+@pytest.mark.parametrize("url", [
+    "/api/agenda/mes/2024/13",
+    "/api/agenda/mes/2024/0",
+    "/api/agenda/mes/0/1",
+    "/api/agenda/mes/9999/12",
+    "/api/agenda/agendamentos/?year=2024&month=13",
+    "/api/agenda/ocorrencias/?year=2024&month=0",
+])
+def test_mes_ou_ano_invalido_responde_422(cliente, cabecalhos, url):
+    assert cliente.get(url, headers=cabecalhos).status_code == 422
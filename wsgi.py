@@ -1,4 +1,7 @@
 import sys
+import atexit
+import asyncio
+import threading
 from a2wsgi import ASGIMiddleware
 
 # ATENÇÃO: Deixaremos este caminho genérico por enquanto.
@@ -11,5 +14,20 @@ if path not in sys.path:
 # Importa sua aplicação FastAPI
 from main_api import app
 
-# Envelopa a aplicação ASGI (FastAPI) em um middleware WSGI
-application = ASGIMiddleware(app)
\ No newline at end of file
+# O ASGIMiddleware não executa o lifespan do app. Criamos aqui o event loop
+# em que as requisições vão rodar e executamos nele o lifespan: prepara o
+# banco, cria os conectores e inicia os trabalhadores da fila de relatórios
+# (sem eles, os relatórios enviados ficariam "pendente" para sempre).
+loop = asyncio.new_event_loop()
+threading.Thread(target=loop.run_forever, daemon=True, name="asgi").start()
+
+_lifespan = app.router.lifespan_context(app)
+asyncio.run_coroutine_threadsafe(_lifespan.__aenter__(), loop).result()
+
+@atexit.register
+def _encerrar():
+    # Devolve para a fila as tarefas em execução e fecha os conectores
+    asyncio.run_coroutine_threadsafe(_lifespan.__aexit__(None, None, None), loop).result(timeout=30)
+
+# Envelopa a aplicação ASGI (FastAPI) em um middleware WSGI, no mesmo loop
+application = ASGIMiddleware(app, loop=loop)
\ No newline at end of file